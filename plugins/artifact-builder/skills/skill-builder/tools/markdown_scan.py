@@ -0,0 +1,146 @@
+"""
+Markdown Scanner
+
+Tokenizes a markdown artifact once into frontmatter fields, a heading index
+with offsets, and section bodies. Validators query the scan instead of
+re-running a regex over the whole document for every rule, so validation
+cost grows with file size rather than file size times rule count.
+"""
+
+import re
+from bisect import bisect_right
+from typing import NamedTuple
+
+FIELD_PATTERN = re.compile(r"([A-Za-z0-9_-]+):(.*)")
+HEADING_PATTERN = re.compile(r"(#{1,6}) (.+)")
+FENCE_PREFIXES = ("```", "~~~")
+
+
+class Heading(NamedTuple):
+    level: int
+    title: str
+    start: int  # offset of the heading line
+    end: int  # offset just past the heading line
+
+
+class MarkdownScan:
+    """Single-pass index of a markdown document."""
+
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+        # Frontmatter: None when absent; error is "missing" or "unclosed"
+        self.frontmatter: str | None = None
+        self.frontmatter_error: str | None = None
+        self.fields: dict[str, str] = {}
+        self.inline_fields: dict[str, str] = {}
+
+        self.headings: list[Heading] = []
+        self.checkbox_lines: list[str] = []
+
+        body_start = self._scan_frontmatter()
+        self._scan_body(body_start)
+        self._heading_starts = [heading.start for heading in self.headings]
+
+    def _scan_frontmatter(self) -> int:
+        """Parse the '---' fenced block; returns the offset where the body starts."""
+        content = self.content
+
+        if not content.startswith("---"):
+            self.frontmatter_error = "missing"
+            return 0
+
+        end_marker = content.find("---", 3)
+        if end_marker == -1:
+            self.frontmatter_error = "unclosed"
+            return 0
+
+        self.frontmatter = content[3:end_marker].strip()
+
+        # Top-level "key: value" lines; indented or bare lines continue the
+        # previous field's value
+        current = None
+        continuation: dict[str, list[str]] = {}
+        for line in self.frontmatter.split("\n"):
+            match = FIELD_PATTERN.fullmatch(line.rstrip())
+            if match and not line[:1].isspace():
+                current = match.group(1)
+                if current not in self.inline_fields:
+                    self.inline_fields[current] = match.group(2).strip()
+                    continuation[current] = [match.group(2).strip()]
+                else:
+                    current = None
+            elif current is not None:
+                continuation[current].append(line.strip())
+
+        self.fields = {
+            key: "\n".join(part for part in parts if part).strip()
+            for key, parts in continuation.items()
+        }
+
+        newline = content.find("\n", end_marker)
+        return len(content) if newline == -1 else newline + 1
+
+    def _scan_body(self, offset: int) -> None:
+        """Index headings (outside code fences) and checkbox lines."""
+        in_fence = False
+
+        for line in self.content[offset:].splitlines(keepends=True):
+            start = offset
+            offset += len(line)
+            text = line.rstrip("\r\n")
+
+            if text.lstrip().startswith(FENCE_PREFIXES):
+                in_fence = not in_fence
+                continue
+
+            if "- [ ]" in text:
+                self.checkbox_lines.append(text)
+
+            if in_fence or not text.startswith("#"):
+                continue
+
+            match = HEADING_PATTERN.match(text)
+            if match:
+                self.headings.append(
+                    Heading(len(match.group(1)), match.group(2).strip(), start, offset)
+                )
+
+    def find_heading(self, level: int, prefix: str) -> Heading | None:
+        """First heading of the given level whose title starts with prefix."""
+        for heading in self.headings:
+            if heading.level == level and heading.title.startswith(prefix):
+                return heading
+        return None
+
+    def has_heading(self, level: int, prefix: str = "") -> bool:
+        return self.find_heading(level, prefix) is not None
+
+    def section_end(self, offset: int, level: int = 2) -> int:
+        """Offset of the next heading at `level` or above after offset."""
+        position = bisect_right(self._heading_starts, offset)
+        for heading in self.headings[position:]:
+            if heading.level <= level:
+                return heading.start
+        return len(self.content)
+
+    def section_body(self, heading: Heading) -> str:
+        """Text between a heading line and the next heading at its level."""
+        end = self.section_end(heading.start, heading.level)
+        return self.content[heading.end : end]
+
+    def marker_body(self, marker: str, level: int = 2) -> str | None:
+        """Body following a bold label line such as '**Key Paths**:'.
+
+        Returns None when the marker is absent or has text on its own line.
+        The body runs to the next heading at `level` or above.
+        """
+        position = self.content.find(marker)
+        if position == -1:
+            return None
+
+        line_end = self.content.find("\n", position)
+        if line_end == -1 or self.content[position + len(marker) : line_end].strip():
+            return None
+
+        return self.content[line_end + 1 : self.section_end(position, level)]
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Marketplace Packager
+
+Packages every skill listed through .claude-plugin/marketplace.json in one
+run. Skills are validated and zipped (deterministic mode of package_skill.py)
+across a process pool; an index.json with sizes, hashes and timings is
+written next to the archives.
+OUTPUT FORMAT: Structured for model consumption and user display.
+"""
+
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from package_skill import build_deterministic_archive
+from validate_skill import validate_skill
+
+MANIFEST = Path(".claude-plugin") / "marketplace.json"
+
+
+def discover_marketplace_skills(repo_root: Path) -> tuple[str, list[dict]]:
+    """Read marketplace.json; returns (marketplace name, skill jobs).
+
+    Each job is {"plugin", "version", "skill", "path"}. Plugins without a
+    skills/ directory contribute nothing.
+    """
+    manifest = json.loads((repo_root / MANIFEST).read_text())
+    jobs = []
+
+    for plugin in manifest.get("plugins", []):
+        source = plugin.get("source", "")
+        if not isinstance(source, str) or not source.startswith("./"):
+            # Remote sources (git/github objects) are not in this tree
+            continue
+
+        skills_dir = repo_root / source / "skills"
+        if not skills_dir.is_dir():
+            continue
+
+        for skill_md in sorted(skills_dir.glob("*/SKILL.md")):
+            jobs.append(
+                {
+                    "plugin": plugin["name"],
+                    "version": plugin.get("version", ""),
+                    "skill": skill_md.parent.name,
+                    "path": str(skill_md.parent),
+                }
+            )
+
+    return manifest.get("name", repo_root.name), jobs
+
+
+def _package_job(job: dict, output_dir: str) -> dict:
+    """Validate and package one skill in a worker process."""
+    start = time.perf_counter()
+    skill_path = Path(job["path"])
+    entry = {**job, "status": "invalid"}
+
+    results = validate_skill(skill_path)
+    entry["validation_seconds"] = round(time.perf_counter() - start, 4)
+
+    if not results["valid"]:
+        entry["issues"] = results["issues"]
+        entry["seconds"] = entry["validation_seconds"]
+        return entry
+
+    plugin_dir = Path(output_dir) / job["plugin"]
+    plugin_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        build = build_deterministic_archive(
+            skill_path, plugin_dir / f"{skill_path.name}.zip"
+        )
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["issues"] = [f"Packaging failed: {str(e)}"]
+    else:
+        entry["status"] = build["status"]
+        entry["archive"] = str(Path(build["archive"]).relative_to(output_dir))
+        entry["size"] = Path(build["archive"]).stat().st_size
+        entry["sha256"] = build["sha256"]
+        entry["compressed"] = build["compressed"]
+        entry["reused"] = build["reused"]
+
+    entry["seconds"] = round(time.perf_counter() - start, 4)
+    return entry
+
+
+def package_marketplace(
+    repo_root: Path, output_dir: Path, workers: int | None = None
+) -> dict:
+    """Package every marketplace skill concurrently and write index.json.
+
+    Returns the index: marketplace totals plus one entry per skill.
+    """
+    start = time.perf_counter()
+    name, jobs = discover_marketplace_skills(repo_root)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        skills = list(pool.map(_package_job, jobs, [str(output_dir)] * len(jobs)))
+
+    packaged = [skill for skill in skills if "archive" in skill]
+
+    index = {
+        "marketplace": name,
+        "total": len(skills),
+        "packaged": len(packaged),
+        "failed": len(skills) - len(packaged),
+        "bytes": sum(skill["size"] for skill in packaged),
+        "seconds": round(time.perf_counter() - start, 4),
+        "cpu_seconds": round(sum(skill["seconds"] for skill in skills), 4),
+        "skills": skills,
+    }
+
+    (output_dir / "index.json").write_text(json.dumps(index, indent=2) + "\n")
+    return index
+
+
+def main() -> None:
+    """Main entry point. Outputs structured packaging summary."""
+
+    args = sys.argv[1:]
+    workers = None
+    if len(args) > 1 and args[0] == "--workers":
+        workers = int(args[1]) if args[1].isdigit() and int(args[1]) > 0 else 0
+        args = args[2:]
+
+    if len(args) < 1 or workers == 0 or not (Path(args[0]) / MANIFEST).exists():
+        print(
+            "Usage: python3 package_marketplace.py [--workers N] <repo-root> "
+            "[output-directory]"
+        )
+        print()
+        print("Validates and packages every skill listed in marketplace.json.")
+        print()
+        print("Arguments:")
+        print("  repo-root          Directory with .claude-plugin/marketplace.json")
+        print("  output-directory   Optional output location (default: /tmp/<name>)")
+        print()
+        print("Options:")
+        print("  --workers N        Worker processes (default: CPU count)")
+        sys.exit(1)
+
+    repo_root = Path(args[0])
+    if len(args) > 1:
+        output_dir = Path(args[1])
+    else:
+        name = json.loads((repo_root / MANIFEST).read_text()).get("name", "skills")
+        output_dir = Path("/tmp") / name
+
+    index = package_marketplace(repo_root, output_dir, workers)
+
+    print(f"Marketplace: {index['marketplace']}")
+    print()
+    for skill in index["skills"]:
+        label = f"{skill['plugin']}/{skill['skill']}"
+        if "archive" in skill:
+            size_kb = skill["size"] / 1024
+            print(f"✅ {label}: {skill['status']} ({size_kb:.1f} KB)")
+        else:
+            print(f"❌ {label}: {skill['status']}")
+            for issue in skill["issues"]:
+                print(f"    - {issue}")
+    print()
+    print(f"Packaged: {index['packaged']}/{index['total']}")
+    print(f"Time: {index['seconds']}s wall, {index['cpu_seconds']}s across workers")
+    print(f"Index: {output_dir / 'index.json'}")
+
+    sys.exit(0 if index["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
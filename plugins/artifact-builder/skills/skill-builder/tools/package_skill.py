@@ -7,14 +7,245 @@ OUTPUT FORMAT: Structured for model consumption and user display.
 """
 
 import sys
+import os
+import json
 import shutil
+import struct
+import hashlib
+import zlib
+import zipfile
 from pathlib import Path
 from validate_skill import validate_skill
 
+# Deterministic archives: fixed 1980-01-01 00:00 DOS timestamp, raw deflate
+# at a fixed level, entries sorted by path
+DOS_TIME = 0
+DOS_DATE = (1 << 5) | 1
+COMPRESS_LEVEL = 9
+MANIFEST_FORMAT = 1
 
-def package_skill(skill_dir: Path, output_dir: Path = None) -> tuple[bool, str]:
+# Build artifacts that would make archives differ between machines
+EXCLUDED_DIRS = {"__pycache__"}
+EXCLUDED_SUFFIXES = {".pyc", ".pyo"}
+
+
+def collect_members(skill_path: Path) -> dict[str, dict]:
+    """Map archive names to content hash, mode and source path."""
+    members = {}
+
+    for root, dirs, files in os.walk(skill_path):
+        dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        for name in files:
+            path = Path(root) / name
+            if path.suffix in EXCLUDED_SUFFIXES:
+                continue
+            data = path.read_bytes()
+            arcname = f"{skill_path.name}/{path.relative_to(skill_path).as_posix()}"
+            members[arcname] = {
+                "sha256": hashlib.sha256(data).hexdigest(),
+                # Only the executable bit matters for installed skills
+                "mode": 0o755 if os.access(path, os.X_OK) else 0o644,
+                "path": path,
+            }
+
+    return dict(sorted(members.items()))
+
+
+def compress_member(data: bytes) -> tuple[int, bytes, int]:
+    """Raw-deflate data; returns (crc32, compressed bytes, original size)."""
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    return zlib.crc32(data), compressed, len(data)
+
+
+def read_raw_members(archive: Path, names: set[str]) -> dict[str, tuple]:
+    """Read already-compressed member data out of a previous archive."""
+    raw = {}
+
+    with zipfile.ZipFile(archive) as zf, open(archive, "rb") as f:
+        for info in zf.infolist():
+            if info.filename not in names or info.compress_type != zipfile.ZIP_DEFLATED:
+                continue
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_len, extra_len = struct.unpack("<2H", header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            raw[info.filename] = (
+                info.CRC,
+                f.read(info.compress_size),
+                info.file_size,
+            )
+
+    return raw
+
+
+def write_zip(archive: Path, entries: list[tuple[str, int, int, bytes, int]]) -> None:
+    """Write (name, mode, crc, compressed, size) entries as a deflated zip."""
+    central = []
+    offset = 0
+
+    tmp_path = archive.with_name(archive.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        for name, mode, crc, compressed, size in entries:
+            encoded = name.encode("utf-8")
+            flags = 0 if encoded.isascii() else 0x800
+            f.write(
+                struct.pack(
+                    "<4s2B4HL2L2H",
+                    b"PK\x03\x04",
+                    20,
+                    0,
+                    flags,
+                    zipfile.ZIP_DEFLATED,
+                    DOS_TIME,
+                    DOS_DATE,
+                    crc,
+                    len(compressed),
+                    size,
+                    len(encoded),
+                    0,
+                )
+                + encoded
+            )
+            f.write(compressed)
+            central.append(
+                struct.pack(
+                    "<4s4B4HL2L5H2L",
+                    b"PK\x01\x02",
+                    20,
+                    3,  # made by: unix, so external_attr carries the mode
+                    20,
+                    0,
+                    flags,
+                    zipfile.ZIP_DEFLATED,
+                    DOS_TIME,
+                    DOS_DATE,
+                    crc,
+                    len(compressed),
+                    size,
+                    len(encoded),
+                    0,
+                    0,
+                    0,
+                    0,
+                    (0o100000 | mode) << 16,
+                    offset,
+                )
+                + encoded
+            )
+            offset += 30 + len(encoded) + len(compressed)
+
+        directory = b"".join(central)
+        f.write(directory)
+        f.write(
+            struct.pack(
+                "<4s4H2LH",
+                b"PK\x05\x06",
+                0,
+                0,
+                len(entries),
+                len(entries),
+                len(directory),
+                offset,
+                0,
+            )
+        )
+
+    os.replace(tmp_path, archive)
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def build_deterministic_archive(skill_path: Path, archive: Path) -> dict:
+    """Build a byte-reproducible zip, reusing work from the previous build.
+
+    A manifest of per-member hashes is kept next to the archive. When
+    nothing changed the archive is left untouched; otherwise only changed
+    members are recompressed and the rest are copied raw from the old zip.
+
+    Returns: {"archive", "status", "compressed", "reused", "sha256"}
+    """
+    manifest_path = archive.with_name(archive.name + ".manifest.json")
+    members = collect_members(skill_path)
+
+    previous = {}
+    if manifest_path.exists() and archive.exists():
+        try:
+            previous = json.loads(manifest_path.read_text())
+        except json.JSONDecodeError:
+            previous = {}
+
+    current_files = {
+        name: {"sha256": member["sha256"], "mode": member["mode"]}
+        for name, member in members.items()
+    }
+
+    # Trust the old archive only if it is exactly what the manifest describes
+    if previous.get("format") != MANIFEST_FORMAT or previous.get(
+        "archive_sha256"
+    ) != (file_sha256(archive) if archive.exists() else None):
+        previous = {}
+
+    if previous.get("files") == current_files:
+        return {
+            "archive": str(archive),
+            "status": "unchanged",
+            "compressed": 0,
+            "reused": len(members),
+            "sha256": previous["archive_sha256"],
+        }
+
+    old_files = previous.get("files", {})
+    reusable = {
+        name
+        for name, entry in current_files.items()
+        if old_files.get(name, {}).get("sha256") == entry["sha256"]
+    }
+    raw = read_raw_members(archive, reusable) if reusable else {}
+
+    entries = []
+    compressed_count = 0
+    for name, member in members.items():
+        if name in raw:
+            crc, compressed, size = raw[name]
+        else:
+            crc, compressed, size = compress_member(member["path"].read_bytes())
+            compressed_count += 1
+        entries.append((name, member["mode"], crc, compressed, size))
+
+    write_zip(archive, entries)
+    archive_sha256 = file_sha256(archive)
+
+    manifest_path.write_text(
+        json.dumps(
+            {
+                "format": MANIFEST_FORMAT,
+                "archive_sha256": archive_sha256,
+                "files": current_files,
+            },
+            indent=2,
+        )
+    )
+
+    return {
+        "archive": str(archive),
+        "status": "rebuilt",
+        "compressed": compressed_count,
+        "reused": len(members) - compressed_count,
+        "sha256": archive_sha256,
+    }
+
+
+def package_skill(
+    skill_dir: Path, output_dir: Path = None, deterministic: bool = False
+) -> tuple[bool, str]:
     """Package skill as zip after validation.
 
+    deterministic=True builds a reproducible archive incrementally (see
+    build_deterministic_archive) and appends its status to the message.
+
     Returns: (success: bool, message: str)
     """
 
@@ -43,6 +274,16 @@ def package_skill(skill_dir: Path, output_dir: Path = None) -> tuple[bool, str]:
     zip_path = output_path / zip_basename
 
     try:
+        if deterministic:
+            build = build_deterministic_archive(
+                skill_path, output_path / f"{zip_basename}.zip"
+            )
+            archive_path = build["archive"]
+            size_kb = Path(archive_path).stat().st_size / 1024
+            status = f"{build['status']}: {build['compressed']} compressed, "
+            status += f"{build['reused']} reused"
+            return True, f"{archive_path}|{size_kb:.1f}|{status}"
+
         archive_path = shutil.make_archive(
             str(zip_path), "zip", root_dir=skill_path.parent, base_dir=skill_path.name
         )
@@ -59,31 +300,44 @@ def package_skill(skill_dir: Path, output_dir: Path = None) -> tuple[bool, str]:
 def main() -> None:
     """Main entry point. Outputs structured packaging results."""
 
-    if len(sys.argv) < 2:
-        print("Usage: python3 package_skill.py <skill-directory> [output-directory]")
+    args = sys.argv[1:]
+    deterministic = "--deterministic" in args
+    args = [arg for arg in args if arg != "--deterministic"]
+
+    if len(args) < 1:
+        print(
+            "Usage: python3 package_skill.py [--deterministic] <skill-directory> "
+            "[output-directory]"
+        )
         print()
         print("Validates and packages skill as distributable zip.")
         print()
         print("Arguments:")
         print("  skill-directory    Path to skill directory")
         print("  output-directory   Optional output location (default: /tmp)")
+        print()
+        print("Options:")
+        print("  --deterministic    Byte-reproducible zip; skips or partially")
+        print("                     rebuilds using a per-file hash manifest")
         sys.exit(1)
 
-    skill_dir = Path(sys.argv[1])
-    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+    skill_dir = Path(args[0])
+    output_dir = Path(args[1]) if len(args) > 1 else None
 
     # Run validation and packaging
-    success, result = package_skill(skill_dir, output_dir)
+    success, result = package_skill(skill_dir, output_dir, deterministic)
 
     if success:
         # Parse result
-        archive_path, size = result.split("|")
+        archive_path, size, *status = result.split("|")
         print(f"Skill: {skill_dir.name}")
         print()
         print("✅ PACKAGED")
         print()
         print(f"Location: {archive_path}")
         print(f"Size: {size} KB")
+        if status:
+            print(f"Build: {status[0]}")
         print()
         print("Installation:")
         print(f"  unzip {Path(archive_path).name}")
@@ -10,58 +10,72 @@ Validates Claude Code slash command markdown files for:
 """
 
 import sys
-import re
 from pathlib import Path
 
+import validation_cache
+from markdown_scan import MarkdownScan
 
-def validate_yaml_frontmatter(content: str) -> tuple[bool, list[str]]:
+# Bump when validation rules change so cached results are invalidated
+VALIDATOR_VERSION = "2"
+
+KEY_PATHS_MARKER = "**Key Paths**:"
+
+
+def validate_yaml_frontmatter(scan: MarkdownScan) -> tuple[bool, list[str]]:
     """Validate YAML frontmatter exists and has required fields."""
     issues = []
 
     # Check frontmatter exists
-    if not content.startswith("---"):
+    if scan.frontmatter_error == "missing":
         issues.append("Missing YAML frontmatter (should start with '---')")
         return False, issues
 
-    # Extract frontmatter
-    try:
-        end_marker = content.index("---", 3)
-        frontmatter = content[3:end_marker].strip()
-    except ValueError:
+    if scan.frontmatter_error == "unclosed":
         issues.append("YAML frontmatter not properly closed (missing closing '---')")
         return False, issues
 
     # Check required fields
     required_fields = ["allowed-tools", "description"]
     for field in required_fields:
-        if f"{field}:" not in frontmatter:
+        if field not in scan.fields:
             issues.append(f"Missing required frontmatter field: {field}")
 
     # Check allowed-tools format
-    if "allowed-tools:" in frontmatter:
-        tools_line = [
-            line for line in frontmatter.split("\n") if "allowed-tools:" in line
-        ]
-        if tools_line and tools_line[0].strip() == "allowed-tools:":
-            issues.append("allowed-tools field is empty (should list tools)")
+    if "allowed-tools" in scan.fields and not scan.inline_fields["allowed-tools"]:
+        issues.append("allowed-tools field is empty (should list tools)")
 
     return len(issues) == 0, issues
 
 
-def check_required_sections(content: str) -> tuple[list[str], list[str]]:
-    """Check for required markdown sections."""
-    required_sections = [
-        (r"^# .+", "Command name (H1 header)"),
-        (r"\*\*Key Paths\*\*:", "Key Paths section"),
-        (r"^## Core Instructions", "Core Instructions section"),
-        (r"^## Success Criteria", "Success Criteria section"),
-    ]
+# (heading level, text, name); level None means a bold label anywhere
+REQUIRED_SECTIONS = [
+    (1, "", "Command name (H1 header)"),
+    (None, KEY_PATHS_MARKER, "Key Paths section"),
+    (2, "Core Instructions", "Core Instructions section"),
+    (2, "Success Criteria", "Success Criteria section"),
+]
 
+OPTIONAL_SECTIONS = [
+    (2, "Workflow", "Workflow section"),
+    (2, "Output Format", "Output Format"),
+    (2, "Error Handling", "Error Handling"),
+    (2, "Notes", "Notes"),
+]
+
+
+def has_section(scan: MarkdownScan, level: int | None, text: str) -> bool:
+    if level is None:
+        return text in scan.content
+    return scan.has_heading(level, text)
+
+
+def check_required_sections(scan: MarkdownScan) -> tuple[list[str], list[str]]:
+    """Check for required markdown sections."""
     found = []
     missing = []
 
-    for pattern, name in required_sections:
-        if re.search(pattern, content, re.MULTILINE):
+    for level, text, name in REQUIRED_SECTIONS:
+        if has_section(scan, level, text):
             found.append(name)
         else:
             missing.append(name)
@@ -69,44 +83,32 @@ def check_required_sections(content: str) -> tuple[list[str], list[str]]:
     return found, missing
 
 
-def check_optional_sections(content: str) -> list[str]:
+def check_optional_sections(scan: MarkdownScan) -> list[str]:
     """Check for optional sections that are present."""
-    optional_sections = [
-        (r"^## Workflow", "Workflow section"),
-        (r"^## Output Format", "Output Format"),
-        (r"^## Error Handling", "Error Handling"),
-        (r"^## Notes", "Notes"),
+    return [
+        name
+        for level, text, name in OPTIONAL_SECTIONS
+        if has_section(scan, level, text)
     ]
 
-    found = []
-    for pattern, name in optional_sections:
-        if re.search(pattern, content, re.MULTILINE):
-            found.append(name)
-
-    return found
 
-
-def validate_key_paths(content: str) -> list[str]:
+def validate_key_paths(scan: MarkdownScan) -> list[str]:
     """Check Key Paths section structure and notation."""
     issues = []
 
     # Find Key Paths section
-    if "**Key Paths**:" not in content:
+    if KEY_PATHS_MARKER not in scan.content:
         issues.append("Missing **Key Paths**: section")
         return issues
 
     # Extract Key Paths content
-    key_paths_match = re.search(
-        r"\*\*Key Paths\*\*:\s*\n(.+?)(?=^## |\Z)", content, re.MULTILINE | re.DOTALL
-    )
+    paths_content = scan.marker_body(KEY_PATHS_MARKER)
 
-    if not key_paths_match:
+    if paths_content is None:
         return issues
 
-    paths_content = key_paths_match.group(1)
-
     # Check for at least some variable definitions
-    has_vars = bool(re.search(r"^- ", paths_content, re.MULTILINE))
+    has_vars = any(line.startswith("- ") for line in paths_content.split("\n"))
 
     if not has_vars:
         issues.append("Key Paths section should list variables used in command")
@@ -120,24 +122,20 @@ def validate_key_paths(content: str) -> list[str]:
     return issues
 
 
-def validate_success_criteria(content: str) -> list[str]:
+def validate_success_criteria(scan: MarkdownScan) -> list[str]:
     """Check Success Criteria section has checkboxes."""
     issues = []
 
     # Find Success Criteria section
-    criteria_match = re.search(
-        r"^## Success Criteria\s*\n(.+?)(?=^## |\Z)", content, re.MULTILINE | re.DOTALL
-    )
+    criteria_heading = scan.find_heading(2, "Success Criteria")
 
-    if not criteria_match:
+    if criteria_heading is None:
         return issues
 
-    criteria_content = criteria_match.group(1)
+    criteria_content = scan.section_body(criteria_heading)
 
     # Check for checkbox items
-    checkboxes = re.findall(r"- \[ \]", criteria_content)
-
-    if not checkboxes:
+    if "- [ ]" not in criteria_content:
         issues.append("Success Criteria should contain checkbox items (- [ ])")
 
     return issues
@@ -149,21 +147,27 @@ def validate_command_file(filepath: Path) -> dict:
     if not filepath.exists():
         return {"valid": False, "errors": [f"File not found: {filepath}"]}
 
-    content = filepath.read_text()
+    raw = filepath.read_bytes()
+    key = validation_cache.cache_key("command", VALIDATOR_VERSION, raw, [])
+    cached = validation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    scan = MarkdownScan(raw.decode())
 
     # Run all validations
-    frontmatter_valid, frontmatter_issues = validate_yaml_frontmatter(content)
-    required_found, required_missing = check_required_sections(content)
-    optional_found = check_optional_sections(content)
-    key_paths_issues = validate_key_paths(content)
-    criteria_issues = validate_success_criteria(content)
+    frontmatter_valid, frontmatter_issues = validate_yaml_frontmatter(scan)
+    required_found, required_missing = check_required_sections(scan)
+    optional_found = check_optional_sections(scan)
+    key_paths_issues = validate_key_paths(scan)
+    criteria_issues = validate_success_criteria(scan)
 
     # Compile results
     all_issues = (
         frontmatter_issues + required_missing + key_paths_issues + criteria_issues
     )
 
-    return {
+    results = {
         "valid": len(all_issues) == 0,
         "frontmatter_valid": frontmatter_valid,
         "required_sections": required_found,
@@ -172,6 +176,9 @@ def validate_command_file(filepath: Path) -> dict:
         "issues": all_issues,
     }
 
+    validation_cache.put(key, results)
+    return results
+
 
 def print_results(filepath: Path, results: dict) -> None:
     """Print validation results."""
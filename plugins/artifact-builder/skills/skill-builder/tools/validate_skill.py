@@ -7,46 +7,47 @@ OUTPUT FORMAT: Structured for model consumption and user display.
 """
 
 import sys
-import re
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import validation_cache
+from markdown_scan import MarkdownScan
 
-def validate_yaml_frontmatter(content: str) -> tuple[bool, list[str]]:
+# Bump when validation rules change so cached results are invalidated
+VALIDATOR_VERSION = "2"
+
+
+def validate_yaml_frontmatter(scan: MarkdownScan) -> tuple[bool, list[str]]:
     """Validate YAML frontmatter exists and has required fields."""
     issues = []
 
-    if not content.startswith("---"):
+    if scan.frontmatter_error == "missing":
         issues.append("Missing YAML frontmatter (must start with '---')")
         return False, issues
 
-    try:
-        end_marker = content.index("---", 3)
-        frontmatter = content[3:end_marker].strip()
-    except ValueError:
+    if scan.frontmatter_error == "unclosed":
         issues.append("YAML frontmatter not closed (missing closing '---')")
         return False, issues
 
     # Required fields
     required_fields = ["name", "description"]
     for field in required_fields:
-        if f"{field}:" not in frontmatter:
+        if field not in scan.fields:
             issues.append(f"Missing required field: {field}")
 
     # Check name format (no spaces)
-    if "name:" in frontmatter:
-        name_line = [line for line in frontmatter.split("\n") if "name:" in line]
-        if name_line:
-            name_value = name_line[0].split(":", 1)[1].strip()
-            if not name_value:
-                issues.append("name field is empty")
-            elif " " in name_value:
-                issues.append(f"name must be hyphenated (found: '{name_value}')")
+    if "name" in scan.fields:
+        name_value = scan.inline_fields["name"]
+        if not name_value:
+            issues.append("name field is empty")
+        elif " " in name_value:
+            issues.append(f"name must be hyphenated (found: '{name_value}')")
 
     # Check description exists
-    if "description:" in frontmatter:
-        desc_line = [line for line in frontmatter.split("\n") if "description:" in line]
-        if desc_line and desc_line[0].strip() == "description:":
-            issues.append("description field is empty")
+    if "description" in scan.fields and not scan.inline_fields["description"]:
+        issues.append("description field is empty")
 
     return len(issues) == 0, issues
 
@@ -111,22 +112,14 @@ def check_skill_structure(skill_dir: Path) -> tuple[list[str], list[str]]:
     return found, issues
 
 
-def validate_description(content: str) -> list[str]:
+def validate_description(scan: MarkdownScan) -> list[str]:
     """Validate description quality and voice."""
     issues = []
 
-    try:
-        end_marker = content.index("---", 3)
-        frontmatter = content[3:end_marker].strip()
-    except ValueError:
+    description = scan.fields.get("description")
+    if not description:
         return issues
 
-    desc_match = re.search(r"description:\s*(.+?)(?=\n\w+:|$)", frontmatter, re.DOTALL)
-    if not desc_match:
-        return issues
-
-    description = desc_match.group(1).strip()
-
     # Length check
     if len(description) < 20:
         issues.append("description too short (explain what and when)")
@@ -141,24 +134,28 @@ def validate_description(content: str) -> list[str]:
     return issues
 
 
-def check_skill_content(skill_dir: Path, content: str) -> list[str]:
+def check_skill_content(skill_dir: Path, scan: MarkdownScan) -> list[str]:
     """Check SKILL.md content structure."""
     issues = []
 
     # H1 header required
-    if not re.search(r"^# .+", content, re.MULTILINE):
+    if not scan.has_heading(1):
         issues.append("Missing H1 header (skill name)")
 
     # Overview section recommended
-    if not re.search(r"^## (Overview|About|Description)", content, re.MULTILINE):
+    if not any(
+        scan.has_heading(2, title) for title in ("Overview", "About", "Description")
+    ):
         issues.append("Missing Overview section (recommended)")
 
     # Type-specific checks
     skill_type = detect_skill_type(skill_dir)
 
     if skill_type == "workflow":
-        has_checklist = bool(re.search(r"- \[ \].*Step", content))
-        has_execute = bool(re.search(r"^## Execute ALL steps", content, re.MULTILINE))
+        has_checklist = any(
+            "Step" in line.split("- [ ]", 1)[1] for line in scan.checkbox_lines
+        )
+        has_execute = scan.has_heading(2, "Execute ALL steps")
 
         if not (has_checklist and has_execute):
             issues.append(
@@ -196,13 +193,24 @@ def validate_skill(skill_dir: Path) -> dict:
             "skill_type": "unknown",
         }
 
-    content = skill_md.read_text()
+    raw = skill_md.read_bytes()
+    key = validation_cache.cache_key(
+        "skill",
+        VALIDATOR_VERSION,
+        raw,
+        validation_cache.directory_listing(skill_path),
+    )
+    cached = validation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    scan = MarkdownScan(raw.decode())
 
     # Run validations
-    frontmatter_valid, frontmatter_issues = validate_yaml_frontmatter(content)
+    frontmatter_valid, frontmatter_issues = validate_yaml_frontmatter(scan)
     structure_found, structure_issues = check_skill_structure(skill_path)
-    description_issues = validate_description(content)
-    content_issues = check_skill_content(skill_path, content)
+    description_issues = validate_description(scan)
+    content_issues = check_skill_content(skill_path, scan)
 
     skill_type = detect_skill_type(skill_path)
 
@@ -210,19 +218,92 @@ def validate_skill(skill_dir: Path) -> dict:
         frontmatter_issues + structure_issues + description_issues + content_issues
     )
 
-    return {
+    results = {
         "valid": len(all_issues) == 0,
         "skill_type": skill_type,
         "structure_found": structure_found,
         "issues": all_issues,
     }
 
+    validation_cache.put(key, results)
+    return results
+
+
+def discover_skills(root: Path) -> list[Path]:
+    """Find every skill directory (containing SKILL.md) under root."""
+    return sorted(
+        skill_md.parent
+        for skill_md in Path(root).rglob("SKILL.md")
+        if not any(part.startswith(".") for part in skill_md.relative_to(root).parts)
+    )
+
+
+def _timed_validate(skill_dir: Path) -> dict:
+    """Validate one skill in a worker process, recording its path and time."""
+    start = time.perf_counter()
+    results = validate_skill(skill_dir)
+    return {
+        "path": str(skill_dir),
+        "seconds": round(time.perf_counter() - start, 4),
+        **results,
+    }
+
+
+def validate_batch(root: Path, workers: int | None = None) -> dict:
+    """Validate every skill under root concurrently.
+
+    Per-skill entries are the validate_skill() result plus path and seconds.
+    """
+    start = time.perf_counter()
+    skill_dirs = discover_skills(root)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        skills = list(pool.map(_timed_validate, skill_dirs))
+
+    valid = sum(1 for skill in skills if skill["valid"])
+
+    return {
+        "root": str(root),
+        "total": len(skills),
+        "valid": valid,
+        "invalid": len(skills) - valid,
+        "seconds": round(time.perf_counter() - start, 4),
+        "validation_seconds": round(sum(skill["seconds"] for skill in skills), 4),
+        "skills": skills,
+    }
+
+
+def main_batch(args: list[str]) -> None:
+    """Batch mode: --batch <root> [--jsonl]. Outputs machine-readable report."""
+    jsonl = "--jsonl" in args
+    args = [arg for arg in args if arg != "--jsonl"]
+
+    if len(args) != 1 or not Path(args[0]).is_dir():
+        print("Usage: python3 validate_skill.py --batch <root-directory> [--jsonl]")
+        sys.exit(1)
+
+    report = validate_batch(Path(args[0]))
+
+    if jsonl:
+        for skill in report["skills"]:
+            print(json.dumps(skill))
+        summary = {key: value for key, value in report.items() if key != "skills"}
+        print(json.dumps({"summary": summary}))
+    else:
+        print(json.dumps(report, indent=2))
+
+    sys.exit(0 if report["invalid"] == 0 else 1)
+
 
 def main() -> None:
     """Main entry point. Outputs structured validation results."""
 
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        main_batch(sys.argv[2:])
+
     if len(sys.argv) != 2:
         print("Usage: python3 validate_skill.py <skill-directory>")
+        print("       python3 validate_skill.py --batch <root-directory> [--jsonl]")
         print()
         print("Validates skill structure:")
         print("  - SKILL.md presence and format")
@@ -0,0 +1,103 @@
+"""
+Validation Result Cache
+
+Persistent on-disk cache for validator results, keyed by a content hash of
+the validated artifact and the validator version. Used by validate_skill.py,
+validate_command.py and (through validate_skill) package_skill.py.
+
+Environment:
+  SKILL_BUILDER_CACHE_DIR   Cache location
+                            (default: $XDG_CACHE_HOME/skill-builder/validation)
+  SKILL_BUILDER_NO_CACHE    Set to 1 to disable caching
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+MAX_ENTRIES = 2048
+
+
+def cache_dir() -> Path:
+    """Resolve the cache directory from the environment."""
+    override = os.environ.get("SKILL_BUILDER_CACHE_DIR")
+    if override:
+        return Path(override)
+    xdg = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(xdg) / "skill-builder" / "validation"
+
+
+def enabled() -> bool:
+    return os.environ.get("SKILL_BUILDER_NO_CACHE", "") not in ("1", "true", "yes")
+
+
+def cache_key(kind: str, version: str, content: bytes, listing: list[str]) -> str:
+    """Hash of validator kind/version, artifact content and directory listing."""
+    digest = hashlib.sha256()
+    digest.update(f"{kind}\0{version}\0".encode())
+    digest.update(hashlib.sha256(content).digest())
+    for entry in listing:
+        digest.update(entry.encode() + b"\0")
+    return digest.hexdigest()
+
+
+def directory_listing(directory: Path) -> list[str]:
+    """Sorted relative paths under directory; subdirectories end with '/'."""
+    entries = []
+    for root, dirs, files in os.walk(directory):
+        rel = Path(root).relative_to(directory)
+        entries.extend(f"{(rel / name).as_posix()}/" for name in dirs)
+        entries.extend((rel / name).as_posix() for name in files)
+    return sorted(entries)
+
+
+def get(key: str) -> dict | None:
+    """Return cached result for key, or None on miss."""
+    if not enabled():
+        return None
+
+    path = cache_dir() / f"{key}.json"
+    try:
+        result = json.loads(path.read_text())
+        # Refresh mtime so eviction drops least recently used entries
+        os.utime(path)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    return result
+
+
+def put(key: str, result: dict) -> None:
+    """Store result under key, evicting old entries past MAX_ENTRIES."""
+    if not enabled():
+        return
+
+    directory = cache_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent validators never read partial files
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, directory / f"{key}.json")
+        evict(directory)
+    except OSError:
+        return
+
+
+def evict(directory: Path, max_entries: int = MAX_ENTRIES) -> None:
+    """Drop least recently used entries down to 90% of max_entries."""
+    entries = [
+        entry for entry in os.scandir(directory) if entry.name.endswith(".json")
+    ]
+    if len(entries) <= max_entries:
+        return
+
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[: len(entries) - int(max_entries * 0.9)]:
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+"""
+bench.py - Scaling benchmarks for the homenet processing tools
+
+`suite` runs every parser and consolidate.py over seeded synthetic data and
+reports throughput and peak RSS. Inputs are written to disk by one child
+process and parsed in another, so the parsing process's RSS high-water mark
+(which Linux carries across fork and exec) reflects that case alone.
+"""
+
+import io
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+from xml.sax.saxutils import escape
+
+from consolidate import (
+    companion_path,
+    consolidate,
+    consolidate_incremental,
+    write_inventory_jsonl,
+)
+from nmap_scan import iter_nmap_hosts
+from opnsense import parse_opnsense_config, parse_opnsense_stream, parse_opnsense_vlans
+from proxmox import parse_proxmox_resources
+from unifi import parse_unifi_devices
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+# suite defaults: open ports per nmap host, share of SSH records whose MAC
+# (and IP) match an nmap host, share matching an nmap host by IP only
+DEFAULT_PORTS = 8
+DEFAULT_MAC_OVERLAP = 0.5
+DEFAULT_IP_OVERLAP = 0.25
+
+NMAP_SERVICES = [
+    (22, "ssh", "OpenSSH", "9.2p1"),
+    (53, "domain", "dnsmasq", "2.89"),
+    (80, "http", "nginx", "1.24.0"),
+    (443, "https", "nginx", "1.24.0"),
+    (445, "microsoft-ds", "Samba smbd", "4.17"),
+    (3306, "mysql", "MariaDB", "10.11"),
+    (5432, "postgresql", "PostgreSQL DB", "15.4"),
+    (8006, "https", "Proxmox VE", ""),
+    (8080, "http-proxy", "Traefik", "2.10"),
+    (9100, "jetdirect", "", ""),
+]
+UNIFI_MODELS = [("uap", "U6LR"), ("usw", "USW24P"), ("ugw", "UXGPRO"), ("uap", "U6M")]
+
+
+def synthetic_ip(n: int) -> str:
+    """Map an integer onto a 10.0.0.0/8 address"""
+    return f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+def synthetic_mac(n: int) -> str:
+    return "02:00:" + ":".join(f"{(n >> shift) & 255:02x}" for shift in (24, 16, 8, 0))
+
+
+def generate_discovery(workdir: Path, hosts: int, seed: int = 0) -> list[Path]:
+    """Write nmap (MAC-keyed) plus DNS and Proxmox (IP-only) discovery files
+
+    Every DNS and Proxmox record collides on IP with an nmap host, which is
+    the case that used to trigger a scan over all MAC-keyed records.
+    """
+    rng = random.Random(seed)
+
+    nmap = [
+        {
+            "ip": synthetic_ip(i),
+            "mac": synthetic_mac(i),
+            "vendor": "",
+            "services": ["ssh/22", f"http/{rng.choice([80, 8080, 8443])}"],
+        }
+        for i in range(hosts)
+    ]
+    dns = [
+        {"hostname": f"host-{i}.lab", "ip": synthetic_ip(i)}
+        for i in rng.sample(range(hosts), hosts // 2)
+    ]
+    proxmox = [
+        {
+            "ip": synthetic_ip(i),
+            "mac": "",
+            "hostname": f"guest-{i}",
+            "os": "VM",
+            "services": [],
+            "discovered_by": ["manual-proxmox"],
+            "metadata": {"type": "vm", "vmid": 100 + i},
+        }
+        for i in rng.sample(range(hosts), hosts // 4)
+    ]
+
+    files = []
+    for name, data in [
+        ("discovery-nmap.json", nmap),
+        ("discovery-dns.json", dns),
+        ("discovery-manual-proxmox.json", proxmox),
+    ]:
+        path = workdir / name
+        path.write_text(json.dumps(data))
+        files.append(path)
+
+    return files
+
+
+def generate_opnsense_config(
+    staticmaps: int, overrides: int, vlans: int = 16, history: int = 0, seed: int = 0
+) -> bytes:
+    """OPNsense config.xml with `history` rows of RRD/filter padding"""
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0"?>\n<opnsense>\n<system><hostname>fw</hostname>']
+    parts.append("</system>")
+
+    parts.append("<interfaces><lan><if>igb0</if><ipaddr>10.0.0.1</ipaddr>")
+    parts.append("<subnet>16</subnet></lan>")
+    parts.extend(
+        f"<opt{i + 1}><if>vlan0.{10 + i}</if><descr>vlan-{i}</descr>"
+        f"<ipaddr>10.{10 + i}.0.1</ipaddr><subnet>24</subnet></opt{i + 1}>"
+        for i in range(vlans)
+    )
+    parts.append("</interfaces>")
+
+    parts.append("<rrddata>")
+    parts.extend(
+        f"<row><t>{i}</t><v>{rng.random():.6f}</v></row>" for i in range(history)
+    )
+    parts.append("</rrddata>")
+
+    parts.append("<filter>")
+    parts.extend(
+        f"<rule><descr>{escape(f'rule {i}')}</descr><source><any/></source></rule>"
+        for i in range(history // 4)
+    )
+    parts.append("</filter>")
+
+    parts.append("<dhcpd><lan>")
+    parts.extend(
+        f"<staticmap><mac>{synthetic_mac(i)}</mac><ipaddr>{synthetic_ip(i)}</ipaddr>"
+        f"<hostname>static-{i}</hostname><descr>device {i}</descr></staticmap>"
+        for i in range(staticmaps)
+    )
+    parts.append("</lan></dhcpd>")
+
+    parts.append("<unboundplus><hosts>")
+    parts.extend(
+        f"<host><hostname>svc-{i}</hostname><domain>lab</domain>"
+        f"<server>{synthetic_ip(staticmaps + i)}</server>"
+        f"<description>override {i}</description></host>"
+        for i in range(overrides)
+    )
+    parts.append("</hosts></unboundplus>")
+
+    parts.append("<vlans>")
+    parts.extend(
+        f"<vlan><if>igb1</if><tag>{10 + i}</tag><descr>vlan-{i}</descr>"
+        f"<vlanif>vlan0.{10 + i}</vlanif></vlan>"
+        for i in range(vlans)
+    )
+    parts.append("</vlans>\n</opnsense>\n")
+
+    return "".join(parts).encode()
+
+
+def generate_nmap_xml(hosts: int, ports: int, seed: int = 0) -> bytes:
+    """nmap -sV -oX output with `hosts` up hosts and `ports` open ports each"""
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0"?>\n<nmaprun scanner="nmap" args="nmap -sV">\n']
+
+    for i in range(hosts):
+        start = 1_700_000_000 + i
+        parts.append(
+            f'<host starttime="{start}" endtime="{start + rng.randint(1, 90)}">'
+            '<status state="up" reason="arp-response"/>'
+            f'<address addr="{synthetic_ip(i)}" addrtype="ipv4"/>'
+            f'<address addr="{synthetic_mac(i).upper()}" addrtype="mac"'
+            ' vendor="Synthetic"/>'
+            "<ports>"
+        )
+        for position in range(ports):
+            if position < len(NMAP_SERVICES):
+                port, name, product, version = NMAP_SERVICES[position]
+            else:
+                port, name, product, version = 10_000 + position, "unknown", "", ""
+            state = "open" if rng.random() < 0.9 else "closed"
+            parts.append(
+                f'<port protocol="tcp" portid="{port}"><state state="{state}"/>'
+                f'<service name="{name}" product="{product}" version="{version}"/>'
+                "</port>"
+            )
+        parts.append("</ports></host>\n")
+
+    parts.append("</nmaprun>\n")
+    return "".join(parts).encode()
+
+
+def generate_proxmox_resources(hosts: int, seed: int = 0) -> dict[str, Any]:
+    """/cluster/resources output: `hosts` running guests plus nodes and storage"""
+    rng = random.Random(seed)
+    nodes = [f"pve{n}" for n in range(max(1, hosts // 50))]
+    data: list[dict[str, Any]] = [
+        {"type": "node", "node": node, "status": "online"} for node in nodes
+    ]
+    data += [
+        {"type": "storage", "storage": "local-lvm", "node": node} for node in nodes
+    ]
+    for i in range(hosts):
+        data.append(
+            {
+                "type": rng.choice(["qemu", "lxc"]),
+                "vmid": 100 + i,
+                "name": f"guest-{i}",
+                "node": nodes[i % len(nodes)],
+                "status": "running",
+                "ip": synthetic_ip(i),
+                "netin": rng.randint(0, 2**32),
+                "netout": rng.randint(0, 2**32),
+                "maxcpu": rng.choice([1, 2, 4, 8]),
+                "maxmem": rng.choice([1, 2, 4, 16]) * 2**30,
+            }
+        )
+    return {"data": data}
+
+
+def generate_unifi_devices(hosts: int, seed: int = 0) -> dict[str, Any]:
+    """stat/device output with `hosts` adopted devices"""
+    rng = random.Random(seed)
+    data = []
+    for i in range(hosts):
+        device_type, model = rng.choice(UNIFI_MODELS)
+        data.append(
+            {
+                "mac": synthetic_mac(i),
+                "ip": synthetic_ip(i),
+                "name": f"{device_type}-{i}",
+                "type": device_type,
+                "model": model,
+                "version": "7.0.50",
+                "adopted": True,
+                "state": 1,
+                "uptime": rng.randint(0, 10**7),
+            }
+        )
+    return {"data": data}
+
+
+def generate_ssh_records(
+    hosts: int,
+    mac_overlap: float = DEFAULT_MAC_OVERLAP,
+    ip_overlap: float = DEFAULT_IP_OVERLAP,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Unified-format SSH records overlapping the nmap hosts 0..hosts-1
+
+    `mac_overlap` of the records share an nmap host's MAC and IP (merged by
+    MAC), `ip_overlap` share only its IP and carry no MAC (merged onto the
+    MAC-keyed record through the IP index); the rest are new hosts.
+    """
+    if mac_overlap < 0 or ip_overlap < 0 or mac_overlap + ip_overlap > 1:
+        raise ValueError("overlaps must be non-negative and sum to at most 1")
+
+    rng = random.Random(seed)
+    by_mac = int(hosts * mac_overlap)
+    by_ip = int(hosts * ip_overlap)
+    shared = rng.sample(range(hosts), by_mac + by_ip)
+
+    records = []
+    for position in range(hosts):
+        if position < by_mac + by_ip:
+            i = shared[position]
+            mac = synthetic_mac(i) if position < by_mac else ""
+        else:
+            i = hosts + position
+            mac = synthetic_mac(i)
+        records.append(
+            {
+                "ip": synthetic_ip(i),
+                "mac": mac,
+                "hostname": f"host-{i}",
+                "os": "Linux 6.1.0-18-amd64",
+                "services": ["ssh/22", "docker"] if i % 3 == 0 else ["ssh/22"],
+                "discovered_by": ["ssh"],
+                "metadata": {"kernel": "6.1.0-18-amd64", "arch": "x86_64"},
+                "proxy_routes": [],
+            }
+        )
+    return records
+
+
+def measure(fn) -> tuple[Any, float, int]:
+    """Run fn() twice: untraced for wall time, traced for peak allocation"""
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+def bench_opnsense(sizes: list[int]) -> list[dict[str, Any]]:
+    """Two-pass fromstring parsing vs the single-pass streaming parser"""
+    results = []
+
+    for size in sizes:
+        config = generate_opnsense_config(size, size // 2, history=size * 4)
+
+        def two_pass() -> dict[str, Any]:
+            xml_data = config.decode()
+            return {
+                "hosts": parse_opnsense_config(xml_data),
+                "vlans": parse_opnsense_vlans(xml_data),
+            }
+
+        old, old_seconds, old_peak = measure(two_pass)
+        new, new_seconds, new_peak = measure(
+            lambda: parse_opnsense_stream(io.BytesIO(config))
+        )
+
+        results.append(
+            {
+                "bench": "opnsense",
+                "staticmaps": size,
+                "config_bytes": len(config),
+                "identical": old == new,
+                "two_pass_seconds": round(old_seconds, 4),
+                "two_pass_peak_mb": round(old_peak / 2**20, 1),
+                "stream_seconds": round(new_seconds, 4),
+                "stream_peak_mb": round(new_peak / 2**20, 1),
+            }
+        )
+
+    return results
+
+
+def bench_consolidate(sizes: list[int]) -> list[dict[str, Any]]:
+    """Time consolidate() at each size; per-record cost should stay flat"""
+    results = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            files = generate_discovery(Path(tmp), size)
+            records = size + size // 2 + size // 4
+
+            start = time.perf_counter()
+            result = consolidate(files)
+            elapsed = time.perf_counter() - start
+
+        results.append(
+            {
+                "bench": "consolidate",
+                "hosts": size,
+                "records": records,
+                "hosts_out": len(result["hosts"]),
+                "seconds": round(elapsed, 4),
+                "us_per_record": round(elapsed / records * 1e6, 2),
+            }
+        )
+
+    return results
+
+
+def bench_incremental(sizes: list[int]) -> list[dict[str, Any]]:
+    """Re-probe a tenth of the SSH hosts: --incremental vs a full rebuild
+
+    The re-probed hosts change hostname, OS and metadata and lose a service;
+    the incremental inventory and VLAN files must equal the full ones
+    ("identical").
+    """
+    results = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            files = generate_discovery(workdir, size)
+            ssh = generate_ssh_records(size)
+            ssh_file = workdir / "discovery-ssh.json"
+            ssh_file.write_text(json.dumps(ssh))
+            files.append(ssh_file)
+
+            output = workdir / "inventory.jsonl"
+            consolidate_incremental(output, files)
+
+            for record in ssh[::10]:
+                record["hostname"] += "-renamed"
+                record["os"] = "Linux 6.12.0-amd64"
+                record["metadata"]["kernel"] = "6.12.0-amd64"
+                record["services"] = ["ssh/22"]
+            ssh_file.write_text(json.dumps(ssh))
+
+            start = time.perf_counter()
+            summary, applied = consolidate_incremental(output, files)
+            incremental_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            full = workdir / "full.jsonl"
+            write_inventory_jsonl(consolidate(files), full)
+            full_seconds = time.perf_counter() - start
+
+            identical = all(
+                (path.read_bytes() if path.exists() else None)
+                == (other.read_bytes() if other.exists() else None)
+                for path, other in (
+                    (output, full),
+                    (companion_path(output, "vlans"), companion_path(full, "vlans")),
+                )
+            )
+
+        results.append(
+            {
+                "bench": "incremental",
+                "hosts": size,
+                "files_applied": len(applied),
+                "hosts_recomputed": summary["recomputed"],
+                "identical": identical,
+                "incremental_seconds": round(incremental_seconds, 4),
+                "full_seconds": round(full_seconds, 4),
+            }
+        )
+
+    return results
+
+
+def peak_rss_mb() -> float:
+    """This process's RSS high-water mark"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+# Suite cases: prepare_* writes the inputs and returns (paths, input records),
+# run_* parses them and returns the number of hosts produced
+
+
+def prepare_nmap(workdir: Path, size: int, options: dict[str, Any]) -> tuple:
+    path = workdir / "scan.xml"
+    path.write_bytes(generate_nmap_xml(size, options["ports"]))
+    return [path], size
+
+
+def prepare_opnsense(workdir: Path, size: int, options: dict[str, Any]) -> tuple:
+    path = workdir / "config.xml"
+    path.write_bytes(generate_opnsense_config(size, size // 2))
+    return [path], size + size // 2
+
+
+def prepare_proxmox(workdir: Path, size: int, options: dict[str, Any]) -> tuple:
+    path = workdir / "proxmox-resources.json"
+    resources = generate_proxmox_resources(size)
+    path.write_text(json.dumps(resources))
+    return [path], len(resources["data"])
+
+
+def prepare_unifi(workdir: Path, size: int, options: dict[str, Any]) -> tuple:
+    path = workdir / "unifi.json"
+    path.write_text(json.dumps(generate_unifi_devices(size)))
+    return [path], size
+
+
+def prepare_consolidate(workdir: Path, size: int, options: dict[str, Any]) -> tuple:
+    """nmap, DNS and Proxmox discovery files plus overlapping SSH records"""
+    files = generate_discovery(workdir, size)
+    ssh = workdir / "discovery-ssh.jsonl"
+    records = generate_ssh_records(size, options["mac_overlap"], options["ip_overlap"])
+    ssh.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return files + [ssh], size + size // 2 + size // 4 + len(records)
+
+
+def run_nmap(paths: list[Path]) -> int:
+    with open(paths[0], "rb") as f:
+        return sum(1 for _ in iter_nmap_hosts(f, "enumerate"))
+
+
+def run_opnsense(paths: list[Path]) -> int:
+    with open(paths[0], "rb") as f:
+        return len(parse_opnsense_stream(f)["hosts"])
+
+
+def run_proxmox(paths: list[Path]) -> int:
+    with open(paths[0]) as f:
+        return len(parse_proxmox_resources(json.load(f)["data"]))
+
+
+def run_unifi(paths: list[Path]) -> int:
+    with open(paths[0]) as f:
+        return len(parse_unifi_devices(json.load(f)["data"]))
+
+
+def run_consolidate(paths: list[Path]) -> int:
+    return len(consolidate(paths)["hosts"])
+
+
+SUITE = {
+    "nmap": (prepare_nmap, run_nmap),
+    "opnsense": (prepare_opnsense, run_opnsense),
+    "proxmox": (prepare_proxmox, run_proxmox),
+    "unifi": (prepare_unifi, run_unifi),
+    "consolidate": (prepare_consolidate, run_consolidate),
+}
+
+
+def prepare_case(
+    name: str, workdir: Path, size: int, options: dict[str, Any]
+) -> tuple[list[Path], int]:
+    return SUITE[name][0](workdir, size, options)
+
+
+def run_case(name: str, paths: list[Path]) -> dict[str, Any]:
+    """Child-process side of a suite case"""
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    hosts = SUITE[name][1](paths)
+    elapsed = time.perf_counter() - start
+    return {
+        "hosts_out": hosts,
+        "seconds": elapsed,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_suite(
+    sizes: list[int], options: dict[str, Any] | None = None
+) -> list[dict[str, Any]]:
+    """Throughput and peak RSS of every parser and consolidate at each size"""
+    options = {
+        "ports": DEFAULT_PORTS,
+        "mac_overlap": DEFAULT_MAC_OVERLAP,
+        "ip_overlap": DEFAULT_IP_OVERLAP,
+        **(options or {}),
+    }
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    for name in SUITE:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                # Generate in a throwaway process to keep this one small: a
+                # child starts from its parent's ru_maxrss, never below it
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    prepared = pool.submit(prepare_case, name, Path(tmp), size, options)
+                    paths, records = prepared.result()
+                input_bytes = sum(path.stat().st_size for path in paths)
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    case = pool.submit(run_case, name, paths).result()
+
+            results.append(
+                {
+                    "bench": name,
+                    "hosts": size,
+                    "records": records,
+                    "hosts_out": case["hosts_out"],
+                    "input_mb": round(input_bytes / 2**20, 1),
+                    "seconds": round(case["seconds"], 4),
+                    "records_per_sec": round(records / case["seconds"]),
+                    "mb_per_sec": round(input_bytes / 2**20 / case["seconds"], 1),
+                    "baseline_rss_mb": round(case["baseline_rss_mb"], 1),
+                    "peak_rss_mb": round(case["peak_rss_mb"], 1),
+                }
+            )
+
+    return results
+
+
+BENCHMARKS = {
+    "consolidate": bench_consolidate,
+    "incremental": bench_incremental,
+    "opnsense": bench_opnsense,
+    "suite": bench_suite,
+}
+
+SUITE_OPTIONS = {
+    "--ports": ("ports", int),
+    "--mac-overlap": ("mac_overlap", float),
+    "--ip-overlap": ("ip_overlap", float),
+}
+
+
+def usage() -> None:
+    print(f"Usage: bench.py <{'|'.join(BENCHMARKS)}> [size ...]", file=sys.stderr)
+    print(
+        "       bench.py suite [--ports M] [--mac-overlap F] [--ip-overlap F]"
+        " [size ...]",
+        file=sys.stderr,
+    )
+    sys.exit(1)
+
+
+def main() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        usage()
+
+    args = sys.argv[2:]
+    options: dict[str, Any] = {}
+    try:
+        while args and args[0] in SUITE_OPTIONS and sys.argv[1] == "suite":
+            key, convert = SUITE_OPTIONS[args[0]]
+            options[key] = convert(args[1])
+            args = args[2:]
+        sizes = [int(arg) for arg in args] or DEFAULT_SIZES
+    except (IndexError, ValueError):
+        usage()
+
+    if sys.argv[1] == "suite":
+        rows = bench_suite(sizes, options)
+    else:
+        rows = BENCHMARKS[sys.argv[1]](sizes)
+
+    for row in rows:
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,22 @@
 consolidate.py - Merge discovery data into unified inventory
 """
 
+import bisect
+import gzip
+import hashlib
+import ipaddress
 import json
+import os
+import socket
 import sys
+import zlib
 from pathlib import Path
-from typing import Any
+from typing import Any, IO, Iterable, Iterator
+
+import metrics
+from host_record import HostRecord, source_tags, to_dicts
+from manual import parse_manual_dir
+from oui import DEFAULT_TABLE, OuiTable, mac_to_int, open_default_table
 
 # Trust hierarchy for conflicting data
 TRUST_ORDER = {
@@ -20,221 +32,1103 @@ TRUST_ORDER = {
 }
 
 
-def trust_level(discovered_by: list[str]) -> int:
+def trust_level(discovered_by: Iterable[str]) -> int:
     """Calculate trust level based on discovery methods"""
     return max((TRUST_ORDER.get(method, 0) for method in discovered_by), default=0)
 
 
-def merge_host_data(existing: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
-    """Merge two host records, preferring higher-trust data"""
+def merge_host_data(existing: HostRecord, new: HostRecord) -> HostRecord:
+    """Merge new into existing in place, preferring higher-trust data"""
 
-    existing_trust = trust_level(existing.get("discovered_by", []))
-    new_trust = trust_level(new.get("discovered_by", []))
+    # Choose data source based on trust
+    new_wins = trust_level(new.discovered_by) > trust_level(existing.discovered_by)
+    primary, secondary = (new, existing) if new_wins else (existing, new)
 
-    # Merge discovered_by lists
-    discovered_by = list(
-        set(existing.get("discovered_by", []) + new.get("discovered_by", []))
-    )
+    existing.ip = primary.ip or secondary.ip
+    existing.mac = primary.mac or secondary.mac
+    existing.hostname = primary.hostname or secondary.hostname
+    existing.os = primary.os or secondary.os
+    existing.proxy_routes = primary.proxy_routes or secondary.proxy_routes
+    existing.vlan_id = primary.vlan_id or secondary.vlan_id
 
-    # Choose data source based on trust
-    if new_trust > existing_trust:
-        primary = new
-        secondary = existing
+    existing.services |= new.services
+    if new.discovered_by != existing.discovered_by:
+        existing.discovered_by = source_tags(existing.discovered_by + new.discovered_by)
+
+    # Primary metadata wins on conflicting keys
+    if new_wins:
+        existing.metadata.update(new.metadata)
     else:
-        primary = existing
-        secondary = new
-
-    merged = {
-        "ip": primary.get("ip") or secondary.get("ip", ""),
-        "mac": primary.get("mac") or secondary.get("mac", ""),
-        "hostname": primary.get("hostname") or secondary.get("hostname", ""),
-        "os": primary.get("os") or secondary.get("os", ""),
-        "services": list(
-            set(primary.get("services", []) + secondary.get("services", []))
-        ),
-        "discovered_by": discovered_by,
-        "metadata": {**secondary.get("metadata", {}), **primary.get("metadata", {})},
-        "proxy_routes": primary.get("proxy_routes", [])
-        or secondary.get("proxy_routes", []),
-    }
+        for key, value in new.metadata.items():
+            existing.metadata.setdefault(key, value)
 
-    return merged
+    return existing
 
 
-def normalize_host(host: dict[str, Any], source_file: str) -> dict[str, Any]:
+def normalize_host(host: dict[str, Any], source_file: str) -> HostRecord:
     """Normalize host data to unified format based on source"""
 
     # Detect source type from filename or data structure
     if "discovery-nmap" in source_file:
         # nmap format: {ip, services, mac, vendor}
-        return {
-            "ip": host.get("ip", ""),
-            "mac": host.get("mac", ""),
-            "hostname": "",
-            "os": "",
-            "services": host.get("services", []),
-            "discovered_by": ["nmap"],
-            "metadata": {"vendor": host.get("vendor", "")}
-            if host.get("vendor")
-            else {},
-            "proxy_routes": [],
-        }
+        return HostRecord(
+            ip=host.get("ip", ""),
+            mac=host.get("mac", ""),
+            services=host.get("services", ()),
+            discovered_by=("nmap",),
+            metadata={"vendor": host["vendor"]} if host.get("vendor") else {},
+        )
     elif "discovery-ssh" in source_file:
         # ssh-probe.sh now outputs unified format directly
         # Just validate it has required fields
         if "discovered_by" in host and "metadata" in host:
-            return host
+            return HostRecord.from_dict(host)
         # Legacy fallback for old format
-        return {
-            "ip": host.get("ip", ""),
-            "mac": "",
-            "hostname": host.get("hostname", ""),
-            "os": host.get("os", ""),
-            "services": host.get("services", []),
-            "discovered_by": ["ssh"],
-            "metadata": {
+        return HostRecord(
+            ip=host.get("ip", ""),
+            hostname=host.get("hostname", ""),
+            os=host.get("os", ""),
+            services=host.get("services", ()),
+            discovered_by=("ssh",),
+            metadata={
                 "interfaces": host.get("interfaces", {}),
                 "containers": host.get("containers", []),
             },
-            "proxy_routes": host.get("proxy_routes", []),
-        }
+            proxy_routes=host.get("proxy_routes", []),
+        )
     elif "discovery-dns" in source_file:
         # dns format: {hostname, ip}
-        return {
-            "ip": host.get("ip", ""),
-            "mac": "",
-            "hostname": host.get("hostname", ""),
-            "os": "",
-            "services": [],
-            "discovered_by": ["dns"],
-            "metadata": {},
-            "proxy_routes": [],
-        }
+        return HostRecord(
+            ip=host.get("ip", ""),
+            hostname=host.get("hostname", ""),
+            discovered_by=("dns",),
+        )
     elif "discovery-manual" in source_file:
         # Already in unified format from parsers
+        record = HostRecord.from_dict(host)
         if "discovered_by" not in host:
-            host["discovered_by"] = ["manual"]
-        return host
+            record.discovered_by = source_tags(("manual",))
+        return record
     else:
-        # Assume unified format if all required fields present
-        if "discovered_by" in host:
-            return host
-        # Otherwise, best-effort normalization
-        return {
-            "ip": host.get("ip", ""),
-            "mac": host.get("mac", ""),
-            "hostname": host.get("hostname", ""),
-            "os": host.get("os", ""),
-            "services": host.get("services", []),
-            "discovered_by": host.get("discovered_by", ["unknown"]),
-            "metadata": host.get("metadata", {}),
-            "proxy_routes": host.get("proxy_routes", []),
-        }
+        # Unified format, or best-effort normalization of partial records
+        record = HostRecord.from_dict(host)
+        if "discovered_by" not in host:
+            record.discovered_by = source_tags(("unknown",))
+        return record
+
+
+# IPv6 keys sit above the IPv4 range so the two families never collide
+IPV6_KEY_BASE = 1 << 32
+
+
+def mac_key(mac: str) -> int | str:
+    """48-bit integer identity of a MAC, whatever its case or separators
+
+    OPNsense, UniFi, nmap and `ip -br addr` spell the same MAC differently;
+    unparseable values fall back to the lowercased string.
+    """
+    value = mac_to_int(mac)
+    return value if value is not None else mac.lower()
+
+
+def canonical_mac(mac: str) -> str:
+    """Lowercase colon-separated spelling of a MAC (lowercased if unparseable)"""
+    key = mac_key(mac)
+    if isinstance(key, str):
+        return key
+    return ":".join(f"{key >> shift & 0xFF:02x}" for shift in range(40, -8, -8))
+
+
+def ip_key(ip: str) -> int | str:
+    """Packed integer identity of an IPv4 or IPv6 address (string if invalid)"""
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except (OSError, ValueError):
+        pass
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, ip)
+    except (OSError, ValueError):
+        return ip
+    return IPV6_KEY_BASE + int.from_bytes(packed, "big")
+
+
+class HostIndex:
+    """Canonical host store with MAC, IP and hostname secondary indexes
+
+    Each record lives once in `records`; the indexes map identities to its
+    position so every merge is a constant-time lookup and in-place update.
+    MACs and IPs are indexed by their integer keys (mac_key / ip_key); the
+    records keep the original strings for output.
+    """
+
+    def __init__(self) -> None:
+        self.records: list[HostRecord] = []
+        self.mac_keyed: list[bool] = []
+        self.by_mac: dict[int | str, int] = {}
+        self.by_ip: dict[int | str, int] = {}
+        self.by_hostname: dict[str, int] = {}
+
+    def _insert(self, host: HostRecord, mac_keyed: bool) -> int:
+        self.records.append(host)
+        self.mac_keyed.append(mac_keyed)
+        record_id = len(self.records) - 1
+        self._store(record_id, host)
+        return record_id
+
+    def _store(self, record_id: int, host: HostRecord) -> None:
+        self.records[record_id] = host
+        if host.hostname:
+            self.by_hostname[host.hostname] = record_id
+
+    def add(self, host: HostRecord) -> None:
+        """Merge a normalized host into the index (hosts without IP are ignored)"""
+        if not host.ip:
+            return
+
+        ip = ip_key(host.ip)
+
+        # Prefer MAC-based deduplication
+        if host.mac:
+            mac = mac_key(host.mac)
+            record_id = self.by_mac.get(mac)
+            if record_id is None:
+                record_id = self._insert(host, mac_keyed=True)
+                self.by_mac[mac] = record_id
+            else:
+                self._store(record_id, merge_host_data(self.records[record_id], host))
+
+            # Also track by IP for cross-referencing
+            self.by_ip[ip] = record_id
+        else:
+            # No MAC, fallback to IP-based deduplication. A MAC-keyed record
+            # owning this IP is updated in place through the shared id.
+            record_id = self.by_ip.get(ip)
+            if record_id is None:
+                record_id = self._insert(host, mac_keyed=False)
+                self.by_ip[ip] = record_id
+            else:
+                self._store(record_id, merge_host_data(self.records[record_id], host))
+
+    def get_by_mac(self, mac: str) -> HostRecord | None:
+        record_id = self.by_mac.get(mac_key(mac))
+        return None if record_id is None else self.records[record_id]
+
+    def get_by_ip(self, ip: str) -> HostRecord | None:
+        record_id = self.by_ip.get(ip_key(ip))
+        return None if record_id is None else self.records[record_id]
+
+    def get_by_hostname(self, hostname: str) -> HostRecord | None:
+        record_id = self.by_hostname.get(hostname)
+        return None if record_id is None else self.records[record_id]
+
+    def hosts(self) -> list[HostRecord]:
+        """Return live hosts: MAC-keyed records, then IP-only records"""
+        inventory = [self.records[record_id] for record_id in self.by_mac.values()]
+        seen_ips = {ip_key(host.ip) for host in inventory}
+
+        # IP-only records still owning their IP (an IP later claimed by a
+        # MAC-keyed host supersedes the IP-only record)
+        for ip, record_id in self.by_ip.items():
+            if not self.mac_keyed[record_id] and ip not in seen_ips:
+                inventory.append(self.records[record_id])
+
+        return inventory
+
+
+def address_sort_key(ip: str) -> tuple[int, int | str]:
+    """Sort key ordering addresses (IPv4, then IPv6), unparseable last by text"""
+    key = ip_key(ip)
+    return (0, key) if isinstance(key, int) else (1, ip)
+
+
+def ip_sort_key(host: HostRecord) -> tuple[int, int | str]:
+    return address_sort_key(host.ip)
+
+
+def open_text(path: Path, mode: str = "r") -> IO[str]:
+    """Open a text file, transparently (de)compressing `.gz` paths"""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t")
+    return open(path, mode)
+
+
+def is_jsonl(path: Path) -> bool:
+    return path.name.endswith((".jsonl", ".jsonl.gz"))
+
+
+def companion_path(path: Path, suffix: str) -> Path:
+    """inventory.jsonl -> inventory-{suffix}.jsonl, keeping every extension"""
+    name, sep, extensions = path.name.partition(".")
+    return path.with_name(f"{name}-{suffix}{sep}{extensions}")
+
+
+def is_vlan_record(record: dict[str, Any]) -> bool:
+    return "vlan_id" in record and "ip" not in record
+
+
+def iter_jsonl_records(filepath: Path) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yield (line, record) pairs from a JSONL file, optionally gzipped
+
+    Unparseable lines are skipped. A truncated or corrupt gzip file ends
+    with a warning once the readable lines are read.
+    """
+    try:
+        with open_text(filepath) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict):
+                    yield line, record
+    except (OSError, EOFError, zlib.error, UnicodeDecodeError) as e:
+        print(
+            f"WARNING: {filepath}: corrupt or truncated, rest of file skipped: {e}",
+            file=sys.stderr,
+        )
+
+
+def iter_discovery_records(filepath: Path) -> Iterator[dict[str, Any]]:
+    """Yield raw host and VLAN records from a discovery file
+
+    JSONL files (optionally gzipped) are read one line at a time so memory
+    stays independent of input size; JSON files are loaded whole.
+    Unparseable content is skipped, matching the JSON behavior.
+    """
+    if is_jsonl(filepath):
+        for _, record in iter_jsonl_records(filepath):
+            yield record
+        return
+
+    try:
+        with open_text(filepath) as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError, EOFError, zlib.error, UnicodeDecodeError):
+        return
+
+    # Handle both list and dict responses for host data; dicts may also
+    # carry VLANs (e.g. `opnsense.py all`)
+    if isinstance(data, dict):
+        yield from data.get("hosts", [])
+        yield from data.get("vlans", [])
+        return
+
+    yield from data
+
+
+def ingest_records(
+    index: HostIndex,
+    vlans: dict[int, dict[str, Any]],
+    records: Iterable[dict[str, Any]],
+    source: str,
+) -> int:
+    """Normalize host records into the index and collect VLAN records
+
+    Returns the number of records read.
+    """
+    count = 0
+    for record in records:
+        count += 1
+        if is_vlan_record(record):
+            # VLAN data - deduplicate by VLAN ID
+            vlan_id = record.get("vlan_id")
+            if vlan_id:
+                vlans[vlan_id] = record
+            continue
+
+        # Normalize to unified format
+        index.add(normalize_host(record, source))
+
+    return count
+
+
+def ingest_file(
+    index: HostIndex, vlans: dict[int, dict[str, Any]], filepath: Path
+) -> None:
+    """Normalize every record in a discovery file into the index"""
+    hosts_before = len(index.records)
+    with metrics.stage("consolidate-ingest", source=filepath.name) as fields:
+        records = iter_discovery_records(filepath)
+        fields["hosts"] = ingest_records(index, vlans, records, str(filepath))
+        fields["bytes"] = filepath.stat().st_size
+    metrics.merge(str(filepath), fields["hosts"], hosts_before, len(index.records))
+
+
+def ingest_manual_dir(
+    index: HostIndex, vlans: dict[int, dict[str, Any]], directory: Path
+) -> None:
+    """Parse raw manual exports in-process and merge the records directly"""
+    parsed = parse_manual_dir(directory)
+    hosts_before = len(index.records)
+    for host in parsed["hosts"]:
+        index.add(host)
+    metrics.merge(
+        str(directory), len(parsed["hosts"]), hosts_before, len(index.records)
+    )
+    for vlan in parsed["vlans"]:
+        if vlan.get("vlan_id"):
+            vlans[vlan["vlan_id"]] = vlan
+
+
+def enrich_vendors(hosts: Iterable[HostRecord], table: OuiTable) -> int:
+    """Fill metadata.vendor from the OUI table where no source provided one
+
+    Returns the number of hosts enriched.
+    """
+    enriched = 0
+    for host in hosts:
+        if host.mac and not host.metadata.get("vendor"):
+            vendor = table.lookup(host.mac)
+            if vendor:
+                host.metadata["vendor"] = vendor
+                enriched += 1
+    return enriched
+
+
+class SubnetIndex:
+    """Sorted interval index mapping addresses to the VLAN whose subnet holds them
+
+    Each subnet is an [first, last] range of ip_key integers, sorted by start
+    (enclosing ranges before the ranges they contain). A lookup bisects to
+    the last range starting at or below the address and, when that range
+    ends too early, climbs to its enclosing range, so nested subnets resolve
+    to the most specific one.
+    """
+
+    def __init__(self, vlans: Iterable[dict[str, Any]]) -> None:
+        ranges = []
+        for vlan in vlans:
+            for subnet in vlan.get("subnets", []):
+                try:
+                    network = ipaddress.ip_network(subnet, strict=False)
+                except ValueError:
+                    continue
+                first = ip_key(str(network.network_address))
+                last = ip_key(str(network.broadcast_address))
+                ranges.append((first, -last, vlan["vlan_id"]))
+        ranges.sort()
+
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        self.vlan_ids: list[int] = []
+        # Position of the innermost range enclosing each range, or -1
+        self.parents: list[int] = []
+        open_ranges: list[int] = []
+        for first, negative_last, vlan_id in ranges:
+            while open_ranges and self.ends[open_ranges[-1]] < first:
+                open_ranges.pop()
+            self.parents.append(open_ranges[-1] if open_ranges else -1)
+            open_ranges.append(len(self.starts))
+            self.starts.append(first)
+            self.ends.append(-negative_last)
+            self.vlan_ids.append(vlan_id)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def lookup(self, ip: str) -> int | None:
+        """VLAN ID of the most specific subnet containing ip, if any"""
+        key = ip_key(ip)
+        if not isinstance(key, int):
+            return None
+        position = bisect.bisect_right(self.starts, key) - 1
+        while position >= 0 and self.ends[position] < key:
+            position = self.parents[position]
+        return self.vlan_ids[position] if position >= 0 else None
+
+
+def assign_vlans(hosts: Iterable[HostRecord], subnets: SubnetIndex) -> int:
+    """Set vlan_id on every host from the subnet index
+
+    Returns the number of hosts placed in a VLAN.
+    """
+    assigned = 0
+    for host in hosts:
+        host.vlan_id = subnets.lookup(host.ip)
+        if host.vlan_id is not None:
+            assigned += 1
+    return assigned
+
+
+def finish_hosts(
+    inventory: list[HostRecord], vlans: dict[int, dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Sorted unified-format host dicts from merged records
+
+    This is the output boundary: hosts are placed in VLANs by the subnets
+    of the firewall's VLAN interfaces, MAC vendors are filled in from the
+    OUI table (when built, see oui.py) and host records become
+    unified-format dicts.
+    """
+
+    # Sort by IP address
+    inventory.sort(key=ip_sort_key)
+
+    # Without subnet data (no firewall export) earlier placements are kept
+    subnets = SubnetIndex(vlans.values())
+    if len(subnets):
+        with metrics.stage("consolidate-vlans", subnets=len(subnets)) as fields:
+            fields["hosts"] = assign_vlans(inventory, subnets)
+
+    table = open_default_table()
+    if table is not None:
+        with metrics.stage("consolidate-oui") as fields:
+            fields["hosts"] = enrich_vendors(inventory, table)
+        table.close()
+
+    return to_dicts(inventory)
+
+
+def sorted_vlans(vlans: dict[int, dict[str, Any]]) -> list[dict[str, Any]]:
+    """VLAN records sorted by VLAN ID"""
+
+    def vlan_sort_key(vlan: dict[str, Any]) -> int:
+        return vlan.get("vlan_id", 9999)
+
+    return sorted(vlans.values(), key=vlan_sort_key)
+
+
+def build_result(index: HostIndex, vlans: dict[int, dict[str, Any]]) -> dict[str, Any]:
+    """Sorted `{"hosts", "vlans"}` inventory from merge state"""
+    return {"hosts": finish_hosts(index.hosts(), vlans), "vlans": sorted_vlans(vlans)}
 
 
 def consolidate(discovery_files: list[Path]) -> dict[str, Any]:
     """Consolidate multiple discovery files into unified inventory"""
 
-    # Track by MAC (preferred) and IP (fallback)
-    by_mac: dict[str, dict[str, Any]] = {}
-    by_ip: dict[str, dict[str, Any]] = {}
+    index = HostIndex()
     vlans: dict[int, dict[str, Any]] = {}
 
+    with metrics.stage("consolidate", files=len(discovery_files)) as fields:
+        for filepath in discovery_files:
+            if filepath.is_dir():
+                ingest_manual_dir(index, vlans, filepath)
+            elif filepath.exists():
+                ingest_file(index, vlans, filepath)
+
+        result = build_result(index, vlans)
+        fields["hosts"] = len(result["hosts"])
+
+    return result
+
+
+def manifest_path(output_jsonl: Path) -> Path:
+    """inventory.jsonl -> inventory-manifest.json"""
+    name = output_jsonl.name.partition(".")[0]
+    return output_jsonl.with_name(f"{name}-manifest.json")
+
+
+def file_digest(filepath: Path) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def changed_files(
+    discovery_files: list[Path], manifest: dict[str, dict[str, Any]]
+) -> tuple[list[Path], dict[str, dict[str, Any]]]:
+    """Split out files whose content changed since the manifest was written
+
+    Size and mtime match is trusted without reading the file; otherwise the
+    content hash decides, so a touched-but-identical file is not re-applied.
+    Returns the changed files and the refreshed manifest entries.
+    """
+    changed = []
+    entries: dict[str, dict[str, Any]] = {}
+
     for filepath in discovery_files:
-        if not filepath.exists():
+        if not filepath.is_file():
             continue
 
-        try:
-            with open(filepath) as f:
-                data = json.load(f)
-        except json.JSONDecodeError:
-            continue
+        key = str(filepath.resolve())
+        stat = filepath.stat()
+        previous = manifest.get(key, {})
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
 
-        # Check if this is VLAN data
-        if isinstance(data, list) and data and "vlan_id" in data[0]:
-            # VLAN data - deduplicate by VLAN ID
-            for vlan in data:
-                vlan_id = vlan.get("vlan_id")
-                if vlan_id:
-                    vlans[vlan_id] = vlan
-            continue
+        if (
+            previous.get("size") == entry["size"]
+            and previous.get("mtime_ns") == entry["mtime_ns"]
+        ):
+            entry["sha256"] = previous.get("sha256", "")
+        else:
+            entry["sha256"] = file_digest(filepath)
+            if entry["sha256"] != previous.get("sha256"):
+                changed.append(filepath)
+
+        entries[key] = entry
+
+    return changed, entries
+
+
+def contributions_path(output_jsonl: Path) -> Path:
+    """inventory.jsonl -> inventory-contributions.jsonl"""
+    return companion_path(output_jsonl, "contributions")
+
+
+def compact_record(host: HostRecord) -> dict[str, Any]:
+    """Unified-format dict without empty fields; from_dict restores defaults"""
+    return {key: value for key, value in host.to_dict().items() if value}
+
+
+def source_records(filepath: Path) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Host records and VLAN records of one discovery file or manual dir
+
+    Discovery file records are returned as read (see normalized_record);
+    manual dirs are parsed in memory into records already in unified form.
+    """
+    if filepath.is_dir():
+        parsed = parse_manual_dir(filepath)
+        hosts = [compact_record(host) for host in parsed["hosts"]]
+        return hosts, [vlan for vlan in parsed["vlans"] if vlan.get("vlan_id")]
+
+    hosts: list[dict[str, Any]] = []
+    vlans: list[dict[str, Any]] = []
+    for record in iter_discovery_records(filepath):
+        if not is_vlan_record(record):
+            hosts.append(record)
+        elif record.get("vlan_id"):
+            vlans.append(record)
+    return hosts, vlans
+
+
+def normalized_record(
+    record: dict[str, Any], source_file: str | None
+) -> dict[str, Any] | None:
+    """Compact unified form of a source record, or None without an IP
+
+    source_file is None for manual dir records, which are already unified.
+    """
+    if source_file is not None:
+        record = compact_record(normalize_host(record, source_file))
+    return record if record.get("ip") else None
+
+
+def identity_keys(host: dict[str, Any]) -> list[str]:
+    """The ip_key (first) and mac_key of a record, as JSON object keys
+
+    HostIndex.add only touches records sharing one of these keys, so records
+    linked through them form components that merge independently.
+    """
+    ip = ip_key(host["ip"])
+    keys = [f"i{ip}" if isinstance(ip, int) else f"i:{ip}"]
+    if host.get("mac"):
+        mac = mac_key(host["mac"])
+        keys.append(f"m{mac}" if isinstance(mac, int) else f"m:{mac}")
+    return keys
+
+
+def find_root(parent: dict[str, str], key: str) -> str:
+    """Union-find lookup with path compression"""
+    root = parent.setdefault(key, key)
+    while parent[root] != root:
+        root = parent[root]
+    while parent[key] != root:
+        parent[key], key = root, parent[key]
+    return root
+
+
+def content_digest(value: Any) -> str:
+    """Short digest of parsed JSON (dicts keep their key order, so repr is stable)"""
+    return hashlib.blake2b(repr(value).encode(), digest_size=8).hexdigest()
+
+
+def file_signature(filepath: Path) -> list[int] | None:
+    try:
+        stat = filepath.stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# Bumped whenever the manifest layout changes; older manifests force a rebuild
+INCREMENTAL_VERSION = 2
+
+
+def load_incremental_state(output_jsonl: Path) -> dict[str, Any] | None:
+    """Manifest of the last incremental run, if it still describes the output
+
+    A full consolidation or an edit since then changes the inventory's
+    size or mtime, and a rebuilt OUI table changes vendors of every host;
+    either way the stored components are no longer trusted.
+    """
+    try:
+        state = json.loads(manifest_path(output_jsonl).read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+    if (
+        not isinstance(state, dict)
+        or state.get("version") != INCREMENTAL_VERSION
+        or state.get("inventory") != file_signature(output_jsonl)
+        or state.get("oui") != file_signature(DEFAULT_TABLE)
+        or not contributions_path(output_jsonl).exists()
+    ):
+        return None
+    return state
+
+
+def consolidate_incremental(
+    output_jsonl: Path, discovery_files: list[Path]
+) -> tuple[dict[str, int], list[Path]]:
+    """Recompute only the hosts touched by changed or removed sources
 
-        # Handle both list and dict responses for host data
-        if isinstance(data, dict):
-            hosts = data.get("hosts", [])
+    Records are grouped into components (see identity_keys). Each stored
+    component line holds the normalized records every source contributed
+    to it, keyed by their position in the source; the manifest maps
+    identity keys to components and keeps, per source, a digest and the
+    component of each record. Changed discovery files and manual dirs are
+    re-read and compared record by record with the same position last time:
+    only records that differ are normalized, and only the components they
+    leave or join, and those of removed sources, are recomputed. Unaffected
+    inventory lines and component lines are copied unchanged and the
+    recomputed hosts are sorted in by address, so the output is the same as
+    a full consolidation of the same sources in the same order. Without a
+    usable manifest, after a VLAN subnet change or when sources were
+    reordered, everything is recomputed.
+
+    Returns host counts and the sources that were re-read.
+    """
+    manifest_file = manifest_path(output_jsonl)
+    contributions_file = contributions_path(output_jsonl)
+
+    sources = {
+        str(filepath.resolve()): filepath
+        for filepath in discovery_files
+        if filepath.is_dir() or filepath.is_file()
+    }
+    order = list(sources)
+    position = {source: rank for rank, source in enumerate(order)}
+
+    state = load_incremental_state(output_jsonl)
+    if state is not None:
+        retained = [source for source in state["order"] if source in position]
+        if retained != sorted(retained, key=position.__getitem__):
+            state = None
+    if state is None:
+        state = {"files": {}, "order": [], "components": 0, "keys": {}, "vlans": {}}
+        state.update({"digests": {}, "record_components": {}})
+        state.update({"host_components": [], "host_addresses": []})
+    keys: dict[str, int] = state["keys"]
+    digests: dict[str, list[str]] = state["digests"]
+    record_components: dict[str, list[int]] = state["record_components"]
+
+    changed_list, entries = changed_files(list(sources.values()), state["files"])
+    # Manual drop directories are parsed in memory, so always re-read them
+    changed = {str(filepath.resolve()) for filepath in changed_list}
+    changed.update(source for source, path in sources.items() if path.is_dir())
+    changed.update(source for source in order if source not in digests)
+    removed = {source for source in state["order"] if source not in position}
+
+    loaded: dict[str, tuple[list[dict[str, Any]], list[dict[str, Any]]]] = {}
+    for source in order:
+        if source in changed:
+            filepath = sources[source]
+            with metrics.stage("consolidate-ingest", source=filepath.name) as fields:
+                loaded[source] = source_records(filepath)
+                fields["hosts"] = len(loaded[source][0])
+
+    source_vlans = {
+        source: loaded[source][1] if source in loaded else state["vlans"][source]
+        for source in order
+    }
+    vlans: dict[int, dict[str, Any]] = {}
+    for source in order:
+        for vlan in source_vlans[source]:
+            vlans[vlan["vlan_id"]] = vlan
+    vlan_list = sorted_vlans(vlans)
+    vlans_digest = content_digest(vlan_list)
+
+    affected: set[int] = set()
+    if vlans_digest != state.get("vlans_digest"):
+        affected.update(range(state["components"]))
+    for source in removed:
+        affected.update(record_components[source])
+
+    new_digests = {source: digests[source] for source in order if source not in loaded}
+    unchanged: dict[str, list[bool]] = {}
+    changed_hosts: list[tuple[int, int, str, dict[str, Any], list[str]]] = []
+    with metrics.stage("consolidate-incremental") as fields:
+        for source, (records, _) in loaded.items():
+            source_file = None if sources[source].is_dir() else str(sources[source])
+            previous = digests.get(source, [])
+            previous_components = record_components.get(source, [])
+            new_digests[source] = current = []
+            unchanged[source] = same = []
+            for seq, record in enumerate(records):
+                digest = content_digest(record)
+                current.append(digest)
+                same.append(seq < len(previous) and previous[seq] == digest)
+                if same[-1]:
+                    continue
+                if seq < len(previous):
+                    affected.add(previous_components[seq])
+                host = normalized_record(record, source_file)
+                if host is not None:
+                    host_keys = identity_keys(host)
+                    affected.update(keys[key] for key in host_keys if key in keys)
+                    changed_hosts.append(
+                        (position[source], seq, source, host, host_keys)
+                    )
+            affected.update(previous_components[len(records) :])
+        affected.discard(-1)
+
+        # Records of affected components, minus those that changed or whose
+        # source is gone, plus the changed ones
+        gathered: list[tuple[int, int, str, dict[str, Any], list[str]]] = []
+        kept: list[tuple[int, str]] = []
+        if state["components"]:
+            with open_text(contributions_file) as f:
+                for component, line in enumerate(f):
+                    if component not in affected:
+                        kept.append((component, line))
+                        continue
+                    for source, records in json.loads(line).items():
+                        if source in removed:
+                            continue
+                        same = unchanged.get(source)
+                        rank = position[source]
+                        for seq, host in records:
+                            if same is None or (seq < len(same) and same[seq]):
+                                host_keys = identity_keys(host)
+                                gathered.append((rank, seq, source, host, host_keys))
+        gathered.extend(changed_hosts)
+        gathered.sort(key=lambda item: item[:2])
+
+        index = HostIndex()
+        parent: dict[str, str] = {}
+        for _, _, _, host, host_keys in gathered:
+            index.add(HostRecord.from_dict(host))
+            first, *rest = host_keys
+            root = find_root(parent, first)
+            for key in rest:
+                other = find_root(parent, key)
+                if other != root:
+                    parent[other] = root
+        recomputed = finish_hosts(index.hosts(), vlans)
+
+        fields["components"] = len(affected)
+        fields["hosts"] = len(recomputed)
+
+    # Renumber: kept components first, then the recomputed ones
+    renumber = {old: new for new, (old, _) in enumerate(kept)}
+    new_keys = {key: renumber[old] for key, old in keys.items() if old in renumber}
+    new_record_components: dict[str, list[int]] = {}
+    for source in order:
+        previous_components = record_components.get(source, [])
+        if source in unchanged:
+            new_record_components[source] = [
+                renumber.get(previous_components[seq], -1) if same else -1
+                for seq, same in enumerate(unchanged[source])
+            ]
         else:
-            hosts = data
+            new_record_components[source] = [
+                renumber.get(component, -1) for component in previous_components
+            ]
+    roots: dict[str, int] = {}
+    components: list[dict[str, list[list[Any]]]] = []
+    for _, seq, source, host, host_keys in gathered:
+        root = find_root(parent, host_keys[0])
+        if root not in roots:
+            roots[root] = len(kept) + len(components)
+            components.append({})
+        component = roots[root]
+        for key in host_keys:
+            new_keys[key] = component
+        new_record_components[source][seq] = component
+        components[component - len(kept)].setdefault(source, []).append([seq, host])
+
+    # Kept lines are in address order and equal addresses never span
+    # components, so a stable sort with the recomputed hosts reproduces the
+    # full consolidation's order (addresses are stored as their ip_key, or
+    # as text when unparseable)
+    lines: list[tuple[tuple[int, int | str], int | str, int, str]] = []
+    if state["host_components"]:
+        with open_text(output_jsonl) as f:
+            lines = [
+                ((0, key) if type(key) is int else (1, key), key, renumber[old], line)
+                for old, key, line in zip(
+                    state["host_components"], state["host_addresses"], f
+                )
+                if old in renumber
+            ]
+    for host in recomputed:
+        component = roots[find_root(parent, identity_keys(host)[0])]
+        sort_key = address_sort_key(host["ip"])
+        lines.append((sort_key, sort_key[1], component, json.dumps(host) + "\n"))
+    lines.sort(key=lambda item: item[0])
+
+    partial_jsonl = output_jsonl.with_name(f".{output_jsonl.name}")
+    with open_text(partial_jsonl, "w") as f:
+        f.writelines(item[3] for item in lines)
+
+    partial_contributions = contributions_file.with_name(
+        f".{contributions_file.name}"
+    )
+    with open_text(partial_contributions, "w") as f:
+        f.writelines(line for _, line in kept)
+        f.writelines(json.dumps(records) + "\n" for records in components)
+
+    os.replace(partial_jsonl, output_jsonl)
+    os.replace(partial_contributions, contributions_file)
+    write_vlans_jsonl(vlan_list, output_jsonl)
+
+    # Write manifest last so an interrupted run starts over
+    manifest_file.write_text(
+        json.dumps(
+            {
+                "version": INCREMENTAL_VERSION,
+                "files": entries,
+                "order": order,
+                "inventory": file_signature(output_jsonl),
+                "oui": file_signature(DEFAULT_TABLE),
+                "components": len(kept) + len(components),
+                "keys": new_keys,
+                "digests": new_digests,
+                "record_components": new_record_components,
+                "host_components": [item[2] for item in lines],
+                "host_addresses": [item[1] for item in lines],
+                "vlans": source_vlans,
+                "vlans_digest": vlans_digest,
+            },
+            separators=(",", ":"),
+        )
+    )
+
+    summary = {"hosts": len(lines), "recomputed": len(recomputed)}
+    return summary, [sources[source] for source in order if source in changed]
+
+
+DIFF_FIELDS = ["ip", "mac", "hostname", "os"]
+
+# Fields compared by identity, so a respelled MAC or IPv6 address is no change
+IDENTITY_FIELDS = {"ip": ip_key, "mac": mac_key}
+
+
+def host_key(host: dict[str, Any]) -> str:
+    """Identity key matching consolidate(): MAC first, IP as fallback"""
+    if host.get("mac"):
+        return f"mac:{host['mac']}"
+    return f"ip:{host.get('ip', '')}"
 
-        for raw_host in hosts:
-            # Normalize to unified format
-            host = normalize_host(raw_host, str(filepath))
-            mac = host.get("mac", "")
-            ip = host.get("ip", "")
 
-            if not ip:
+def diff_host(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Per-field changes between two records of the same host"""
+    changes: dict[str, Any] = {}
+
+    for field in DIFF_FIELDS:
+        old_value, new_value = old.get(field, ""), new.get(field, "")
+        if old_value == new_value:
+            continue
+        identity = IDENTITY_FIELDS.get(field)
+        if identity and old_value and new_value:
+            if identity(old_value) == identity(new_value):
                 continue
+        changes[field] = {"old": old_value, "new": new_value}
 
-            # Prefer MAC-based deduplication
-            if mac:
-                if mac in by_mac:
-                    by_mac[mac] = merge_host_data(by_mac[mac], host)
-                else:
-                    by_mac[mac] = host
+    old_services = set(old.get("services", []))
+    new_services = set(new.get("services", []))
+    if old_services != new_services:
+        changes["services"] = {
+            "added": sorted(new_services - old_services),
+            "removed": sorted(old_services - new_services),
+        }
 
-                # Also track by IP for cross-referencing
-                by_ip[ip] = by_mac[mac]
-            else:
-                # No MAC, fallback to IP-based deduplication
-                if ip in by_ip:
-                    merged = merge_host_data(by_ip[ip], host)
-                    by_ip[ip] = merged
-
-                    # If this IP was from a MAC-based host, update by_mac too
-                    for existing_mac, existing_host in by_mac.items():
-                        if existing_host.get("ip") == ip:
-                            by_mac[existing_mac] = merged
-                            break
-                else:
-                    by_ip[ip] = host
-
-    # Combine MAC-based and IP-only hosts
-    seen_ips = set()
-    inventory = []
-
-    # Add all MAC-based hosts first
-    for host in by_mac.values():
-        inventory.append(host)
-        seen_ips.add(host["ip"])
-
-    # Add IP-only hosts that weren't in by_mac
-    for ip, host in by_ip.items():
-        if ip not in seen_ips:
-            inventory.append(host)
+    old_meta = old.get("metadata", {})
+    new_meta = new.get("metadata", {})
+    meta_changes = {
+        key: {"old": old_meta.get(key), "new": new_meta.get(key)}
+        for key in old_meta.keys() | new_meta.keys()
+        if old_meta.get(key) != new_meta.get(key)
+    }
+    if meta_changes:
+        changes["metadata"] = dict(sorted(meta_changes.items()))
 
-    # Sort by IP address
-    def ip_sort_key(host: dict[str, Any]) -> tuple:
-        try:
-            return tuple(map(int, host["ip"].split(".")))
-        except (ValueError, AttributeError):
-            return (999, 999, 999, 999)
+    return changes
 
-    inventory.sort(key=ip_sort_key)
 
-    # Sort VLANs by VLAN ID
-    def vlan_sort_key(vlan: dict[str, Any]) -> int:
-        return vlan.get("vlan_id", 9999)
+def diff_inventories(
+    old_hosts: list[dict[str, Any]], new_hosts: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Single-pass change set between two inventories
+
+    Hosts are matched by MAC, then by IP, through the same mac_key / ip_key
+    identities HostIndex uses, so a MAC or IPv6 address spelled differently
+    between runs is still the same host. An IP match is rejected when both
+    records carry different MACs, since that is a reassigned address rather
+    than the same device.
+    """
+    new_by_mac: dict[int | str, int] = {}
+    new_by_ip: dict[int | str, int] = {}
+    for position, host in enumerate(new_hosts):
+        if host.get("mac"):
+            new_by_mac[mac_key(host["mac"])] = position
+        if host.get("ip"):
+            new_by_ip.setdefault(ip_key(host["ip"]), position)
+
+    matched: set[int] = set()
+    removed = []
+    changed = []
+
+    for old in old_hosts:
+        position = new_by_mac.get(mac_key(old["mac"])) if old.get("mac") else None
+
+        if position is None and old.get("ip"):
+            candidate = new_by_ip.get(ip_key(old["ip"]))
+            if candidate is not None and candidate not in matched:
+                candidate_mac = new_hosts[candidate].get("mac")
+                if not (old.get("mac") and candidate_mac):
+                    position = candidate
+
+        if position is None or position in matched:
+            removed.append(old)
+            continue
 
-    vlan_list = sorted(vlans.values(), key=vlan_sort_key)
+        matched.add(position)
+        new = new_hosts[position]
+        changes = diff_host(old, new)
+        if changes:
+            changed.append(
+                {
+                    "key": host_key(new),
+                    "ip": new.get("ip", ""),
+                    "hostname": new.get("hostname", ""),
+                    "changes": changes,
+                }
+            )
 
-    return {"hosts": inventory, "vlans": vlan_list}
+    added = [host for position, host in enumerate(new_hosts) if position not in matched]
+
+    return {
+        "summary": {
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "unchanged": len(matched) - len(changed),
+        },
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+    }
+
+
+def write_jsonl(records: list[dict[str, Any]], output: Path) -> None:
+    """Write one record per line, gzip-compressed for `.gz` paths"""
+    with open_text(output, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def write_vlans_jsonl(vlans: list[dict[str, Any]], output_jsonl: Path) -> None:
+    """Write VLANs to the inventory's companion file
+
+    A companion left by an earlier run is removed when there are no VLANs,
+    so report.py and topology.py never pick up stale names.
+    """
+    vlans_jsonl = companion_path(output_jsonl, "vlans")
+    if vlans:
+        write_jsonl(vlans, vlans_jsonl)
+    else:
+        vlans_jsonl.unlink(missing_ok=True)
+
+
+def write_inventory_jsonl(result: dict[str, Any], output_jsonl: Path) -> None:
+    """Write hosts to the JSONL inventory and VLANs to its companion file"""
+    write_jsonl(result["hosts"], output_jsonl)
+    write_vlans_jsonl(result["vlans"], output_jsonl)
+
+
+def main_stream(args: list[str]) -> None:
+    """--stream <output-jsonl> <discovery-file ...>: JSONL output only"""
+    if len(args) < 2:
+        print("ERROR: Missing arguments")
+        print(
+            "Usage: consolidate.py --stream <output-jsonl> <discovery-file1.jsonl[.gz]> [...]"
+        )
+        sys.exit(1)
+
+    output_jsonl = Path(args[0])
+    result = consolidate([Path(arg) for arg in args[1:]])
+
+    write_inventory_jsonl(result, output_jsonl)
+    print(f"Consolidated {len(result['hosts'])} hosts")
+    print(f"JSONL: {output_jsonl}")
+    if result["vlans"]:
+        print(f"VLANs: {companion_path(output_jsonl, 'vlans')}")
+
+
+def main_incremental(args: list[str]) -> None:
+    """--incremental <output-jsonl> <discovery-file ...>: merge only changes"""
+    if len(args) < 2:
+        print("ERROR: Missing arguments")
+        print(
+            "Usage: consolidate.py --incremental <output-jsonl> <discovery-file1.json> [...]"
+        )
+        sys.exit(1)
+
+    output_jsonl = Path(args[0])
+    summary, applied = consolidate_incremental(
+        output_jsonl, [Path(arg) for arg in args[1:]]
+    )
+
+    print(f"Consolidated {summary['hosts']} hosts")
+    print(f"Recomputed {summary['recomputed']} hosts")
+    print(f"Applied {len(applied)} changed discovery files")
+    for filepath in applied:
+        print(f"  - {filepath}")
+    print(f"JSONL: {output_jsonl}")
+    print(f"Manifest: {manifest_path(output_jsonl)}")
+
+
+def main_diff(args: list[str]) -> None:
+    """diff <old.jsonl> <new.jsonl>: print the change set as JSON"""
+    if len(args) != 2:
+        print("Usage: consolidate.py diff <old.jsonl> <new.jsonl>", file=sys.stderr)
+        sys.exit(1)
+
+    old_path, new_path = Path(args[0]), Path(args[1])
+    for path in (old_path, new_path):
+        if not path.exists():
+            print(f"ERROR: Inventory not found: {path}", file=sys.stderr)
+            sys.exit(1)
+
+    result = diff_inventories(
+        list(iter_discovery_records(old_path)), list(iter_discovery_records(new_path))
+    )
+    print(json.dumps(result, indent=2))
 
 
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "diff":
+        main_diff(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--stream":
+        main_stream(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--incremental":
+        main_incremental(sys.argv[2:])
+        return
+
     if len(sys.argv) < 3:
         print("ERROR: Missing arguments")
         print(
             "Usage: consolidate.py <output-json> <output-jsonl> <discovery-file1.json> [discovery-file2.json ...]"
         )
+        print(
+            "       (a directory argument is parsed as raw manual exports, see manual.py)"
+        )
+        print(
+            "       consolidate.py --stream <output-jsonl> <discovery-file1.jsonl[.gz]> [...]"
+        )
+        print(
+            "       consolidate.py --incremental <output-jsonl> <discovery-file1.json> [...]"
+        )
+        print("       consolidate.py diff <old.jsonl> <new.jsonl>")
         sys.exit(1)
 
     output_json = Path(sys.argv[1])
@@ -247,14 +1141,15 @@ def main() -> None:
     with open(output_json, "w") as f:
         json.dump(result, f, indent=2)
 
-    # Write JSONL (one host per line)
-    with open(output_jsonl, "w") as f:
-        for host in result.get("hosts", []):
-            f.write(json.dumps(host) + "\n")
+    # Write JSONL (one host per line) plus the VLAN companion read by
+    # report.py and topology.py
+    write_inventory_jsonl(result, output_jsonl)
 
     print(f"Consolidated {len(result.get('hosts', []))} hosts")
     print(f"JSON: {output_json}")
     print(f"JSONL: {output_jsonl}")
+    if result["vlans"]:
+        print(f"VLANs: {companion_path(output_jsonl, 'vlans')}")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 #!/bin/bash
-# dns-enum.sh - DNS enumeration and zone transfer
+# dns-enum.sh - DNS zone transfer (AXFR)
+# For resolvers that refuse transfers, use dns_enum.py (PTR/A enumeration)
 
 set -uo pipefail
 
@@ -12,6 +13,12 @@ if [ -z "$DNS_SERVER" ]; then
     exit 1
 fi
 
+# Time the run as a "dns-axfr" stage when HOMENET_METRICS is set (metrics.py)
+if [ -n "${HOMENET_METRICS:-}" ] && [ -z "${HOMENET_METRICS_WRAPPED:-}" ]; then
+    SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+    exec python3 "$SCRIPT_DIR/metrics.py" run dns-axfr -- bash "$0" "$@"
+fi
+
 # If no domain specified, try to detect from system
 if [ -z "$DOMAIN" ]; then
     DOMAIN=$(dnsdomainname 2>/dev/null || hostname -d 2>/dev/null || echo "")
@@ -22,8 +29,9 @@ if [ -z "$DOMAIN" ]; then
     exit 1
 fi
 
-# Test DNS server connectivity
-if ! dig @"$DNS_SERVER" google.com +short +timeout=2 >/dev/null 2>&1; then
+# Test DNS server connectivity with the domain's own SOA, so air-gapped
+# resolvers without upstream access still pass
+if ! dig @"$DNS_SERVER" "$DOMAIN" SOA +short +timeout=2 +tries=1 >/dev/null 2>&1; then
     echo "ERROR: Cannot reach DNS server $DNS_SERVER"
     exit 1
 fi
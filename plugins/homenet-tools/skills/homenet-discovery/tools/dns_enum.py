@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+dns_enum.py - Concurrent reverse and forward DNS enumeration
+
+Works where zone transfers are refused: sends PTR queries for every address
+in the configured subnets and A (optionally AAAA) queries for candidate
+hostnames under each domain, many at a time over one UDP socket with
+asyncio. Queries are plain RFC 1035 packets, so any resolver works,
+including a local stand-in server on another port. Records are streamed to
+stdout as JSONL in the discovery-dns format ({hostname, ip}).
+"""
+
+import asyncio
+import ipaddress
+import json
+import random
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+import metrics
+
+DEFAULT_CONCURRENCY = 256
+DEFAULT_TIMEOUT = 1.0  # seconds per attempt
+DEFAULT_RETRIES = 1
+DNS_PORT = 53
+
+TYPE_A = 1
+TYPE_CNAME = 5
+TYPE_PTR = 12
+TYPE_AAAA = 28
+CLASS_IN = 1
+RCODE_NXDOMAIN = 3
+
+# Common homelab names tried under every domain in addition to --names
+CANDIDATE_NAMES = """
+    router gateway gw firewall fw opnsense pfsense switch ap unifi controller
+    nas storage truenas synology pve proxmox pve1 pve2 pve3 esxi vcenter
+    dns ns ns1 ns2 pihole adguard dhcp ntp proxy traefik nginx caddy web www
+    mail git gitea gitlab jenkins ci registry docker k8s kube db postgres
+    mysql redis grafana prometheus monitor homeassistant ha hass mqtt plex
+    jellyfin media backup vpn wireguard printer camera nvr desktop laptop
+    server server1 server2 vm dev test
+""".split()
+
+
+def encode_name(name: str) -> bytes:
+    """Wire-format labels of a name; ValueError if it cannot be queried"""
+    labels = []
+    for part in name.strip(".").split("."):
+        try:
+            label = part.encode("idna")
+        except UnicodeError as e:
+            raise ValueError(f"bad label {part!r}: {e}") from None
+        if not 0 < len(label) <= 63:
+            raise ValueError(f"label {part!r} must be 1-63 characters")
+        labels.append(bytes([len(label)]) + label)
+    encoded = b"".join(labels)
+    if len(encoded) > 254:
+        raise ValueError("name longer than 253 characters")
+    return encoded
+
+
+def valid_name(name: str) -> bool:
+    try:
+        encode_name(name)
+    except ValueError:
+        return False
+    return True
+
+
+def build_query(qid: int, name: str, qtype: int) -> bytes:
+    """A recursive single-question query packet"""
+    header = struct.pack(">HHHHHH", qid, 0x0100, 1, 0, 0, 0)
+    return header + encode_name(name) + b"\0" + struct.pack(">HH", qtype, CLASS_IN)
+
+
+def read_name(data: bytes, offset: int) -> tuple[str, int]:
+    """Decode a possibly compressed name; returns (name, offset after it)"""
+    labels: list[str] = []
+    end = None
+    for _ in range(128):  # bounds pointer loops in malformed packets
+        if offset >= len(data):
+            raise ValueError("name runs past end of packet")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data):
+                raise ValueError("truncated name pointer")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        if length == 0:
+            return ".".join(labels), end if end is not None else offset + 1
+        labels.append(data[offset + 1 : offset + 1 + length].decode("ascii", "replace"))
+        offset += 1 + length
+    raise ValueError("name pointer loop")
+
+
+def parse_response(data: bytes) -> tuple[int, int, str, list[tuple[int, str]]]:
+    """(id, rcode, question name, [(type, value)]) of a response packet
+
+    A/AAAA values are addresses, PTR/CNAME values names; other record types
+    are skipped. Raises ValueError for anything that is not a response.
+    """
+    if len(data) < 12:
+        raise ValueError("short packet")
+    qid, flags, qdcount, ancount, _, _ = struct.unpack(">HHHHHH", data[:12])
+    if not flags & 0x8000:
+        raise ValueError("not a response")
+
+    offset = 12
+    question = ""
+    for _ in range(qdcount):
+        question, offset = read_name(data, offset)
+        offset += 4
+
+    answers = []
+    for _ in range(ancount):
+        _, offset = read_name(data, offset)
+        if offset + 10 > len(data):
+            raise ValueError("truncated answer")
+        rtype, _, _, rdlength = struct.unpack(">HHIH", data[offset : offset + 10])
+        offset += 10
+        rdata = data[offset : offset + rdlength]
+        if rtype == TYPE_A and rdlength == 4:
+            answers.append((rtype, str(ipaddress.IPv4Address(rdata))))
+        elif rtype == TYPE_AAAA and rdlength == 16:
+            answers.append((rtype, str(ipaddress.IPv6Address(rdata))))
+        elif rtype in (TYPE_PTR, TYPE_CNAME):
+            answers.append((rtype, read_name(data, offset)[0]))
+        offset += rdlength
+
+    return qid, flags & 0x000F, question, answers
+
+
+class DnsClient(asyncio.DatagramProtocol):
+    """Many outstanding queries over one UDP socket, matched by query id"""
+
+    def __init__(self, timeout: float, retries: int) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.transport: asyncio.DatagramTransport | None = None
+        self.pending: dict[int, tuple[str, asyncio.Future]] = {}
+        self.stats = {"queries": 0, "answered": 0, "nxdomain": 0, "timeouts": 0}
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        try:
+            qid, rcode, question, answers = parse_response(data)
+        except ValueError:
+            return
+        entry = self.pending.get(qid)
+        # Ignore stray or late replies that do not answer the pending question
+        if entry is None or entry[0] != question.lower():
+            return
+        del self.pending[qid]
+        if not entry[1].done():
+            entry[1].set_result((rcode, answers))
+
+    def error_received(self, exc: Exception) -> None:
+        # ICMP errors (e.g. port unreachable) surface as timeouts per query
+        pass
+
+    def new_id(self) -> int:
+        while True:
+            qid = random.randrange(0x10000)
+            if qid not in self.pending:
+                return qid
+
+    async def query(self, name: str, qtype: int) -> list[tuple[int, str]]:
+        """Answers for one question; empty on NXDOMAIN, error or timeout"""
+        loop = asyncio.get_running_loop()
+        question = name.strip(".").lower()
+
+        for _ in range(self.retries + 1):
+            qid = self.new_id()
+            future = loop.create_future()
+            self.pending[qid] = (question, future)
+            self.stats["queries"] += 1
+            self.transport.sendto(build_query(qid, question, qtype))
+            try:
+                rcode, answers = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.pending.pop(qid, None)
+                continue
+            if rcode == RCODE_NXDOMAIN:
+                self.stats["nxdomain"] += 1
+            elif rcode == 0:
+                self.stats["answered"] += 1
+                return answers
+            return []
+
+        self.stats["timeouts"] += 1
+        return []
+
+
+def parse_server(server: str) -> tuple[str, int]:
+    """(host, port) from IP, IP:PORT or [IPv6]:PORT"""
+    if server.startswith("["):
+        host, _, port = server[1:].partition("]:")
+        return host.rstrip("]"), int(port) if port else DNS_PORT
+    if server.count(":") == 1:
+        host, port = server.split(":")
+        return host, int(port)
+    return server, DNS_PORT
+
+
+def system_resolver() -> str | None:
+    """First nameserver in /etc/resolv.conf"""
+    try:
+        with open("/etc/resolv.conf") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    return parts[1]
+    except OSError:
+        pass
+    return None
+
+
+def candidate_names(names: Iterable[str], domains: list[str]) -> list[str]:
+    """Fully qualified candidates: each name under each domain, plus FQDNs as given
+
+    Names that cannot be encoded in a query (empty or over-long labels,
+    invalid IDNA) are skipped with a warning.
+    """
+    fqdns: dict[str, None] = {}
+    for name in names:
+        name = name.strip().strip(".").lower()
+        if not name or name.startswith("#"):
+            continue
+        candidates = [name] if "." in name else []
+        candidates += [f"{name}.{domain.strip('.').lower()}" for domain in domains]
+        for fqdn in candidates:
+            try:
+                encode_name(fqdn)
+            except ValueError as e:
+                print(f"WARNING: skipping name {fqdn!r}: {e}", file=sys.stderr)
+                continue
+            fqdns[fqdn] = None
+    return list(fqdns)
+
+
+async def run_workers(
+    jobs: Iterator[Any], worker: Callable[[Any], Any], concurrency: int
+) -> None:
+    """Drain a shared job iterator with `concurrency` coroutines"""
+
+    async def drain() -> None:
+        for job in jobs:
+            await worker(job)
+
+    await asyncio.gather(*(drain() for _ in range(concurrency)))
+
+
+async def enumerate_dns(
+    server: tuple[str, int],
+    subnets: list[ipaddress.IPv4Network],
+    names: list[str],
+    domains: list[str],
+    emit: Callable[[dict[str, str]], None],
+    aaaa: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+) -> dict[str, int]:
+    """PTR sweep of `subnets`, then forward lookups of candidate names
+
+    Names learned from PTR answers are looked up forward as well. Each
+    distinct {hostname, ip} record is passed to `emit` once. Returns query
+    statistics.
+    """
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(
+        lambda: DnsClient(timeout, retries), remote_addr=server
+    )
+    seen: set[tuple[str, str]] = set()
+
+    def record(hostname: str, ip: str) -> None:
+        key = (hostname.strip(".").lower(), ip)
+        if key[0] and key not in seen:
+            seen.add(key)
+            emit({"hostname": key[0], "ip": ip})
+
+    learned: dict[str, None] = {}
+
+    async def reverse(ip: ipaddress.IPv4Address) -> None:
+        for rtype, value in await client.query(ip.reverse_pointer, TYPE_PTR):
+            if rtype == TYPE_PTR:
+                record(value, str(ip))
+                learned[value.strip(".").lower()] = None
+
+    qtypes = [TYPE_A, TYPE_AAAA] if aaaa else [TYPE_A]
+
+    async def forward(job: tuple[str, int]) -> None:
+        name, qtype = job
+        for rtype, value in await client.query(name, qtype):
+            if rtype in (TYPE_A, TYPE_AAAA):
+                record(name, value)
+
+    try:
+        addresses = (ip for subnet in subnets for ip in subnet.hosts())
+        await run_workers(addresses, reverse, concurrency)
+
+        candidates = candidate_names(names, domains)
+        known = set(candidates)
+        candidates += [
+            name for name in learned if name not in known and valid_name(name)
+        ]
+        lookups = ((name, qtype) for name in candidates for qtype in qtypes)
+        await run_workers(lookups, forward, concurrency)
+    finally:
+        transport.close()
+
+    return {**client.stats, "records": len(seen)}
+
+
+def usage() -> None:
+    print(
+        "Usage: dns_enum.py [--server IP[:PORT]] [--subnet CIDR ...]"
+        " [--domain DOMAIN ...] [--names FILE] [--aaaa]",
+        file=sys.stderr,
+    )
+    print(
+        "                   [--concurrency N] [--timeout SECONDS] [--retries N]",
+        file=sys.stderr,
+    )
+    print(
+        "Example: dns_enum.py --server 192.168.1.1 --subnet 192.168.1.0/24"
+        " --domain home.lab",
+        file=sys.stderr,
+    )
+    print("Default server: first nameserver in /etc/resolv.conf", file=sys.stderr)
+    sys.exit(1)
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    server = None
+    subnets: list[ipaddress.IPv4Network] = []
+    domains: list[str] = []
+    names = list(CANDIDATE_NAMES)
+    aaaa = False
+    concurrency = DEFAULT_CONCURRENCY
+    timeout = DEFAULT_TIMEOUT
+    retries = DEFAULT_RETRIES
+
+    try:
+        while args:
+            option = args.pop(0)
+            if option == "--aaaa":
+                aaaa = True
+                continue
+            value = args.pop(0)
+            if option == "--server":
+                server = parse_server(value)
+            elif option == "--subnet":
+                subnets.append(ipaddress.IPv4Network(value, strict=False))
+            elif option == "--domain":
+                domains.append(value)
+            elif option == "--names":
+                names += Path(value).read_text().split()
+            elif option == "--concurrency":
+                concurrency = max(1, int(value))
+            elif option == "--timeout":
+                timeout = float(value)
+            elif option == "--retries":
+                retries = max(0, int(value))
+            else:
+                usage()
+    except (IndexError, ValueError, OSError) as e:
+        if not isinstance(e, IndexError):
+            print(f"ERROR: {e}", file=sys.stderr)
+        usage()
+
+    if server is None:
+        resolver = system_resolver()
+        if resolver is None:
+            print("ERROR: No --server given and no resolver found", file=sys.stderr)
+            sys.exit(1)
+        server = (resolver, DNS_PORT)
+
+    if not subnets and not domains:
+        usage()
+
+    def emit(record: dict[str, str]) -> None:
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+    with metrics.stage("dns-enum", subnets=len(subnets)) as fields:
+        stats = asyncio.run(
+            enumerate_dns(
+                server,
+                subnets,
+                names,
+                domains,
+                emit,
+                aaaa=aaaa,
+                concurrency=concurrency,
+                timeout=timeout,
+                retries=retries,
+            )
+        )
+        fields.update(stats, hosts=stats["records"])
+
+    print(
+        f"DNS {server[0]}:{server[1]}: {stats['records']} records from "
+        f"{stats['queries']} queries ({stats['answered']} answered, "
+        f"{stats['nxdomain']} NXDOMAIN, {stats['timeouts']} timed out)",
+        file=sys.stderr,
+    )
+    if stats["queries"] and not stats["answered"] + stats["nxdomain"]:
+        print(f"ERROR: No replies from DNS server {server[0]}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
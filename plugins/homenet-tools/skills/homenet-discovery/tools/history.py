@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+history.py - Append-only inventory history with point-in-time queries
+
+Each consolidated inventory is recorded as a run in a SQLite database.
+Only per-host deltas are stored: a full record when a host first appears,
+changed fields when it changes, and a marker when it disappears. Unchanged
+hosts cost nothing, so the store stays small over many update runs.
+
+Host state at any recorded time is rebuilt by replaying that host's deltas.
+"""
+
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from consolidate import host_key, is_vlan_record, iter_discovery_records
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    hosts INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    removed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    host_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    delta TEXT
+);
+CREATE INDEX IF NOT EXISTS events_by_host ON events(host_key, run_id);
+CREATE INDEX IF NOT EXISTS events_by_run ON events(run_id);
+CREATE TABLE IF NOT EXISTS aliases (
+    value TEXT NOT NULL,
+    host_key TEXT NOT NULL,
+    PRIMARY KEY (value, host_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS current (
+    host_key TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Fields a host can be looked up by in `history.py host`
+ALIAS_FIELDS = ("ip", "mac", "hostname")
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def encode(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), sort_keys=True)
+
+
+def parse_time(value: str) -> float:
+    """Unix seconds or ISO 8601 (naive times are taken as UTC)"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+
+def host_delta(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Minimal change set turning old into new (empty when identical)
+
+    Services and metadata are diffed by member so a single new port or
+    metadata key does not rewrite the whole field.
+    """
+    delta: dict[str, Any] = {}
+
+    fields = {
+        key: value
+        for key, value in new.items()
+        if key not in ("services", "metadata") and old.get(key) != value
+    }
+    if fields:
+        delta["set"] = fields
+
+    unset = [
+        key for key in old if key not in new and key not in ("services", "metadata")
+    ]
+    if unset:
+        delta["unset"] = sorted(unset)
+
+    old_services = set(old.get("services", []))
+    new_services = set(new.get("services", []))
+    if new_services - old_services:
+        delta["services_added"] = sorted(new_services - old_services)
+    if old_services - new_services:
+        delta["services_removed"] = sorted(old_services - new_services)
+
+    old_meta = old.get("metadata", {})
+    new_meta = new.get("metadata", {})
+    meta_set = {
+        key: value for key, value in new_meta.items() if old_meta.get(key) != value
+    }
+    if meta_set:
+        delta["metadata_set"] = meta_set
+    meta_unset = [key for key in old_meta if key not in new_meta]
+    if meta_unset:
+        delta["metadata_unset"] = sorted(meta_unset)
+
+    return delta
+
+
+def apply_delta(state: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    """Inverse of host_delta(): returns the updated state"""
+    state = {**state, **delta.get("set", {})}
+    for key in delta.get("unset", []):
+        state.pop(key, None)
+
+    if "services_added" in delta or "services_removed" in delta:
+        services = set(state.get("services", []))
+        services |= set(delta.get("services_added", []))
+        services -= set(delta.get("services_removed", []))
+        state["services"] = sorted(services)
+
+    if "metadata_set" in delta or "metadata_unset" in delta:
+        metadata = {**state.get("metadata", {}), **delta.get("metadata_set", {})}
+        for key in delta.get("metadata_unset", []):
+            metadata.pop(key, None)
+        state["metadata"] = metadata
+
+    return state
+
+
+def aliases(key: str, host: dict[str, Any]) -> Iterable[tuple[str, str]]:
+    for field in ALIAS_FIELDS:
+        if host.get(field):
+            yield host[field], key
+
+
+def record_run(
+    conn: sqlite3.Connection,
+    hosts: Iterable[dict[str, Any]],
+    recorded_at: float,
+    source: str = "",
+) -> dict[str, Any]:
+    """Append one inventory snapshot as per-host deltas against the last run
+
+    Hosts are identified like consolidate.py: by MAC, falling back to IP.
+    Returns the run summary.
+    """
+    last = conn.execute("SELECT MAX(recorded_at) FROM runs").fetchone()[0]
+    if last is not None and recorded_at < last:
+        raise ValueError(
+            f"snapshot time {format_time(recorded_at)} is before the latest run "
+            f"({format_time(last)})"
+        )
+
+    previous = {
+        key: json.loads(state)
+        for key, state in conn.execute("SELECT host_key, state FROM current")
+    }
+    snapshot = {host_key(host): host for host in hosts}
+
+    events = []
+    for key, host in snapshot.items():
+        old = previous.get(key)
+        if old is None:
+            events.append((key, "added", encode(host)))
+            continue
+        delta = host_delta(old, host)
+        if delta:
+            events.append((key, "changed", encode(delta)))
+    for key in previous.keys() - snapshot.keys():
+        events.append((key, "removed", None))
+
+    counts = {kind: 0 for kind in ("added", "changed", "removed")}
+    for _, kind, _ in events:
+        counts[kind] += 1
+
+    with conn:
+        run_id = conn.execute(
+            "INSERT INTO runs (recorded_at, source, hosts, added, changed, removed)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (recorded_at, source, len(snapshot), *counts.values()),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO events (run_id, host_key, kind, delta) VALUES (?, ?, ?, ?)",
+            [(run_id, *event) for event in events],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO aliases (value, host_key) VALUES (?, ?)",
+            [
+                alias
+                for key, kind, _ in events
+                if kind != "removed"
+                for alias in aliases(key, snapshot[key])
+            ],
+        )
+        conn.executemany(
+            "DELETE FROM current WHERE host_key = ?",
+            [(key,) for key, kind, _ in events if kind == "removed"],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO current (host_key, state) VALUES (?, ?)",
+            [
+                (key, encode(snapshot[key]))
+                for key, kind, _ in events
+                if kind != "removed"
+            ],
+        )
+
+    return {
+        "run_id": run_id,
+        "recorded_at": format_time(recorded_at),
+        "hosts": len(snapshot),
+        **counts,
+    }
+
+
+def replay(rows: Iterable[tuple[str, str | None]]) -> dict[str, Any] | None:
+    """Fold (kind, delta) events in run order into a host state"""
+    state = None
+    for kind, delta in rows:
+        if kind == "added":
+            state = json.loads(delta)
+        elif kind == "changed" and state is not None:
+            state = apply_delta(state, json.loads(delta))
+        else:
+            state = None
+    return state
+
+
+def host_state_at(
+    conn: sqlite3.Connection, key: str, timestamp: float
+) -> dict[str, Any] | None:
+    """Host state as of timestamp; None if absent at that time"""
+    return replay(
+        conn.execute(
+            "SELECT e.kind, e.delta FROM events e JOIN runs r ON r.run_id = e.run_id"
+            " WHERE e.host_key = ? AND r.recorded_at <= ? ORDER BY e.run_id",
+            (key, timestamp),
+        )
+    )
+
+
+def host_state_before(
+    conn: sqlite3.Connection, key: str, run_id: int
+) -> dict[str, Any] | None:
+    """Host state just before a run was recorded"""
+    return replay(
+        conn.execute(
+            "SELECT kind, delta FROM events WHERE host_key = ? AND run_id < ?"
+            " ORDER BY run_id",
+            (key, run_id),
+        )
+    )
+
+
+def find_host(
+    conn: sqlite3.Connection, identifier: str, timestamp: float
+) -> list[dict[str, Any]]:
+    """State at timestamp of hosts matching an IP, MAC, hostname or host key"""
+    if identifier.startswith(("mac:", "ip:")):
+        keys = [identifier]
+    else:
+        keys = [
+            row[0]
+            for row in conn.execute(
+                "SELECT host_key FROM aliases WHERE value = ? ORDER BY host_key",
+                (identifier,),
+            )
+        ]
+
+    matches = []
+    for key in keys:
+        state = host_state_at(conn, key, timestamp)
+        if state is None:
+            continue
+        # An alias may belong to another point in time (e.g. a reused IP)
+        if key == identifier or identifier in (state.get(f) for f in ALIAS_FIELDS):
+            matches.append({"key": key, "host": state})
+    return matches
+
+
+def first_seen_since(conn: sqlite3.Connection, timestamp: float) -> list[dict]:
+    """Hosts whose earliest appearance in the history is at or after timestamp"""
+    rows = conn.execute(
+        "SELECT e.host_key, MIN(r.recorded_at) AS first_seen"
+        " FROM events e JOIN runs r ON r.run_id = e.run_id"
+        " WHERE e.kind = 'added' GROUP BY e.host_key"
+        " HAVING first_seen >= ? ORDER BY first_seen, e.host_key",
+        (timestamp,),
+    )
+    return [
+        {"key": key, "first_seen": format_time(first_seen)} for key, first_seen in rows
+    ]
+
+
+def service_churn(conn: sqlite3.Connection, runs: int) -> dict[str, Any]:
+    """Services that appeared or disappeared across the last `runs` runs
+
+    New and vanished hosts count with all of their services.
+    """
+    run_rows = conn.execute(
+        "SELECT run_id, recorded_at FROM runs ORDER BY run_id DESC LIMIT ?", (runs,)
+    ).fetchall()
+    if not run_rows:
+        return {"runs": 0, "added": 0, "removed": 0, "hosts": []}
+
+    oldest = run_rows[-1][0]
+    timestamps = dict(run_rows)
+    changes = []
+
+    rows = conn.execute(
+        "SELECT run_id, host_key, kind, delta FROM events"
+        " WHERE run_id >= ? ORDER BY run_id, host_key",
+        (oldest,),
+    )
+    for run_id, key, kind, delta in rows:
+        if kind == "added":
+            added, removed = json.loads(delta).get("services", []), []
+        elif kind == "changed":
+            delta = json.loads(delta)
+            added = delta.get("services_added", [])
+            removed = delta.get("services_removed", [])
+        else:
+            state = host_state_before(conn, key, run_id)
+            added, removed = [], (state or {}).get("services", [])
+
+        if added or removed:
+            changes.append(
+                {
+                    "run_id": run_id,
+                    "recorded_at": format_time(timestamps[run_id]),
+                    "key": key,
+                    "added": added,
+                    "removed": removed,
+                }
+            )
+
+    return {
+        "runs": len(run_rows),
+        "added": sum(len(change["added"]) for change in changes),
+        "removed": sum(len(change["removed"]) for change in changes),
+        "hosts": changes,
+    }
+
+
+def list_runs(conn: sqlite3.Connection) -> list[dict[str, Any]]:
+    rows = conn.execute(
+        "SELECT run_id, recorded_at, source, hosts, added, changed, removed"
+        " FROM runs ORDER BY run_id"
+    )
+    return [
+        {
+            "run_id": run_id,
+            "recorded_at": format_time(recorded_at),
+            "source": source,
+            "hosts": hosts,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+        }
+        for run_id, recorded_at, source, hosts, added, changed, removed in rows
+    ]
+
+
+def option(args: list[str], name: str, default: str | None = None) -> str | None:
+    """Value following `name` in args (removed from args), or default"""
+    if name in args:
+        position = args.index(name)
+        if position + 1 < len(args):
+            value = args[position + 1]
+            del args[position : position + 2]
+            return value
+    return default
+
+
+def usage() -> None:
+    print("Usage: history.py record <history.db> <inventory.jsonl> [--at TIME]")
+    print("       history.py host <history.db> <ip|mac|hostname> [--at TIME]")
+    print("       history.py new <history.db> --since TIME")
+    print("       history.py churn <history.db> [--runs N]")
+    print("       history.py runs <history.db>")
+    print("TIME is ISO 8601 (e.g. 2024-05-01 or 2024-05-01T12:00:00) or unix seconds")
+    sys.exit(1)
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    if len(args) < 2:
+        usage()
+
+    command, db_path, rest = args[0], Path(args[1]), args[2:]
+
+    try:
+        at = parse_time(option(rest, "--at") or str(time.time()))
+        since = option(rest, "--since")
+        since_time = parse_time(since) if since is not None else None
+        runs = int(option(rest, "--runs", "10"))
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Reject bad invocations before the database file is created
+    arity = {"record": 1, "host": 1, "new": 0, "churn": 0, "runs": 0}
+    if arity.get(command) != len(rest) or (command == "new" and since is None):
+        usage()
+    if command == "record" and not Path(rest[0]).exists():
+        print(f"ERROR: Inventory not found: {rest[0]}", file=sys.stderr)
+        sys.exit(1)
+
+    conn = connect(db_path)
+
+    if command == "record":
+        inventory = Path(rest[0])
+        hosts = (
+            record
+            for record in iter_discovery_records(inventory)
+            if not is_vlan_record(record)
+        )
+        try:
+            result = record_run(conn, hosts, at, str(inventory))
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif command == "host":
+        result = find_host(conn, rest[0], at)
+    elif command == "new":
+        result = first_seen_since(conn, since_time)
+    elif command == "churn":
+        result = service_churn(conn, runs)
+    else:
+        result = list_runs(conn)
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+host_record.py - Compact host record shared by the parsers and consolidate.py
+
+Hosts travel through parsing, normalization and merging as HostRecord
+objects rather than eight-key dicts. Records use __slots__, services are a
+set merged in place, and source tags are interned tuples shared between
+every record discovered the same way. Conversion to the unified JSON format
+happens once, at the output boundary, via to_dict().
+"""
+
+import sys
+from typing import Any, Iterable
+
+FIELDS = (
+    "ip",
+    "mac",
+    "hostname",
+    "os",
+    "services",
+    "discovered_by",
+    "metadata",
+    "proxy_routes",
+    "vlan_id",
+)
+
+# One shared tuple per distinct combination of source tags
+_TAG_TUPLES: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+
+def source_tags(tags: Iterable[str]) -> tuple[str, ...]:
+    """Deduplicated, interned discovered_by tags in first-seen order"""
+    key = tuple(dict.fromkeys(tags))
+    cached = _TAG_TUPLES.get(key)
+    if cached is None:
+        cached = _TAG_TUPLES[key] = tuple(sys.intern(tag) for tag in key)
+    return cached
+
+
+def valid_vlan_id(value: Any) -> int | None:
+    """A VLAN ID (1-4094); 0 and other values mean no VLAN"""
+    if isinstance(value, int) and not isinstance(value, bool) and 0 < value < 4095:
+        return value
+    return None
+
+
+class HostRecord:
+    """One host observation in the unified inventory format"""
+
+    __slots__ = FIELDS
+
+    def __init__(
+        self,
+        ip: str = "",
+        mac: str = "",
+        hostname: str = "",
+        os: str = "",
+        services: Iterable[str] = (),
+        discovered_by: Iterable[str] = (),
+        metadata: dict[str, Any] | None = None,
+        proxy_routes: list[Any] | None = None,
+        vlan_id: int | None = None,
+    ) -> None:
+        self.ip = ip or ""
+        self.mac = mac or ""
+        self.hostname = hostname or ""
+        self.os = os or ""
+        self.services: set[str] = set(services)
+        self.discovered_by = source_tags(discovered_by)
+        self.metadata: dict[str, Any] = metadata if metadata is not None else {}
+        self.proxy_routes: list[Any] = proxy_routes if proxy_routes is not None else []
+        self.vlan_id = vlan_id
+
+    @classmethod
+    def from_dict(cls, host: dict[str, Any]) -> "HostRecord":
+        """Build from a unified-format dict (e.g. an inventory JSONL line)"""
+        return cls(
+            ip=host.get("ip", ""),
+            mac=host.get("mac", ""),
+            hostname=host.get("hostname", ""),
+            os=host.get("os", ""),
+            services=host.get("services") or (),
+            discovered_by=host.get("discovered_by") or (),
+            metadata=dict(host.get("metadata") or {}),
+            proxy_routes=list(host.get("proxy_routes") or []),
+            vlan_id=valid_vlan_id(host.get("vlan_id")),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Unified JSON format; services and sources sorted for stable output
+
+        vlan_id is only present once consolidation has placed the host.
+        """
+        host = {
+            "ip": self.ip,
+            "mac": self.mac,
+            "hostname": self.hostname,
+            "os": self.os,
+            "services": sorted(self.services),
+            "discovered_by": sorted(self.discovered_by),
+            "metadata": self.metadata,
+            "proxy_routes": self.proxy_routes,
+        }
+        if self.vlan_id is not None:
+            host["vlan_id"] = self.vlan_id
+        return host
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HostRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in FIELDS)
+
+    def __repr__(self) -> str:
+        return f"HostRecord({self.to_dict()!r})"
+
+
+def to_dicts(hosts: Iterable[HostRecord]) -> list[dict[str, Any]]:
+    """Convert records to unified-format dicts for JSON output"""
+    return [host.to_dict() for host in hosts]
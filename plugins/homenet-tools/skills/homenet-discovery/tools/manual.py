@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+manual.py - Parse a directory of manual exports in one process
+
+Detects each file's type from its content (OPNsense/pfSense config XML,
+Proxmox nodes, cluster resources or per-node guest network JSON, UniFi
+device JSON) and runs the matching parser in-process, so no per-file
+interpreter start or JSON round trip is needed before consolidation.
+Guest network dumps from every node are collected into one vmid index and
+joined onto the Proxmox guests once all files are parsed.
+"""
+
+import json
+import sys
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any
+
+import metrics
+from host_record import HostRecord, to_dicts
+from opnsense import parse_opnsense_stream
+from proxmox import (
+    attach_guest_networks,
+    parse_guest_networks,
+    parse_proxmox_nodes,
+    parse_proxmox_resources,
+)
+from unifi import parse_unifi_devices
+
+# Generated by the pipeline itself, never a manual export
+SKIP_PREFIXES = ("discovery-", "inventory-", "inventory.")
+
+PROXMOX_RESOURCE_TYPES = {"qemu", "lxc", "storage", "pool", "sdn"}
+XML_ROOTS = {"opnsense", "pfsense"}
+
+
+def unwrap(data: Any) -> Any:
+    """Proxmox and UniFi APIs wrap arrays in {"data": [...]}"""
+    if isinstance(data, dict) and "data" in data:
+        return data["data"]
+    return data
+
+
+def detect_json(data: Any, filename: str) -> str | None:
+    """Classify a JSON export by its records, falling back to the filename"""
+    items = unwrap(data)
+    if not isinstance(items, list):
+        return None
+
+    records = [item for item in items if isinstance(item, dict)]
+
+    # Guest entries also carry "type": "qemu"/"lxc", so check them first
+    if records and all(
+        "vmid" in record and "interfaces" in record for record in records
+    ):
+        return "proxmox-guests"
+    if any(record.get("type") in PROXMOX_RESOURCE_TYPES for record in records):
+        return "proxmox-resources"
+    if records and all(
+        "node" in record and record.get("type", "node") == "node"
+        for record in records
+    ):
+        return "proxmox-nodes"
+    if records and all(
+        "mac" in record and ("model" in record or "adopted" in record)
+        for record in records
+    ):
+        return "unifi"
+
+    # Empty exports carry no records to inspect
+    for name in ("proxmox-nodes", "proxmox-resources", "proxmox-guests", "unifi"):
+        if filename.startswith(name):
+            return name
+
+    return None
+
+
+def parse_manual_file(filepath: Path) -> tuple[str | None, dict[str, list]]:
+    """Detect and parse one export; returns (type, {"hosts", "vlans"})
+
+    Hosts are HostRecords, VLANs plain dicts. Proxmox guest network dumps
+    have no hosts of their own; their vmid index is under "guests".
+    """
+    empty: dict[str, list] = {"hosts": [], "vlans": []}
+
+    with open(filepath, "rb") as f:
+        head = f.read(512).lstrip()
+
+        if head.startswith(b"<"):
+            f.seek(0)
+            try:
+                # Peek at the root tag before committing to a full parse
+                _, root = next(ET.iterparse(f, events=("start",)))
+            except (ET.ParseError, StopIteration):
+                return None, empty
+            if root.tag not in XML_ROOTS:
+                return None, empty
+            f.seek(0)
+            try:
+                return "opnsense", parse_opnsense_stream(f)
+            except ET.ParseError as e:
+                print(f"WARNING: {filepath.name}: invalid XML: {e}", file=sys.stderr)
+                return None, empty
+
+        f.seek(0)
+        try:
+            data = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None, empty
+
+    source = detect_json(data, filepath.name)
+    items = unwrap(data)
+
+    if source == "proxmox-nodes":
+        return source, {"hosts": parse_proxmox_nodes(items), "vlans": []}
+    if source == "proxmox-resources":
+        return source, {"hosts": parse_proxmox_resources(items), "vlans": []}
+    if source == "proxmox-guests":
+        return source, {"hosts": [], "vlans": [], "guests": parse_guest_networks(items)}
+    if source == "unifi":
+        return source, {"hosts": parse_unifi_devices(items), "vlans": []}
+
+    return None, empty
+
+
+def parse_manual_dir(directory: Path) -> dict[str, Any]:
+    """Parse every recognized export in a directory (alphabetical order)
+
+    Returns {"hosts", "vlans", "sources"} where sources maps each parsed
+    filename to its detected type.
+    """
+    hosts: list[HostRecord] = []
+    vlans: list[dict[str, Any]] = []
+    sources: dict[str, str] = {}
+    guests: dict[int, dict[str, Any]] = {}
+
+    for filepath in sorted(directory.iterdir()):
+        if not filepath.is_file() or filepath.name.startswith(SKIP_PREFIXES):
+            continue
+        if filepath.suffix not in (".json", ".xml"):
+            continue
+
+        started = time.perf_counter()
+        source, parsed = parse_manual_file(filepath)
+        if source is None:
+            continue
+        if metrics.enabled():
+            metrics.emit(
+                "stage",
+                f"parse-{source}",
+                seconds=round(time.perf_counter() - started, 4),
+                source=filepath.name,
+                bytes=filepath.stat().st_size,
+                hosts=len(parsed["hosts"]),
+            )
+
+        sources[filepath.name] = source
+        hosts.extend(parsed["hosts"])
+        vlans.extend(parsed["vlans"])
+        guests.update(parsed.get("guests", {}))
+
+    if guests:
+        with metrics.stage("join-proxmox-guests", guests=len(guests)) as fields:
+            fields["hosts"] = attach_guest_networks(hosts, guests)
+
+    return {"hosts": hosts, "vlans": vlans, "sources": sources}
+
+
+def main() -> None:
+    if len(sys.argv) != 2:
+        print("Usage: manual.py <manual-drop-directory>", file=sys.stderr)
+        print("Example: manual.py /tmp/homenet", file=sys.stderr)
+        sys.exit(1)
+
+    directory = Path(sys.argv[1])
+    if not directory.is_dir():
+        print(f"ERROR: Not a directory: {directory}", file=sys.stderr)
+        sys.exit(1)
+
+    parsed = parse_manual_dir(directory)
+    parsed["hosts"] = to_dicts(parsed["hosts"])
+    print(json.dumps(parsed, indent=2))
+
+
+if __name__ == "__main__":
+    main()
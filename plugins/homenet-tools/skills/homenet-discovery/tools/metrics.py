@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+metrics.py - Run metrics shared by the discovery and processing tools
+
+Set HOMENET_METRICS to a file path and every instrumented tool appends
+JSONL records to it: stage wall times (nmap sweep and enumeration, SSH
+probes, DNS zone transfers, manual parsers, consolidation), per-host probe
+latency, bytes parsed, and host counts in and out of each merge. With the
+variable unset every hook is a no-op.
+
+Record kinds:
+  stage  {"name", "seconds", ...counts}
+  host   {"name": target, "seconds", "stage", ...}
+  merge  {"name": source, "records_in", "hosts_before", "hosts_after"}
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, IO, Iterator
+
+ENV_VAR = "HOMENET_METRICS"
+# Set by `metrics.py run` so a self-wrapping shell tool is not wrapped twice
+WRAPPED_VAR = "HOMENET_METRICS_WRAPPED"
+
+METRICS_PATH = os.environ.get(ENV_VAR) or None
+TOOL = Path(sys.argv[0]).name if sys.argv and sys.argv[0] else "python"
+
+DEFAULT_TOP = 10
+
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return METRICS_PATH is not None
+
+
+def emit(kind: str, name: str, **fields: Any) -> None:
+    """Append one record to the metrics file (no-op when disabled)"""
+    if METRICS_PATH is None:
+        return
+    record = {"ts": round(time.time(), 3), "tool": TOOL, "kind": kind, "name": name}
+    record.update(fields)
+    line = json.dumps(record) + "\n"
+    # One write per record; O_APPEND keeps lines from concurrent tools whole
+    with _lock, open(METRICS_PATH, "a") as out:
+        out.write(line)
+
+
+def host(target: str, seconds: float, stage: str, **fields: Any) -> None:
+    """Per-host probe latency"""
+    if METRICS_PATH is not None:
+        emit("host", target, seconds=round(seconds, 3), stage=stage, **fields)
+
+
+def merge(source: str, records_in: int, hosts_before: int, hosts_after: int) -> None:
+    """Host counts in and out of merging one source"""
+    if METRICS_PATH is not None:
+        emit(
+            "merge",
+            source,
+            records_in=records_in,
+            hosts_before=hosts_before,
+            hosts_after=hosts_after,
+        )
+
+
+@contextmanager
+def _timed(name: str, fields: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        seconds = round(time.perf_counter() - started, 4)
+        emit("stage", name, seconds=seconds, **fields)
+
+
+def stage(name: str, **fields: Any):
+    """Time a block as a stage
+
+    Yields a dict the block can add counts to (hosts, bytes, ...); they are
+    written with the stage's wall time when the block exits.
+    """
+    if METRICS_PATH is None:
+        return nullcontext(fields)
+    return _timed(name, fields)
+
+
+class CountingReader:
+    """Binary stream wrapper counting the bytes read through it"""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        self.stream = stream
+        self.bytes = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.bytes += len(data)
+        return data
+
+
+def counted(stream: IO[bytes]) -> IO[bytes] | CountingReader:
+    """Wrap a stream for byte counting only when metrics are enabled"""
+    return CountingReader(stream) if METRICS_PATH is not None else stream
+
+
+def bytes_read(stream: Any) -> int | None:
+    return stream.bytes if isinstance(stream, CountingReader) else None
+
+
+def run_command(name: str, command: list[str]) -> int:
+    """Run a command as a stage, passing its stdout through
+
+    Records wall time, exit code, and output bytes and lines; used by shell
+    tools (e.g. dns-enum.sh) that cannot emit records themselves.
+    """
+    env = dict(os.environ, **{WRAPPED_VAR: "1"})
+    with stage(name, command=Path(command[0]).name) as fields:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, env=env)
+        output_bytes = lines = 0
+        for chunk in iter(lambda: process.stdout.read(65536), b""):
+            output_bytes += len(chunk)
+            lines += chunk.count(b"\n")
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        process.stdout.close()
+        fields["exit_code"] = process.wait()
+        fields["bytes"] = output_bytes
+        fields["lines"] = lines
+    return fields["exit_code"]
+
+
+def load_records(path: Path) -> list[dict[str, Any]]:
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A tool killed mid-write leaves at most one partial line
+                continue
+    return records
+
+
+def summarize(records: list[dict[str, Any]], top: int = DEFAULT_TOP) -> str:
+    """Slowest stages and hosts plus merge growth, as plain text"""
+    stages: dict[str, dict[str, Any]] = defaultdict(
+        lambda: {"runs": 0, "seconds": 0.0, "max": 0.0, "bytes": 0, "hosts": 0}
+    )
+    hosts = []
+    merges = []
+
+    for record in records:
+        kind = record.get("kind")
+        if kind == "stage":
+            totals = stages[record["name"]]
+            seconds = record.get("seconds", 0.0)
+            totals["runs"] += 1
+            totals["seconds"] += seconds
+            totals["max"] = max(totals["max"], seconds)
+            totals["bytes"] += record.get("bytes") or 0
+            totals["hosts"] += record.get("hosts") or 0
+        elif kind == "host":
+            hosts.append(record)
+        elif kind == "merge":
+            merges.append(record)
+
+    lines = [f"Slowest stages (of {len(stages)}):"]
+    ranked = sorted(stages.items(), key=lambda item: item[1]["seconds"], reverse=True)
+    lines.append(
+        f"  {'stage':<28} {'runs':>5} {'total s':>9} {'max s':>8}"
+        f" {'hosts':>7} {'MB':>8}"
+    )
+    for name, totals in ranked[:top]:
+        lines.append(
+            f"  {name:<28} {totals['runs']:>5} {totals['seconds']:>9.2f}"
+            f" {totals['max']:>8.2f} {totals['hosts']:>7}"
+            f" {totals['bytes'] / 2**20:>8.2f}"
+        )
+
+    lines += ["", f"Slowest hosts (of {len(hosts)} probes):"]
+    hosts.sort(key=lambda record: record.get("seconds", 0.0), reverse=True)
+    for record in hosts[:top]:
+        status = f" [{record['status']}]" if record.get("status") else ""
+        lines.append(
+            f"  {record['name']:<32} {record.get('seconds', 0.0):>8.2f}s"
+            f"  {record.get('stage', '')}{status}"
+        )
+
+    if merges:
+        lines += ["", "Merges (records in -> hosts before/after):"]
+        for record in merges:
+            lines.append(
+                f"  {record['name']}: {record.get('records_in', 0)} records,"
+                f" {record.get('hosts_before', 0)} -> {record.get('hosts_after', 0)}"
+                " hosts"
+            )
+
+    return "\n".join(lines)
+
+
+def usage() -> None:
+    print("Usage: metrics.py summary <metrics.jsonl> [--top N]", file=sys.stderr)
+    print("       metrics.py run <stage> -- <command> [args ...]", file=sys.stderr)
+    print(file=sys.stderr)
+    print(f"Tools append records when {ENV_VAR}=<metrics.jsonl>", file=sys.stderr)
+    sys.exit(1)
+
+
+def main() -> None:
+    args = sys.argv[1:]
+
+    if len(args) >= 2 and args[0] == "summary":
+        path = Path(args[1])
+        top = DEFAULT_TOP
+        if len(args) == 4 and args[2] == "--top" and args[3].isdigit():
+            top = int(args[3])
+        elif len(args) != 2:
+            usage()
+        if not path.exists():
+            print(f"ERROR: Metrics file not found: {path}", file=sys.stderr)
+            sys.exit(1)
+        print(summarize(load_records(path), top))
+        return
+
+    if len(args) >= 4 and args[0] == "run" and args[2] == "--":
+        sys.exit(run_command(args[1], args[3:]))
+
+    usage()
+
+
+if __name__ == "__main__":
+    main()
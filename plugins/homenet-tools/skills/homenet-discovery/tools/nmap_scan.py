@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+nmap_scan.py - Streaming nmap XML parser and sharded service enumeration
+
+Hosts are parsed from nmap's XML with iterparse and released as soon as
+their <host> element closes, so output starts with the first finished host
+and memory stays flat on large scans.
+"""
+
+import json
+import queue
+import subprocess
+import sys
+import threading
+import xml.etree.ElementTree as ET
+from typing import Any, IO, Iterator
+
+import metrics
+
+ENUMERATE_ARGS = ["-Pn", "-T4", "-n", "-sV", "--top-ports", "1000"]
+ENUMERATE_HOST_TIMEOUT = "3m"
+
+
+def parse_services(host: ET.Element) -> list[str]:
+    """Services on open ports as "name/port (product version)" strings"""
+    services = []
+
+    ports = host.find("ports")
+    if ports is None:
+        return services
+
+    for port in ports.findall("port"):
+        state = port.find("state")
+        if state is None or state.get("state") != "open":
+            continue
+
+        service = port.find("service")
+        if service is None:
+            continue
+
+        svc_name = service.get("name", "unknown")
+        svc_product = service.get("product", "")
+        svc_version = service.get("version", "")
+        port_num = port.get("portid")
+
+        svc_str = f"{svc_name}/{port_num}"
+        if svc_product:
+            svc_str += f" ({svc_product}"
+            if svc_version:
+                svc_str += f" {svc_version}"
+            svc_str += ")"
+
+        services.append(svc_str)
+
+    return services
+
+
+def parse_host(host: ET.Element, mode: str) -> dict[str, Any] | None:
+    """Convert one <host> element; None for down or non-IPv4 hosts"""
+    status = host.find("status")
+    if status is None or status.get("state") != "up":
+        return None
+
+    ipv4 = host.find('address[@addrtype="ipv4"]')
+    if ipv4 is None:
+        return None
+
+    host_data: dict[str, Any] = {"ip": ipv4.get("addr")}
+    if mode == "enumerate":
+        host_data["services"] = []
+
+    mac_elem = host.find('address[@addrtype="mac"]')
+    if mac_elem is not None:
+        host_data["mac"] = mac_elem.get("addr")
+        host_data["vendor"] = mac_elem.get("vendor", "")
+    else:
+        host_data["mac"] = ""
+        host_data["vendor"] = ""
+
+    if mode == "enumerate":
+        host_data["services"] = parse_services(host)
+
+    return host_data
+
+
+def record_host_time(host: ET.Element, mode: str) -> None:
+    """Per-host scan time from nmap's starttime/endtime attributes"""
+    start, end = host.get("starttime"), host.get("endtime")
+    address = host.find('address[@addrtype="ipv4"]')
+    if start and end and address is not None:
+        metrics.host(address.get("addr"), int(end) - int(start), f"nmap-{mode}")
+
+
+def iter_nmap_hosts(stream: IO[bytes], mode: str) -> Iterator[dict[str, Any]]:
+    """Yield hosts from nmap -oX output as each <host> element completes
+
+    A truncated or malformed document (e.g. a killed nmap) ends iteration
+    after the last complete host instead of discarding everything.
+    """
+    root = None
+
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if root is None:
+                root = elem
+                continue
+
+            if event == "end" and elem.tag == "host":
+                host_data = parse_host(elem, mode)
+                if metrics.enabled():
+                    record_host_time(elem, mode)
+                # Drop finished hosts so the tree never grows
+                root.clear()
+                if host_data is not None:
+                    yield host_data
+    except ET.ParseError:
+        return
+
+
+def shard_targets(targets: list[str], shards: int) -> list[list[str]]:
+    """Round-robin targets across at most `shards` non-empty groups"""
+    groups: list[list[str]] = [[] for _ in range(max(1, min(shards, len(targets))))]
+    for position, target in enumerate(targets):
+        groups[position % len(groups)].append(target)
+    return groups
+
+
+def _scan_shard(targets: list[str], results: queue.Queue) -> None:
+    """Run one nmap enumeration worker, feeding hosts into `results`
+
+    A failure to start nmap, or a non-zero exit, is put on the queue as the
+    exception for the consumer to raise.
+    """
+    command = (
+        ["nmap", *ENUMERATE_ARGS, "--host-timeout", ENUMERATE_HOST_TIMEOUT]
+        + targets
+        + ["-oX", "-"]
+    )
+    try:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except OSError as e:
+        results.put(e)
+        return
+
+    stream = metrics.counted(process.stdout)
+    try:
+        with metrics.stage("nmap-enumerate-shard", targets=len(targets)) as fields:
+            fields["hosts"] = 0
+            for host in iter_nmap_hosts(stream, "enumerate"):
+                fields["hosts"] += 1
+                results.put(host)
+            fields["bytes"] = metrics.bytes_read(stream)
+    finally:
+        process.stdout.close()
+        if process.wait():
+            results.put(subprocess.CalledProcessError(process.returncode, command))
+        results.put(None)
+
+
+def enumerate_sharded(targets: list[str], shards: int) -> Iterator[dict[str, Any]]:
+    """Enumerate services with concurrent nmap workers, merged as they finish
+
+    Raises the first worker failure (OSError, CalledProcessError).
+    """
+    groups = shard_targets(targets, shards)
+    results: queue.Queue = queue.Queue()
+
+    for group in groups:
+        threading.Thread(target=_scan_shard, args=(group, results), daemon=True).start()
+
+    remaining = len(groups)
+    while remaining:
+        host = results.get()
+        if host is None:
+            remaining -= 1
+        elif isinstance(host, Exception):
+            raise host
+        else:
+            yield host
+
+
+def write_hosts(hosts: Iterator[dict[str, Any]], jsonl: bool) -> int:
+    """JSONL streams one host per line; JSON keeps the original array format
+
+    Returns the number of hosts written.
+    """
+    if jsonl:
+        count = 0
+        for host in hosts:
+            sys.stdout.write(json.dumps(host) + "\n")
+            sys.stdout.flush()
+            count += 1
+        return count
+
+    host_list = list(hosts)
+    print(json.dumps(host_list, indent=2))
+    return len(host_list)
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    jsonl = "--jsonl" in args
+    args = [arg for arg in args if arg != "--jsonl"]
+
+    if len(args) >= 2 and args[0] == "parse" and args[1] in ("discover", "enumerate"):
+        # nmap streams into the parser, so this stage times the scan itself
+        stream = metrics.counted(sys.stdin.buffer)
+        with metrics.stage(f"nmap-{args[1]}") as fields:
+            fields["hosts"] = write_hosts(iter_nmap_hosts(stream, args[1]), jsonl)
+            fields["bytes"] = metrics.bytes_read(stream)
+        return
+
+    if args and args[0] == "enumerate":
+        shards = 4
+        targets_args = args[1:]
+        if len(targets_args) > 1 and targets_args[0] == "--shards":
+            shards = int(targets_args[1]) if targets_args[1].isdigit() else 0
+            targets_args = targets_args[2:]
+
+        targets = [t for arg in targets_args for t in arg.replace(",", " ").split()]
+        if targets and shards > 0:
+            try:
+                with metrics.stage("nmap-enumerate", shards=shards) as fields:
+                    fields["targets"] = len(targets)
+                    hosts = enumerate_sharded(targets, shards)
+                    fields["hosts"] = write_hosts(hosts, jsonl)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"ERROR: nmap failed: {e}", file=sys.stderr)
+                sys.exit(1)
+            return
+
+    print("Usage: nmap_scan.py parse <discover|enumerate> [--jsonl] < scan.xml")
+    print("       nmap_scan.py enumerate [--shards N] [--jsonl] <ip,ip,...>")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,51 @@
 opnsense.py - Parse OPNsense config XML into host list
 """
 
+import ipaddress
 import sys
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Any
+from typing import List, Dict, Any, IO
 import json
 
+from host_record import HostRecord, to_dicts
+
+# Sections holding the records parse_opnsense_stream() extracts
+CONTAINER_TAGS = ("dhcpd", "hosts", "vlans", "interfaces")
+RECORD_TAGS = ("staticmap", "host", "vlan")
+MISSING = ET.Element("missing")
+
+
+def interface_subnets(fields: Dict[str, Any]) -> List[str]:
+    """CIDRs of an <interfaces> entry's static IPv4 and IPv6 addresses
+
+    Dynamic addressing (dhcp, dhcp6, track6, pppoe) has no subnet to offer.
+    """
+    subnets = []
+    for address, prefix in (("ipaddr", "subnet"), ("ipaddrv6", "subnetv6")):
+        try:
+            network = ipaddress.ip_network(
+                f"{fields.get(address)}/{fields.get(prefix)}", strict=False
+            )
+        except ValueError:
+            continue
+        subnets.append(str(network))
+    return subnets
+
+
+def attach_subnets(
+    vlans: List[Dict[str, Any]], interfaces: Dict[str, List[str]]
+) -> None:
+    """Add `subnets` to each VLAN whose device is an assigned interface
+
+    `interfaces` maps device names (<if>) to their subnets. Older configs
+    have no <vlanif>; their VLAN devices are named "<parent>_vlan<tag>".
+    """
+    for vlan in vlans:
+        device = vlan["vlanif"] or f"{vlan['interface']}_vlan{vlan['vlan_id']}"
+        subnets = interfaces.get(device)
+        if subnets:
+            vlan["subnets"] = subnets
+
 
 def parse_opnsense_vlans(xml_data: str) -> List[Dict[str, Any]]:
     """Parse OPNsense VLAN configuration"""
@@ -19,6 +59,14 @@ def parse_opnsense_vlans(xml_data: str) -> List[Dict[str, Any]]:
         print(f"ERROR: Invalid XML: {e}", file=sys.stderr)
         sys.exit(1)
 
+    interfaces: Dict[str, List[str]] = {}
+    interfaces_container = root.find(".//interfaces")
+    if interfaces_container is not None:
+        for interface in interfaces_container:
+            fields = {child.tag: child.text for child in interface}
+            if fields.get("if"):
+                interfaces.setdefault(fields["if"], interface_subnets(fields))
+
     vlans_container = root.find(".//vlans")
     if vlans_container is not None:
         for vlan in vlans_container.findall("vlan"):
@@ -38,10 +86,11 @@ def parse_opnsense_vlans(xml_data: str) -> List[Dict[str, Any]]:
                 }
                 vlans.append(vlan_info)
 
+    attach_subnets(vlans, interfaces)
     return vlans
 
 
-def parse_opnsense_config(xml_data: str) -> List[Dict[str, Any]]:
+def parse_opnsense_config(xml_data: str) -> List[HostRecord]:
     """Parse OPNsense XML config for network hosts"""
     hosts = []
 
@@ -63,18 +112,16 @@ def parse_opnsense_config(xml_data: str) -> List[Dict[str, Any]]:
                 descr = mapping.find("descr")
 
                 if mac is not None and ip is not None:
-                    host = {
-                        "ip": ip.text,
-                        "mac": mac.text,
-                        "hostname": hostname.text if hostname is not None else "",
-                        "os": "",
-                        "services": [],
-                        "discovered_by": ["manual-opnsense"],
-                        "metadata": {
+                    host = HostRecord(
+                        ip=ip.text,
+                        mac=mac.text,
+                        hostname=hostname.text if hostname is not None else "",
+                        discovered_by=("manual-opnsense",),
+                        metadata={
                             "type": "dhcp-static",
                             "description": descr.text if descr is not None else "",
                         },
-                    }
+                    )
                     hosts.append(host)
 
     # Parse DNS host overrides (OPNsense uses <hosts> container)
@@ -92,37 +139,147 @@ def parse_opnsense_config(xml_data: str) -> List[Dict[str, Any]]:
                 if domain_elem is not None and domain_elem.text:
                     fqdn = f"{hostname_elem.text}.{domain_elem.text}"
 
-                host = {
-                    "ip": ip_elem.text,
-                    "mac": "",
-                    "hostname": fqdn,
-                    "os": "",
-                    "services": [],
-                    "discovered_by": ["manual-opnsense"],
-                    "metadata": {
+                host = HostRecord(
+                    ip=ip_elem.text,
+                    hostname=fqdn,
+                    discovered_by=("manual-opnsense",),
+                    metadata={
                         "type": "dns-override",
                         "description": descr_elem.text
                         if descr_elem is not None
                         else "",
                     },
-                }
+                )
                 hosts.append(host)
 
     return hosts
 
 
+def parse_opnsense_stream(stream: IO[bytes]) -> Dict[str, List[Any]]:
+    """Single-pass parse of DHCP staticmaps, DNS overrides and VLANs
+
+    VLANs carry the subnets of their assigned interfaces (<interfaces>).
+
+    Produces the same records as parse_opnsense_config() and
+    parse_opnsense_vlans() combined, but walks the document once with
+    iterparse and discards every finished subtree (RRD data, certificates,
+    firewall rules, ...) so memory does not grow with config size.
+    Hosts are HostRecords, VLANs plain dicts. Raises ET.ParseError on
+    invalid XML.
+    """
+    static_hosts: List[HostRecord] = []
+    override_hosts: List[HostRecord] = []
+    vlans: List[Dict[str, Any]] = []
+    interfaces: Dict[str, List[str]] = {}
+
+    # Like root.find(".//tag"), only the first container of each kind counts
+    containers: Dict[str, ET.Element] = {}
+    stack: List[ET.Element] = []
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag in CONTAINER_TAGS and elem.tag not in containers:
+                containers[elem.tag] = elem
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+        grandparent = stack[-2] if len(stack) > 1 else None
+
+        if elem.tag == "staticmap" and grandparent is containers.get("dhcpd", MISSING):
+            children = {child.tag: child.text for child in elem}
+            if "mac" in children and "ipaddr" in children:
+                static_hosts.append(
+                    HostRecord(
+                        ip=children["ipaddr"],
+                        mac=children["mac"],
+                        hostname=children["hostname"] if "hostname" in children else "",
+                        discovered_by=("manual-opnsense",),
+                        metadata={
+                            "type": "dhcp-static",
+                            "description": children["descr"]
+                            if "descr" in children
+                            else "",
+                        },
+                    )
+                )
+
+        elif elem.tag == "host" and parent is containers.get("hosts", MISSING):
+            children = {child.tag: child.text for child in elem}
+            # OPNsense uses <server> not <ip>
+            if "hostname" in children and "server" in children:
+                fqdn = children["hostname"]
+                if children.get("domain"):
+                    fqdn = f"{children['hostname']}.{children['domain']}"
+
+                override_hosts.append(
+                    HostRecord(
+                        ip=children["server"],
+                        hostname=fqdn,
+                        discovered_by=("manual-opnsense",),
+                        metadata={
+                            "type": "dns-override",
+                            "description": children["description"]
+                            if "description" in children
+                            else "",
+                        },
+                    )
+                )
+
+        elif elem.tag == "vlan" and parent is containers.get("vlans", MISSING):
+            children = {child.tag: child.text for child in elem}
+            if "tag" in children:
+                vlans.append(
+                    {
+                        "vlan_id": int(children["tag"]) if children["tag"] else 0,
+                        "name": children.get("descr") or "",
+                        "interface": children.get("if") or "",
+                        "vlanif": children.get("vlanif") or "",
+                    }
+                )
+
+        elif parent is containers.get("interfaces", MISSING):
+            # Interface entries are named by role: <lan>, <wan>, <opt1>, ...
+            children = {child.tag: child.text for child in elem}
+            if children.get("if"):
+                interfaces.setdefault(children["if"], interface_subnets(children))
+
+        # Fields of a record are needed until the record itself closes;
+        # everything else is finished and is dropped from the tree
+        if parent is not None and (
+            parent.tag in RECORD_TAGS
+            or grandparent is containers.get("interfaces", MISSING)
+        ):
+            continue
+
+        elem.clear()
+        if parent is not None and len(parent) and parent[-1] is elem:
+            del parent[-1]
+
+    attach_subnets(vlans, interfaces)
+    return {"hosts": static_hosts + override_hosts, "vlans": vlans}
+
+
 def main() -> None:
     mode = sys.argv[1] if len(sys.argv) > 1 else "hosts"
-    xml_data = sys.stdin.read()
-
-    if mode == "vlans":
-        result = parse_opnsense_vlans(xml_data)
-    elif mode == "hosts":
-        result = parse_opnsense_config(xml_data)
-    else:
-        print(f"ERROR: Unknown mode '{mode}'. Use 'hosts' or 'vlans'", file=sys.stderr)
+
+    if mode not in ("hosts", "vlans", "all"):
+        print(
+            f"ERROR: Unknown mode '{mode}'. Use 'hosts', 'vlans' or 'all'",
+            file=sys.stderr,
+        )
         sys.exit(1)
 
+    try:
+        parsed = parse_opnsense_stream(sys.stdin.buffer)
+    except ET.ParseError as e:
+        print(f"ERROR: Invalid XML: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    output = {"hosts": to_dicts(parsed["hosts"]), "vlans": parsed["vlans"]}
+    result = output if mode == "all" else output[mode]
+
     print(json.dumps(result, indent=2))
 
 
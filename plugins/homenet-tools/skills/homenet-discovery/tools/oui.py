@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+oui.py - Memory-mapped OUI vendor table
+
+`build` compiles a local IEEE registry file (oui.txt, or the MA-L / MA-M /
+MA-S CSV exports; nmap's nmap-mac-prefixes also works) into a compact
+binary table: one sorted array of fixed-width (prefix, vendor) records per
+prefix length plus a deduplicated vendor string pool. OuiTable maps that
+file read-only and answers lookups by binary search directly over the
+mapped records, longest prefix first, so nothing is loaded or copied up
+front and each vendor name is decoded at most once.
+
+Table layout (big-endian):
+  header   "OUI1", record counts for 24/28/36-bit prefixes, vendor count
+  records  per prefix length, sorted by prefix: (prefix, vendor index)
+  vendors  count + 1 uint32 offsets into the UTF-8 name pool, then the pool
+"""
+
+import bisect
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Iterator
+
+DEFAULT_TABLE = Path.home() / ".local/share/homenet/oui.bin"
+
+MAGIC = b"OUI1"
+HEADER = struct.Struct(">4sIIII")
+PREFIX_BITS = (36, 28, 24)  # lookup order: longest prefix first
+RECORDS = {
+    24: struct.Struct(">II"),
+    28: struct.Struct(">II"),
+    36: struct.Struct(">QI"),
+}
+OFFSET = struct.Struct(">I")
+
+# by_oui marker for OUIs split into MA-M/MA-S blocks, which need a full search
+_SPLIT = object()
+
+# oui.txt: "00-00-0C   (hex)\t\tCisco Systems, Inc"
+HEX_LINE = re.compile(r"^([0-9A-Fa-f]{2}(?:-[0-9A-Fa-f]{2}){2})\s+\(hex\)\s+(.+)$")
+# nmap-mac-prefixes: "00000C Cisco Systems"
+NMAP_LINE = re.compile(r"^([0-9A-Fa-f]{6}|[0-9A-Fa-f]{7}|[0-9A-Fa-f]{9})\s+(.+)$")
+
+
+def mac_to_int(mac: str) -> int | None:
+    """48-bit integer of a MAC in any common notation; None if malformed"""
+    digits = mac.replace(":", "").replace("-", "").replace(".", "")
+    if len(digits) != 12:
+        return None
+    try:
+        return int(digits, 16)
+    except ValueError:
+        return None
+
+
+def iter_registry(path: Path) -> Iterator[tuple[int, int, str]]:
+    """(prefix bits, prefix, vendor) entries of an IEEE or nmap registry file
+
+    The format is detected once, from the CSV header or else the first line
+    that parses as an oui.txt or nmap-mac-prefixes entry, and only that
+    parser reads the rest: oui.txt's "(base 16)" and address lines would
+    otherwise pass for nmap entries.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        first = f.readline()
+        f.seek(0)
+
+        if first.startswith("Registry,"):
+            for row in csv.DictReader(f):
+                assignment = (row.get("Assignment") or "").strip()
+                vendor = (row.get("Organization Name") or "").strip()
+                bits = len(assignment) * 4
+                if bits in RECORDS and vendor:
+                    yield bits, int(assignment, 16), vendor
+            return
+
+        pattern = None
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if pattern is None:
+                if HEX_LINE.match(line):
+                    pattern = HEX_LINE
+                elif NMAP_LINE.match(line):
+                    pattern = NMAP_LINE
+                else:
+                    continue  # oui.txt column headers
+
+            match = pattern.match(line)
+            if not match:
+                continue
+            if pattern is HEX_LINE:
+                yield 24, int(match.group(1).replace("-", ""), 16), match.group(2)
+            else:
+                prefix = match.group(1)
+                yield len(prefix) * 4, int(prefix, 16), match.group(2).strip()
+
+
+def build_table(registry: Path, output: Path) -> dict[int, int]:
+    """Compile a registry file into a table; returns entries per prefix length"""
+    entries: dict[int, dict[int, str]] = {bits: {} for bits in RECORDS}
+    for bits, prefix, vendor in iter_registry(registry):
+        entries[bits].setdefault(prefix, vendor)
+
+    vendors: dict[str, int] = {}
+    for bits in PREFIX_BITS:
+        for vendor in entries[bits].values():
+            vendors.setdefault(vendor, len(vendors))
+
+    pool = bytearray()
+    offsets = []
+    for vendor in vendors:
+        offsets.append(len(pool))
+        pool += vendor.encode()
+    offsets.append(len(pool))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(output.name + ".tmp")
+    counts = [len(entries[bits]) for bits in (24, 28, 36)]
+    with open(tmp_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, *counts, len(vendors)))
+        for bits in (24, 28, 36):
+            record = RECORDS[bits]
+            for prefix in sorted(entries[bits]):
+                out.write(record.pack(prefix, vendors[entries[bits][prefix]]))
+        for offset in offsets:
+            out.write(OFFSET.pack(offset))
+        out.write(pool)
+    os.replace(tmp_path, output)
+
+    return {bits: len(entries[bits]) for bits in RECORDS}
+
+
+class _Prefixes:
+    """Sequence view of one mapped record array, for bisect"""
+
+    def __init__(self, buf: mmap.mmap, offset: int, count: int, bits: int) -> None:
+        self.buf = buf
+        self.offset = offset
+        self.count = count
+        self.record = RECORDS[bits]
+        self.shift = 48 - bits
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record(self, position: int) -> tuple[int, int]:
+        offset = self.offset + position * self.record.size
+        return self.record.unpack_from(self.buf, offset)
+
+    def __getitem__(self, position: int) -> int:
+        return self._record(position)[0]
+
+    def vendor_index(self, prefix: int) -> int | None:
+        position = bisect.bisect_left(self, prefix)
+        if position == self.count:
+            return None
+        found, index = self._record(position)
+        return index if found == prefix else None
+
+
+class OuiTable:
+    """Read-only OUI lookups over a memory-mapped table file"""
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_layout(path)
+        except (ValueError, struct.error):
+            self.buf.close()
+            raise
+        self.names: dict[int, str] = {}
+        # Vendor (or None) per 24-bit OUI already looked up
+        self.by_oui: dict[int, Any] = {}
+
+    def _read_layout(self, path: Path) -> None:
+        """Locate the record arrays and vendor pool, checking the file size
+
+        A truncated table is rejected here rather than failing lookups later.
+        """
+        magic, count24, count28, count36, self.vendor_count = HEADER.unpack_from(
+            self.buf, 0
+        )
+        if magic != MAGIC:
+            raise ValueError(f"not an OUI table: {path}")
+
+        offset = HEADER.size
+        self.tables = {}
+        for bits, count in ((24, count24), (28, count28), (36, count36)):
+            self.tables[bits] = _Prefixes(self.buf, offset, count, bits)
+            offset += count * RECORDS[bits].size
+        self.offsets_at = offset
+        self.pool_at = offset + (self.vendor_count + 1) * OFFSET.size
+        if self.pool_at > len(self.buf):
+            raise ValueError(f"truncated OUI table: {path}")
+        (pool_size,) = OFFSET.unpack_from(self.buf, self.pool_at - OFFSET.size)
+        if self.pool_at + pool_size > len(self.buf):
+            raise ValueError(f"truncated OUI table: {path}")
+
+    def vendor(self, index: int) -> str:
+        name = self.names.get(index)
+        if name is None:
+            start, end = struct.unpack_from(
+                ">II", self.buf, self.offsets_at + index * OFFSET.size
+            )
+            name = self.names[index] = self.buf[
+                self.pool_at + start : self.pool_at + end
+            ].decode()
+        return name
+
+    def is_split(self, oui: int) -> bool:
+        """Whether any MA-M/MA-S block lies inside a 24-bit OUI"""
+        for bits in (28, 36):
+            table = self.tables[bits]
+            position = bisect.bisect_left(table, oui << (bits - 24))
+            if position < table.count and table[position] >> (bits - 24) == oui:
+                return True
+        return False
+
+    def search(self, value: int) -> str | None:
+        """Longest-prefix match of a 48-bit MAC value"""
+        for bits in PREFIX_BITS:
+            table = self.tables[bits]
+            if table.count:
+                index = table.vendor_index(value >> table.shift)
+                if index is not None:
+                    return self.vendor(index)
+        return None
+
+    def lookup(self, mac: str) -> str | None:
+        """Vendor of a MAC, or None (unknown, malformed or locally administered)"""
+        value = mac_to_int(mac)
+        # Locally administered (randomized, virtual) and multicast MACs have
+        # no registered vendor
+        if value is None or (value >> 40) & 0x03:
+            return None
+
+        oui = value >> 24
+        vendor = self.by_oui.get(oui, _SPLIT)
+        if vendor is not _SPLIT:
+            return vendor
+        if oui in self.by_oui or self.is_split(oui):
+            self.by_oui[oui] = _SPLIT
+            return self.search(value)
+
+        vendor = self.by_oui[oui] = self.search(value)
+        return vendor
+
+    def close(self) -> None:
+        self.buf.close()
+
+
+def open_default_table() -> OuiTable | None:
+    """The table at DEFAULT_TABLE, or None if it has not been built"""
+    try:
+        return OuiTable(DEFAULT_TABLE)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def main() -> None:
+    args = sys.argv[1:]
+
+    if args and args[0] == "build" and len(args) in (2, 3):
+        registry = Path(args[1])
+        output = Path(args[2]) if len(args) == 3 else DEFAULT_TABLE
+        if not registry.exists():
+            print(f"ERROR: Registry file not found: {registry}", file=sys.stderr)
+            sys.exit(1)
+        counts = build_table(registry, output)
+        if not any(counts.values()):
+            print(f"ERROR: No OUI entries found in {registry}", file=sys.stderr)
+            sys.exit(1)
+        print(
+            f"OUI table: {counts[24]} MA-L, {counts[28]} MA-M, {counts[36]} MA-S"
+            f" ({output.stat().st_size} bytes) -> {output}"
+        )
+        return
+
+    if len(args) >= 2 and args[0] == "lookup":
+        table_path = DEFAULT_TABLE
+        macs = args[1:]
+        if len(macs) > 2 and macs[-2] == "--table":
+            table_path = Path(macs[-1])
+            macs = macs[:-2]
+        try:
+            table = OuiTable(table_path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"ERROR: Cannot open OUI table: {e}", file=sys.stderr)
+            sys.exit(1)
+        for mac in macs:
+            print(f"{mac}\t{table.lookup(mac) or 'unknown'}")
+        return
+
+    print("Usage: oui.py build <oui.txt|oui.csv|nmap-mac-prefixes> [oui.bin]")
+    print("       oui.py lookup <mac> [...] [--table oui.bin]")
+    print(f"Default table: {DEFAULT_TABLE}")
+    print("Registry: https://standards-oui.ieee.org/oui/oui.txt (download once)")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
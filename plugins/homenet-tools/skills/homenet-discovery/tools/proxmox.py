@@ -1,39 +1,52 @@
 #!/usr/bin/env python3
 """
 proxmox.py - Parse Proxmox JSON outputs into unified host format
+
+Cluster resources carry no guest addresses. Per-node guest network dumps
+(QEMU guest agent `network-get-interfaces` and LXC `interfaces` output for
+every running guest, see templates/proxmox-commands.txt) are indexed by
+vmid and joined onto the resource records in one pass.
 """
 
+import ipaddress
 import json
 import sys
+from pathlib import Path
 from typing import List, Dict, Any
 
+from host_record import HostRecord, to_dicts
+
+# Host-side bridges and tunnels inside guests (Docker, libvirt, ...) whose
+# addresses are not the guest's own
+VIRTUAL_INTERFACE_PREFIXES = ("lo", "docker", "br-", "veth", "virbr", "cni", "flannel")
+
 
-def parse_proxmox_nodes(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def parse_proxmox_nodes(data: List[Dict[str, Any]]) -> List[HostRecord]:
     """Parse Proxmox nodes JSON"""
     hosts = []
 
     for node in data:
-        host = {
-            "ip": node.get("ip", ""),
-            "hostname": node.get("node", ""),
-            "mac": "",  # Not in node data
-            "os": f"Proxmox VE {node.get('version', 'unknown')}",
-            "services": ["proxmox", "kvm"],
-            "discovered_by": ["manual-proxmox"],
-            "metadata": {
+        host = HostRecord(
+            ip=node.get("ip", ""),
+            hostname=node.get("node", ""),
+            mac="",  # Not in node data
+            os=f"Proxmox VE {node.get('version', 'unknown')}",
+            services=("proxmox", "kvm"),
+            discovered_by=("manual-proxmox",),
+            metadata={
                 "type": "hypervisor",
                 "status": node.get("status", "unknown"),
                 "uptime": node.get("uptime", 0),
                 "cpu_count": node.get("maxcpu", 0),
                 "mem_total": node.get("maxmem", 0),
             },
-        }
+        )
         hosts.append(host)
 
     return hosts
 
 
-def parse_proxmox_resources(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def parse_proxmox_resources(data: List[Dict[str, Any]]) -> List[HostRecord]:
     """Parse Proxmox cluster resources JSON"""
     hosts = []
 
@@ -50,14 +63,13 @@ def parse_proxmox_resources(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             # VM is running, might have network info
             ip = resource.get("ip", "")
 
-        host = {
-            "ip": ip,
-            "hostname": resource.get("name", ""),
-            "mac": "",  # Not in resource data
-            "os": "VM" if res_type == "qemu" else "LXC",
-            "services": [],
-            "discovered_by": ["manual-proxmox"],
-            "metadata": {
+        host = HostRecord(
+            ip=ip,
+            hostname=resource.get("name", ""),
+            mac="",  # Not in resource data
+            os="VM" if res_type == "qemu" else "LXC",
+            discovered_by=("manual-proxmox",),
+            metadata={
                 "type": "vm" if res_type == "qemu" else "container",
                 "status": resource.get("status", "unknown"),
                 "vmid": resource.get("vmid", ""),
@@ -65,15 +77,130 @@ def parse_proxmox_resources(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 "cpu_count": resource.get("maxcpu", 0),
                 "mem_total": resource.get("maxmem", 0),
             },
-        }
+        )
         hosts.append(host)
 
     return hosts
 
 
+def interface_addresses(interface: Dict[str, Any]) -> List[str]:
+    """Addresses of one interface, guest-agent or LXC style"""
+    addresses = [
+        entry.get("ip-address", "")
+        for entry in interface.get("ip-addresses") or []
+        if isinstance(entry, dict)
+    ]
+    if not addresses:
+        # LXC: "inet": "10.0.0.5/24", "inet6": "fd00::5/64"
+        for key in ("inet", "inet6"):
+            addresses.extend(str(interface.get(key) or "").split())
+    return [address.split("/")[0] for address in addresses if address]
+
+
+def usable_address(address: str) -> Any:
+    """Parsed address, or None for loopback, link-local and invalid ones"""
+    try:
+        ip = ipaddress.ip_address(address.split("%")[0])
+    except ValueError:
+        return None
+    if ip.is_loopback or ip.is_link_local or ip.is_unspecified:
+        return None
+    return ip
+
+
+def guest_network(interfaces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Primary IP and MAC plus {name: ip} of a guest's interfaces
+
+    The first IPv4 address of a non-virtual interface is primary, else the
+    first global IPv6 one.
+    """
+    network: Dict[str, Any] = {"ip": "", "mac": "", "interfaces": {}}
+    fallback = ("", "")
+
+    for interface in interfaces:
+        if not isinstance(interface, dict):
+            continue
+        name = interface.get("name", "")
+        mac = interface.get("hardware-address") or interface.get("hwaddr") or ""
+        addresses = [
+            ip
+            for ip in map(usable_address, interface_addresses(interface))
+            if ip is not None
+        ]
+        if not addresses or name.startswith(VIRTUAL_INTERFACE_PREFIXES):
+            continue
+
+        network["interfaces"][name] = str(addresses[0])
+        ipv4 = next((ip for ip in addresses if ip.version == 4), None)
+        if ipv4 is not None and not network["ip"]:
+            network["ip"], network["mac"] = str(ipv4), mac
+        elif ipv4 is None and not fallback[0]:
+            fallback = (str(addresses[0]), mac)
+
+    if not network["ip"]:
+        network["ip"], network["mac"] = fallback
+    return network
+
+
+def parse_guest_networks(data: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """vmid -> guest network from a per-node dump
+
+    Each entry is {"vmid", "type", "interfaces"}, where interfaces is the raw
+    agent or LXC output (a list, or the agent's {"result": [...]} wrapper).
+    """
+    networks = {}
+
+    for guest in data:
+        if not isinstance(guest, dict):
+            continue
+        try:
+            vmid = int(guest.get("vmid"))
+        except (TypeError, ValueError):
+            continue
+        interfaces = guest.get("interfaces")
+        if isinstance(interfaces, dict):
+            interfaces = interfaces.get("result")
+        if isinstance(interfaces, list):
+            networks[vmid] = guest_network(interfaces)
+
+    return networks
+
+
+def attach_guest_networks(
+    hosts: List[HostRecord], networks: Dict[int, Dict[str, Any]]
+) -> int:
+    """Fill IP, MAC and interfaces of Proxmox guests by vmid
+
+    Returns the number of guests joined.
+    """
+    joined = 0
+
+    for host in hosts:
+        if host.metadata.get("type") not in ("vm", "container"):
+            continue
+        try:
+            network = networks.get(int(host.metadata.get("vmid")))
+        except (TypeError, ValueError):
+            continue
+        if network is None:
+            continue
+
+        host.ip = host.ip or network["ip"]
+        host.mac = host.mac or network["mac"]
+        if network["interfaces"]:
+            host.metadata["interfaces"] = network["interfaces"]
+        joined += 1
+
+    return joined
+
+
 def main() -> None:
     if len(sys.argv) < 2:
         print("Usage: proxmox.py <nodes|resources> < input.json", file=sys.stderr)
+        print(
+            "       proxmox.py resources [proxmox-guests-NODE.json ...] < input.json",
+            file=sys.stderr,
+        )
         sys.exit(1)
 
     mode = sys.argv[1]
@@ -92,13 +219,22 @@ def main() -> None:
         hosts = parse_proxmox_resources(
             data if isinstance(data, list) else data.get("data", [])
         )
+        networks: Dict[int, Dict[str, Any]] = {}
+        for dump in sys.argv[2:]:
+            try:
+                dump_data = json.loads(Path(dump).read_text())
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"ERROR: Cannot read {dump}: {e}", file=sys.stderr)
+                sys.exit(1)
+            networks.update(parse_guest_networks(dump_data))
+        attach_guest_networks(hosts, networks)
     else:
         print(
             f"ERROR: Unknown mode '{mode}'. Use 'nodes' or 'resources'", file=sys.stderr
         )
         sys.exit(1)
 
-    print(json.dumps(hosts, indent=2))
+    print(json.dumps(to_dicts(hosts), indent=2))
 
 
 if __name__ == "__main__":
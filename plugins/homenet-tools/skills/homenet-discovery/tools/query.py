@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+query.py - Indexed lookups over the JSONL inventory
+
+Builds a SQLite index next to the inventory (inventory.jsonl ->
+inventory-index.db) with indexes on IP, MAC, hostname, VLAN, service and
+discovery method, and answers filtered queries from it. Only matching host
+records are printed, so callers never need to read the whole inventory.
+The index is rebuilt automatically whenever the inventory file changes.
+"""
+
+import ipaddress
+import json
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Iterable
+
+from consolidate import canonical_mac, is_vlan_record, iter_discovery_records
+
+INDEX_VERSION = "2"
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE hosts (
+    id INTEGER PRIMARY KEY,
+    ip TEXT NOT NULL,
+    ip_int INTEGER,
+    mac TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    os TEXT NOT NULL,
+    vlan_id INTEGER,
+    record TEXT NOT NULL
+);
+CREATE TABLE services (
+    host_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    port INTEGER,
+    service TEXT NOT NULL
+);
+CREATE TABLE service_tokens (token TEXT NOT NULL, host_id INTEGER NOT NULL);
+CREATE TABLE sources (source TEXT NOT NULL, host_id INTEGER NOT NULL);
+"""
+
+INDEXES = """
+CREATE INDEX hosts_ip ON hosts(ip_int);
+CREATE INDEX hosts_mac ON hosts(mac);
+CREATE INDEX hosts_hostname ON hosts(hostname);
+CREATE INDEX hosts_vlan ON hosts(vlan_id);
+CREATE INDEX services_host ON services(host_id);
+CREATE INDEX services_port ON services(port, host_id);
+CREATE INDEX service_tokens_token ON service_tokens(token, host_id);
+CREATE INDEX sources_source ON sources(source, host_id);
+"""
+
+# "http/8080 (nginx 1.18.0)" -> name "http", port 8080
+SERVICE_PATTERN = re.compile(r"([^/\s]+)(?:/(\d+))?")
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9._-]*")
+
+FILTER_OPTIONS = (
+    "ip",
+    "subnet",
+    "mac",
+    "hostname",
+    "vlan",
+    "service",
+    "port",
+    "source",
+)
+
+COUNT_FIELDS = {
+    "vlan": "SELECT h.vlan_id, COUNT(*) FROM hosts h",
+    "os": "SELECT h.os, COUNT(*) FROM hosts h",
+    "service": (
+        "SELECT s.name, COUNT(DISTINCT h.id) FROM hosts h"
+        " JOIN services s ON s.host_id = h.id"
+    ),
+    "source": (
+        "SELECT src.source, COUNT(*) FROM hosts h"
+        " JOIN sources src ON src.host_id = h.id"
+    ),
+}
+
+
+def index_path(inventory: Path) -> Path:
+    """inventory.jsonl -> inventory-index.db"""
+    name = inventory.name.partition(".")[0]
+    return inventory.with_name(f"{name}-index.db")
+
+
+def ip_to_int(ip: str) -> int | None:
+    try:
+        return int(ipaddress.IPv4Address(ip))
+    except ValueError:
+        return None
+
+
+def host_vlan(host: dict[str, Any]) -> int | None:
+    vlan_id = host.get("vlan_id", host.get("metadata", {}).get("vlan_id"))
+    return vlan_id if isinstance(vlan_id, int) else None
+
+
+def inventory_signature(inventory: Path) -> str:
+    stat = inventory.stat()
+    return f"{INDEX_VERSION}:{inventory.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def build_index(hosts: Iterable[dict[str, Any]], db_path: Path, signature: str) -> None:
+    """Write a fresh index, replacing any previous one atomically"""
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(SCHEMA)
+
+    rows, services, tokens, sources = [], [], [], []
+    for host_id, host in enumerate(hosts, start=1):
+        rows.append(
+            (
+                host_id,
+                host.get("ip", ""),
+                ip_to_int(host.get("ip", "")),
+                canonical_mac(host.get("mac", "")),
+                host.get("hostname", ""),
+                host.get("os", ""),
+                host_vlan(host),
+                json.dumps(host),
+            )
+        )
+        for service in host.get("services", []):
+            match = SERVICE_PATTERN.match(service)
+            name = match.group(1).lower() if match else service.lower()
+            port = int(match.group(2)) if match and match.group(2) else None
+            services.append((host_id, name, port, service))
+            for token in set(TOKEN_PATTERN.findall(service.lower())):
+                tokens.append((token, host_id))
+        for source in set(host.get("discovered_by", [])):
+            sources.append((source, host_id))
+
+    with conn:
+        conn.executemany("INSERT INTO hosts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany("INSERT INTO services VALUES (?, ?, ?, ?)", services)
+        conn.executemany("INSERT INTO service_tokens VALUES (?, ?)", tokens)
+        conn.executemany("INSERT INTO sources VALUES (?, ?)", sources)
+        conn.execute("INSERT INTO meta VALUES ('signature', ?)", (signature,))
+    # Bulk load first, index afterwards: much faster than incremental inserts
+    conn.executescript(INDEXES)
+    conn.execute("ANALYZE")
+    conn.close()
+
+    os.replace(tmp_path, db_path)
+
+
+def open_index(inventory: Path) -> sqlite3.Connection:
+    """Connect to the inventory's index, (re)building it if stale"""
+    db_path = index_path(inventory)
+    signature = inventory_signature(inventory)
+
+    if db_path.exists():
+        conn = sqlite3.connect(db_path)
+        try:
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key = 'signature'"
+            ).fetchone()
+        except sqlite3.DatabaseError:
+            row = None
+        if row and row[0] == signature:
+            return conn
+        conn.close()
+
+    hosts = (
+        record
+        for record in iter_discovery_records(inventory)
+        if not is_vlan_record(record)
+    )
+    build_index(hosts, db_path, signature)
+    return sqlite3.connect(db_path)
+
+
+def build_filters(filters: dict[str, str]) -> tuple[str, list[Any]]:
+    """WHERE clause and parameters for the given filters (all must match)"""
+    clauses: list[str] = []
+    params: list[Any] = []
+
+    if "ip" in filters:
+        clauses.append("h.ip_int = ?")
+        params.append(ip_to_int(filters["ip"]))
+    if "subnet" in filters:
+        network = ipaddress.IPv4Network(filters["subnet"], strict=False)
+        clauses.append("h.ip_int BETWEEN ? AND ?")
+        params += [int(network.network_address), int(network.broadcast_address)]
+    if "mac" in filters:
+        clauses.append("h.mac = ?")
+        params.append(canonical_mac(filters["mac"]))
+    if "hostname" in filters:
+        # Shell-style wildcards (web*, *.lab) use GLOB, exact names the index
+        operator = "GLOB" if any(c in filters["hostname"] for c in "*?[") else "="
+        clauses.append(f"h.hostname {operator} ?")
+        params.append(filters["hostname"])
+    if "vlan" in filters:
+        clauses.append("h.vlan_id = ?")
+        params.append(int(filters["vlan"]))
+    if "service" in filters:
+        clauses.append("h.id IN (SELECT host_id FROM service_tokens WHERE token = ?)")
+        params.append(filters["service"].lower())
+    if "port" in filters:
+        clauses.append("h.id IN (SELECT host_id FROM services WHERE port = ?)")
+        params.append(int(filters["port"]))
+    if "source" in filters:
+        clauses.append("h.id IN (SELECT host_id FROM sources WHERE source = ?)")
+        params.append(filters["source"])
+
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def query_hosts(
+    conn: sqlite3.Connection, filters: dict[str, str], limit: int | None = None
+) -> list[dict[str, Any]]:
+    """Matching host records, ordered by IP address"""
+    where, params = build_filters(filters)
+    sql = f"SELECT h.record FROM hosts h{where} ORDER BY h.ip_int IS NULL, h.ip_int"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return [json.loads(record) for (record,) in conn.execute(sql, params)]
+
+
+def count_hosts(
+    conn: sqlite3.Connection, filters: dict[str, str], field: str | None = None
+) -> Any:
+    """Number of matching hosts, or per-value counts grouped by field"""
+    where, params = build_filters(filters)
+
+    if field is None:
+        sql = f"SELECT COUNT(*) FROM hosts h{where}"
+        return conn.execute(sql, params).fetchone()[0]
+
+    sql = f"{COUNT_FIELDS[field]}{where} GROUP BY 1 ORDER BY 2 DESC, 1"
+    return {
+        str(value) if value is not None else "none": count
+        for value, count in conn.execute(sql, params)
+    }
+
+
+def usage() -> None:
+    print("Usage: query.py <inventory.jsonl> [filters] [--count [FIELD]] [--limit N]")
+    print()
+    print("Filters (combined with AND):")
+    print("  --ip IP             exact address")
+    print("  --subnet CIDR       address range, e.g. 192.168.20.0/24")
+    print("  --mac MAC           exact MAC (any case or separators)")
+    print("  --hostname NAME     exact name or wildcard pattern (web*, *.lab)")
+    print("  --vlan ID           VLAN ID")
+    print("  --service NAME      service name or product word (ssh, nginx, proxmox)")
+    print("  --port N            open port")
+    print("  --source METHOD     discovery method (nmap, ssh, dns, manual-unifi, ...)")
+    print()
+    print("Output: matching hosts as JSONL, or with --count a number")
+    print(f"(--count {{{'|'.join(COUNT_FIELDS)}}} groups counts by that field)")
+    print("Example: query.py inventory.jsonl --service nginx --vlan 20")
+    sys.exit(1)
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        usage()
+
+    inventory = Path(args[0])
+    filters: dict[str, str] = {}
+    count: str | None = None
+    counting = False
+    limit: int | None = None
+
+    rest = args[1:]
+    while rest:
+        option = rest.pop(0)
+        if option == "--count":
+            counting = True
+            if rest and not rest[0].startswith("--"):
+                count = rest.pop(0)
+                if count not in COUNT_FIELDS:
+                    usage()
+        elif option.startswith("--") and option[2:] in FILTER_OPTIONS and rest:
+            filters[option[2:]] = rest.pop(0)
+        elif option == "--limit" and rest and rest[0].isdigit():
+            limit = int(rest.pop(0))
+        else:
+            usage()
+
+    if not inventory.exists():
+        print(f"ERROR: Inventory not found: {inventory}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        conn = open_index(inventory)
+        if counting:
+            print(json.dumps(count_hosts(conn, filters, count)))
+            return
+        for host in query_hosts(conn, filters, limit):
+            sys.stdout.write(json.dumps(host) + "\n")
+    except ValueError as e:
+        print(f"ERROR: Invalid filter: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+report.py - Render inventory.md from the consolidated inventory
+
+Writes the layout of templates/inventory-format.md. Hosts and services are
+grouped by VLAN (or /24 subnet) and host type; each group's rendered text
+is cached by a hash of its hosts' JSONL lines as consolidate.py wrote them
+(inventory.md -> inventory-sections.json), so an update run only
+re-renders the groups whose hosts changed. JSON inventories are rendered
+in full.
+"""
+
+import hashlib
+import ipaddress
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from consolidate import (
+    companion_path,
+    is_jsonl,
+    is_vlan_record,
+    iter_discovery_records,
+    iter_jsonl_records,
+)
+from topology import host_group, route_parts
+
+CACHE_VERSION = 2
+
+# Section order within a group; unknown types are rendered last
+HOST_TYPES = {
+    "network-device": "Network Devices",
+    "hypervisor": "Hypervisors",
+    "vm": "Virtual Machines",
+    "container": "Containers",
+    "dhcp-static": "DHCP Static Leases",
+    "dns-override": "DNS Overrides",
+}
+OTHER_TYPE = "Other Hosts"
+
+ROLES = {
+    "network-device": "Network device",
+    "hypervisor": "Proxmox hypervisor",
+    "vm": "Virtual machine",
+    "container": "LXC container",
+    "dhcp-static": "DHCP static lease",
+    "dns-override": "DNS override",
+}
+
+
+def group_title(key: tuple, vlans: dict[int, dict[str, Any]]) -> str:
+    kind, value = key
+    if kind == 0:
+        name = vlans.get(value, {}).get("name", "")
+        return f"VLAN {value} ({name})" if name else f"VLAN {value}"
+    if kind == 1:
+        return f"Subnet {ipaddress.IPv4Address(value)}/24"
+    return "Unaddressed"
+
+
+def type_key(host: dict[str, Any]) -> tuple[int, str]:
+    """Sortable (position, title) of a host's type section"""
+    host_type = host.get("metadata", {}).get("type")
+    if host_type in HOST_TYPES:
+        return list(HOST_TYPES).index(host_type), HOST_TYPES[host_type]
+    return len(HOST_TYPES), OTHER_TYPE
+
+
+def role(metadata: dict[str, Any]) -> str:
+    parts = [ROLES.get(metadata.get("type", ""), "")]
+    if metadata.get("node"):
+        parts.append(f"on node {metadata['node']}")
+    if metadata.get("model"):
+        parts.append(str(metadata["model"]))
+    text = " ".join(part for part in parts if part)
+    description = metadata.get("description")
+    if description:
+        return f"{text} - {description}" if text else str(description)
+    return text
+
+
+def host_heading(host: dict[str, Any]) -> str:
+    ip = host.get("ip") or "(no IP)"
+    return f"**{ip}** ({host['hostname']})" if host.get("hostname") else f"**{ip}**"
+
+
+def render_hosts(hosts: list[dict[str, Any]]) -> str:
+    """Host entries of one section, per the Hosts block of the template"""
+    lines = []
+    for host in hosts:
+        metadata = host.get("metadata", {})
+        lines.append(host_heading(host))
+        if host.get("mac") and metadata.get("vendor"):
+            lines.append(f"- MAC: {host['mac']} ({metadata['vendor']})")
+        elif host.get("mac"):
+            lines.append(f"- MAC: {host['mac']}")
+        if host.get("os"):
+            lines.append(f"- OS: {host['os']}")
+        if role(metadata):
+            lines.append(f"- Role: {role(metadata)}")
+        lines.append(f"- Discovery: {', '.join(sorted(host.get('discovered_by', [])))}")
+        if metadata.get("ssh_auth_failed"):
+            lines.append("- SSH: authentication failed")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def render_services(hosts: list[dict[str, Any]]) -> str:
+    lines = []
+    for host in hosts:
+        if not host.get("services"):
+            continue
+        lines.append(host_heading(host))
+        lines.extend(f"- {service}" for service in sorted(host["services"]))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def section_key(title: str, lines: list[str]) -> str:
+    """Hash of a section's title and host lines (no re-serialization)"""
+    digest = hashlib.sha256(title.encode())
+    for line in lines:
+        digest.update(line.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def load_inventory(
+    inventory: Path,
+) -> tuple[list[dict], list[str] | None, dict[int, dict[str, Any]]]:
+    """Hosts, their JSONL lines and VLANs from a JSONL inventory or JSON
+
+    Lines are None for a JSON inventory.
+    """
+    hosts: list[dict[str, Any]] = []
+    lines: list[str] | None = None
+    vlans: dict[int, dict[str, Any]] = {}
+
+    def add_vlan(record: dict[str, Any]) -> None:
+        if record.get("vlan_id"):
+            vlans[record["vlan_id"]] = record
+
+    if is_jsonl(inventory):
+        lines = []
+        for line, record in iter_jsonl_records(inventory):
+            if is_vlan_record(record):
+                add_vlan(record)
+            else:
+                hosts.append(record)
+                lines.append(line)
+    else:
+        for record in iter_discovery_records(inventory):
+            if is_vlan_record(record):
+                add_vlan(record)
+            else:
+                hosts.append(record)
+
+    vlans_file = companion_path(inventory, "vlans")
+    if vlans_file.exists():
+        for record in iter_discovery_records(vlans_file):
+            if is_vlan_record(record):
+                add_vlan(record)
+
+    return hosts, lines, vlans
+
+
+def render_report(
+    hosts: list[dict[str, Any]],
+    lines: list[str] | None,
+    vlans: dict[int, dict[str, Any]],
+    cache: dict[str, dict[str, str]],
+    generated: str,
+    ssh_user: str = "{user}",
+) -> tuple[str, dict[str, dict[str, str]], int]:
+    """Render inventory.md
+
+    Sections are cached only when the hosts' inventory lines are given.
+    Returns the document, the section cache to keep for the next run, and
+    the number of sections rendered (cache misses).
+    """
+    # Grouping indexes: (group, type) -> hosts in inventory (IP) order
+    sections: dict[tuple, list[dict[str, Any]]] = defaultdict(list)
+    section_lines: dict[tuple, list[str]] = defaultdict(list)
+    subnets: dict[ipaddress.IPv4Network, int] = defaultdict(int)
+    vlan_counts: dict[int, int] = defaultdict(int)
+    methods: set[str] = set()
+    by_ip: dict[str, dict[str, Any]] = {}
+
+    for position, host in enumerate(hosts):
+        group = host_group(host)
+        section = (group, type_key(host))
+        sections[section].append(host)
+        if lines is not None:
+            section_lines[section].append(lines[position])
+        if group[0] == 0:
+            vlan_counts[group[1]] += 1
+        methods.update(host.get("discovered_by", []))
+        if host.get("ip"):
+            by_ip.setdefault(host["ip"], host)
+        try:
+            subnets[ipaddress.IPv4Network(f"{host.get('ip')}/24", strict=False)] += 1
+        except ValueError:
+            pass
+
+    new_cache: dict[str, dict[str, str]] = {}
+    rendered = 0
+    host_blocks: list[str] = []
+    service_blocks: list[str] = []
+    host_group_shown = service_group_shown = None
+
+    for section in sorted(sections):
+        group, (_, type_title) = section
+        section_hosts = sections[section]
+        title = group_title(group, vlans)
+        key = None
+        if lines is not None:
+            key = section_key(f"{title}/{type_title}", section_lines[section])
+
+        cached = cache.get(key) if key else None
+        if cached is None:
+            cached = {
+                "hosts": render_hosts(section_hosts),
+                "services": render_services(section_hosts),
+            }
+            rendered += 1
+        if key:
+            new_cache[key] = cached
+
+        if group != host_group_shown:
+            host_blocks.append(f"### {title}\n")
+            host_group_shown = group
+        host_blocks.append(f"#### {type_title} ({len(section_hosts)})\n")
+        host_blocks.append(cached["hosts"])
+
+        if cached["services"]:
+            if group != service_group_shown:
+                service_blocks.append(f"### {title}\n")
+                service_group_shown = group
+            service_blocks.append(cached["services"])
+
+    method_list = ", ".join(sorted(methods))
+
+    out = [
+        "# Network Inventory",
+        "",
+        "## Contents",
+        "- [Overview](#overview) - Scan summary and statistics",
+        "- [Hosts](#hosts) - Discovered network hosts",
+        "- [Services](#services) - Running services by host",
+        "- [Proxy Routes](#proxy-routes) - Domain to backend mappings",
+        "- [Network Topology](#network-topology) - Subnets and VLANs",
+        "- [Access Methods](#access-methods) - SSH access and credentials",
+        "",
+        f"Generated: {generated}",
+        f"Scan methods: {method_list}",
+        f"Total hosts: {len(hosts)}",
+        "",
+        "## Overview",
+        "",
+        f"Discovered {len(hosts)} hosts across {len(subnets)} subnets "
+        f"using {method_list or 'no methods'}.",
+        "",
+        "## Hosts",
+        "",
+        *host_blocks,
+        "## Services",
+        "",
+        *(service_blocks or ["No services detected.\n"]),
+        "## Proxy Routes",
+        "",
+    ]
+
+    routes = [host for host in hosts if host.get("proxy_routes")]
+    for host in routes:
+        proxy_type = host.get("metadata", {}).get("proxy_type", "Reverse proxy")
+        out.append(f"**{proxy_type} on {host.get('ip', '')}:**")
+        for route in host["proxy_routes"]:
+            domain, backend = route_parts(route)
+            out.append(f"- {domain} → {backend}" if backend else f"- {domain}")
+        out.append("")
+    if not routes:
+        out += ["No proxy routes found.", ""]
+
+    out += ["## Network Topology", ""]
+    for subnet, count in sorted(subnets.items()):
+        out.append(f"**Subnet:** {subnet} ({count} hosts)")
+        gateway = by_ip.get(str(subnet[1]))
+        if gateway is not None:
+            name = f" ({gateway['hostname']})" if gateway.get("hostname") else ""
+            out.append(f"- Gateway: {gateway['ip']}{name}")
+        out.append("")
+    if vlans:
+        out.append("**VLANs:**")
+        for vlan_id in sorted(vlans):
+            vlan = vlans[vlan_id]
+            interface = "/".join(
+                part for part in (vlan.get("interface"), vlan.get("vlanif")) if part
+            )
+            details = ", ".join(
+                part for part in (interface, f"{vlan_counts[vlan_id]} hosts") if part
+            )
+            name = vlan.get("name") or "unnamed"
+            out.append(f"- VLAN {vlan_id} ({name}): {details}")
+        out.append("")
+
+    ssh_hosts = [host for host in hosts if "ssh" in host.get("discovered_by", [])]
+    auth_failed = [
+        host for host in hosts if host.get("metadata", {}).get("ssh_auth_failed")
+    ]
+    docker_hosts = [
+        host for host in hosts if host.get("metadata", {}).get("containers")
+    ]
+
+    out += ["## Access Methods", "", "**SSH Access:**"]
+    out.append(f"- Most hosts: ssh {ssh_user}@<ip>")
+    deployed = "yes" if ssh_hosts else "no"
+    out.append(f"- Keys deployed: {deployed} ({len(ssh_hosts)} hosts)")
+    if auth_failed:
+        failed = ", ".join(host.get("ip", "") for host in auth_failed)
+        out.append(f"- Authentication failed: {failed}")
+    out.append("")
+    if docker_hosts:
+        out.append("**Container Management:**")
+        for host in docker_hosts:
+            out.append(f"- {host.get('ip', '')}: docker commands available")
+        out.append("")
+
+    return "\n".join(out).rstrip() + "\n", new_cache, rendered
+
+
+def cache_path(output: Path) -> Path:
+    """inventory.md -> inventory-sections.json"""
+    return output.with_name(f"{output.stem}-sections.json")
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    ssh_user = "{user}"
+    if len(args) > 1 and args[-2] == "--ssh-user":
+        ssh_user = args[-1]
+        args = args[:-2]
+
+    if len(args) != 2:
+        print(
+            "Usage: report.py <inventory.jsonl|inventory.json> <inventory.md>"
+            " [--ssh-user USER]",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    inventory, output = Path(args[0]), Path(args[1])
+    if not inventory.exists():
+        print(f"ERROR: Inventory not found: {inventory}", file=sys.stderr)
+        sys.exit(1)
+
+    hosts, lines, vlans = load_inventory(inventory)
+
+    cache: dict[str, dict[str, str]] = {}
+    cache_file = cache_path(output)
+    if cache_file.exists() and output.exists():
+        try:
+            stored = json.loads(cache_file.read_text())
+        except json.JSONDecodeError:
+            stored = {}
+        if stored.get("version") == CACHE_VERSION:
+            cache = stored.get("sections", {})
+
+    generated = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    document, new_cache, rendered = render_report(
+        hosts, lines, vlans, cache, generated, ssh_user
+    )
+
+    output.write_text(document)
+    cache_file.write_text(
+        json.dumps({"version": CACHE_VERSION, "sections": new_cache})
+    )
+
+    print(f"Inventory: {len(hosts)} hosts -> {output}")
+    reused = len(new_cache) - rendered if new_cache else 0
+    print(f"Sections: {rendered} rendered, {reused} cached")
+
+
+if __name__ == "__main__":
+    main()
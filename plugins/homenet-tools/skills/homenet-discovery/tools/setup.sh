@@ -28,11 +28,31 @@ if ! command -v ssh &> /dev/null; then
     MISSING+=("ssh")
 fi
 
+# Build the OUI vendor table (tools/oui.py) from a local registry file once
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+OUI_TABLE="$HOME/.local/share/$SKILL_NAME/oui.bin"
+OUI_STATUS="PRESENT"
+if [ ! -f "$OUI_TABLE" ]; then
+    OUI_STATUS="MISSING"
+    for registry in \
+        /usr/share/ieee-data/oui.txt \
+        /usr/share/nmap/nmap-mac-prefixes \
+        /usr/local/share/nmap/nmap-mac-prefixes \
+        /opt/homebrew/share/nmap/nmap-mac-prefixes; do
+        if [ -f "$registry" ] && command -v python3 &> /dev/null && \
+            python3 "$SCRIPT_DIR/oui.py" build "$registry" "$OUI_TABLE" > /dev/null; then
+            OUI_STATUS="BUILT"
+            break
+        fi
+    done
+fi
+
 # Output results
 echo "SETUP_STATUS: OK"
 echo "CONFIG_DIR: $HOME/.config/$SKILL_NAME"
 echo "DATA_DIR: $HOME/.local/share/$SKILL_NAME"
 echo "TEMP_DIR: /tmp/$SKILL_NAME"
+echo "OUI_TABLE: $OUI_STATUS"
 
 if [ ${#MISSING[@]} -eq 0 ]; then
     echo "PREREQUISITES: ALL_INSTALLED"
@@ -1,6 +1,9 @@
 #!/bin/bash
 # ssh-probe.sh - SSH into host and gather system information
 # Outputs JSON array with single host object
+#
+# Extra ssh options (e.g. ControlMaster settings from ssh_probe.py) can be
+# passed through the SSH_OPTS environment variable.
 
 set -uo pipefail
 
@@ -15,8 +18,11 @@ fi
 # Extract IP from user@host format
 HOST_IP="${HOST##*@}"
 
+# Word-split on purpose: SSH_OPTS holds several "-o Key=Value" options
+SSH_OPTS="${SSH_OPTS:-}"
+
 # Test SSH connectivity with short timeout
-SSH_TEST_OUTPUT=$(ssh -o ConnectTimeout=2 -o BatchMode=yes -o StrictHostKeyChecking=accept-new "$HOST" echo "ok" 2>&1)
+SSH_TEST_OUTPUT=$(ssh $SSH_OPTS -o ConnectTimeout=2 -o BatchMode=yes -o StrictHostKeyChecking=accept-new "$HOST" echo "ok" 2>&1)
 SSH_EXIT_CODE=$?
 
 if [ $SSH_EXIT_CODE -ne 0 ]; then
@@ -44,7 +50,7 @@ EOF
 fi
 
 # Gather host information and convert to JSON
-ssh -o ConnectTimeout=5 -o BatchMode=yes "$HOST" '
+ssh $SSH_OPTS -o ConnectTimeout=5 -o BatchMode=yes "$HOST" '
 set -e
 
 echo "=== SYSTEM ==="
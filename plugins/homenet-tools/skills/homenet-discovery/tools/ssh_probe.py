@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+ssh_probe.py - Run ssh-probe.sh across many hosts in parallel
+
+Each host gets an OpenSSH ControlMaster socket, so the connectivity test
+and the gather step in ssh-probe.sh share one connection. Unified-format
+host records are streamed to stdout as JSONL as soon as each probe ends.
+"""
+
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+import metrics
+
+PROBE_SCRIPT = Path(__file__).resolve().parent / "ssh-probe.sh"
+
+DEFAULT_WORKERS = 16
+DEFAULT_DEADLINE = 600  # seconds for the whole run
+CONTROL_PERSIST = 30  # seconds a master stays up after its last client
+
+
+def control_options(control_dir: Path) -> list[str]:
+    """ssh options sharing one master connection per user@host"""
+    return [
+        "-o",
+        "ControlMaster=auto",
+        "-o",
+        f"ControlPath={control_dir}/%C",
+        "-o",
+        f"ControlPersist={CONTROL_PERSIST}",
+    ]
+
+
+def close_master(target: str, control_dir: Path) -> None:
+    """Stop the persisted master for a target (no-op if none was opened)"""
+    try:
+        subprocess.run(
+            ["ssh", "-o", f"ControlPath={control_dir}/%C", "-O", "exit", target],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=5,
+            check=False,
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        pass
+
+
+def probe_host(target: str, control_dir: Path, deadline: float) -> dict[str, Any]:
+    """Run ssh-probe.sh for one target within the global deadline"""
+    started = time.monotonic()
+    remaining = deadline - started
+    result: dict[str, Any] = {"target": target, "hosts": [], "status": "ok"}
+
+    if remaining <= 0:
+        result["status"] = "skipped"
+        return result
+
+    env = dict(os.environ, SSH_OPTS=" ".join(control_options(control_dir)))
+
+    # New session so a timeout can kill ssh children along with bash
+    process = subprocess.Popen(
+        ["bash", str(PROBE_SCRIPT), target],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        text=True,
+        start_new_session=True,
+    )
+
+    try:
+        output, _ = process.communicate(timeout=remaining)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        result["status"] = "timeout"
+    else:
+        try:
+            hosts = json.loads(output)
+            result["hosts"] = hosts if isinstance(hosts, list) else []
+        except json.JSONDecodeError:
+            result["status"] = "error"
+    finally:
+        close_master(target, control_dir)
+
+    result["seconds"] = round(time.monotonic() - started, 3)
+    metrics.host(
+        target,
+        result["seconds"],
+        "ssh-probe",
+        status=result["status"],
+        hosts=len(result["hosts"]),
+    )
+    return result
+
+
+def probe_hosts(
+    targets: list[str],
+    workers: int = DEFAULT_WORKERS,
+    deadline_seconds: float = DEFAULT_DEADLINE,
+    out=sys.stdout,
+) -> dict[str, int]:
+    """Probe targets through a bounded pool, streaming records to `out`
+
+    Returns per-status counts.
+    """
+    deadline = time.monotonic() + deadline_seconds
+    counts = {"ok": 0, "timeout": 0, "error": 0, "skipped": 0, "hosts": 0}
+    control_dir = Path(tempfile.mkdtemp(prefix="homenet-ssh-"))
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(probe_host, target, control_dir, deadline)
+                for target in targets
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                counts[result["status"]] += 1
+                for host in result["hosts"]:
+                    out.write(json.dumps(host) + "\n")
+                    counts["hosts"] += 1
+                out.flush()
+    finally:
+        shutil.rmtree(control_dir, ignore_errors=True)
+
+    return counts
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    workers = DEFAULT_WORKERS
+    deadline = DEFAULT_DEADLINE
+
+    try:
+        while args and args[0] in ("--workers", "--deadline"):
+            if args[0] == "--workers":
+                workers = max(1, int(args[1]))
+            else:
+                deadline = float(args[1])
+            args = args[2:]
+    except (IndexError, ValueError):
+        args = []
+
+    if not args:
+        print(
+            "Usage: ssh_probe.py [--workers N] [--deadline SECONDS] <user@host> [...]",
+            file=sys.stderr,
+        )
+        print("       ssh_probe.py [options] - < targets.txt", file=sys.stderr)
+        print(
+            "Example: ssh_probe.py root@192.168.1.50 root@192.168.1.51",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    if args == ["-"]:
+        args = [line.strip() for line in sys.stdin if line.strip()]
+
+    with metrics.stage("ssh-probe", targets=len(args), workers=workers) as fields:
+        counts = probe_hosts(args, workers=workers, deadline_seconds=deadline)
+        fields.update(counts)
+
+    print(
+        f"Probed {len(args)} targets: {counts['hosts']} hosts, "
+        f"{counts['timeout']} timed out, {counts['error']} failed, "
+        f"{counts['skipped']} skipped (deadline)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+topology.py - Generate topology.mermaid from the consolidated inventory
+
+Hosts are grouped into one subgraph per VLAN (hosts carrying vlan_id) or
+per /24 subnet, Proxmox guests are linked to their node through
+metadata.node, and proxy_routes become labelled dotted edges. Input is read
+one record at a time; only a short node line per host is kept in the
+grouping index, and with --collapse a group stops keeping lines once it
+grows past the limit and is written as a single summary node instead.
+"""
+
+import ipaddress
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, IO, Iterator
+from urllib.parse import urlsplit
+
+from consolidate import companion_path, is_vlan_record, iter_discovery_records
+
+MAX_LABEL_SERVICES = 4
+GATEWAY_TYPES = {"network-device"}
+
+STYLES = [
+    "classDef vlanStyle fill:#e1f5ff,stroke:#0288d1,stroke-width:2px",
+    "classDef hostStyle fill:#f3e5f5,stroke:#7b1fa2,stroke-width:2px",
+    "classDef gatewayStyle fill:#fff3e0,stroke:#f57c00,stroke-width:3px",
+    "classDef summaryStyle fill:#eeeeee,stroke:#616161,stroke-dasharray:4 2",
+]
+
+ROUTE_DOMAIN_KEYS = ("domain", "host", "server_name", "name")
+ROUTE_BACKEND_KEYS = ("backend", "target", "upstream", "url")
+
+
+def node_id(prefix: str, value: str) -> str:
+    return f"{prefix}_{re.sub(r'[^A-Za-z0-9]', '_', value)}"
+
+
+def label(*lines: str) -> str:
+    """Quoted mermaid label; quotes are escaped, lines joined with <br/>"""
+    text = "<br/>".join(line.replace('"', "#quot;") for line in lines if line)
+    return f'"{text}"'
+
+
+def service_names(services: list[str]) -> list[str]:
+    """Unique service names ("ssh/22 (OpenSSH)" -> "ssh") in first-seen order
+
+    Services without a name ("", "/22") are skipped.
+    """
+    names: dict[str, None] = {}
+    for service in services:
+        parts = service.split("/")[0].split()
+        if parts:
+            names.setdefault(parts[0])
+    return list(names)
+
+
+def host_group(host: dict[str, Any]) -> tuple:
+    """Sortable group key: VLAN first, then /24 subnet, then unaddressed"""
+    vlan_id = host.get("vlan_id", host.get("metadata", {}).get("vlan_id"))
+    if isinstance(vlan_id, int):
+        return (0, vlan_id)
+    try:
+        network = ipaddress.IPv4Network(f"{host.get('ip', '')}/24", strict=False)
+    except ValueError:
+        return (2, "")
+    return (1, int(network.network_address))
+
+
+def route_parts(route: Any) -> tuple[str, str]:
+    """(domain, backend) from a proxy route dict or "domain -> backend" text"""
+    if isinstance(route, dict):
+        domain = next((str(route[k]) for k in ROUTE_DOMAIN_KEYS if route.get(k)), "")
+        backend = next((str(route[k]) for k in ROUTE_BACKEND_KEYS if route.get(k)), "")
+        return domain, backend
+    parts = re.split(r"\s*(?:->|→)\s*", str(route), maxsplit=1)
+    return (parts[0], parts[1]) if len(parts) == 2 else (parts[0], "")
+
+
+def backend_host(backend: str) -> str:
+    """Host part of a backend URL or host:port"""
+    if "://" not in backend:
+        backend = f"//{backend}"
+    return urlsplit(backend).hostname or ""
+
+
+class Group:
+    """Hosts of one VLAN or subnet; drops node lines once collapsed"""
+
+    def __init__(self, key: tuple, collapse: int | None) -> None:
+        self.key = key
+        self.collapse = collapse
+        self.lines: list[str] = []
+        self.count = 0
+        self.services: Counter = Counter()
+
+    @property
+    def collapsed(self) -> bool:
+        return self.collapse is not None and self.count > self.collapse
+
+    @property
+    def id(self) -> str:
+        kind, value = self.key
+        if kind == 1:
+            value = ipaddress.IPv4Address(value)
+        return node_id(("vlan", "net", "other")[kind], str(value))
+
+    def add(self, line: str, services: list[str]) -> None:
+        self.count += 1
+        self.services.update(services)
+        if self.collapsed:
+            self.lines = []
+        else:
+            self.lines.append(line)
+
+    def title(self, vlans: dict[int, dict[str, Any]]) -> list[str]:
+        kind, value = self.key
+        if kind == 0:
+            return [f"VLAN {value}", vlans.get(value, {}).get("name", "")]
+        if kind == 1:
+            return [f"{ipaddress.IPv4Address(value)}/24"]
+        return ["Unaddressed"]
+
+
+class Topology:
+    """Grouping indexes built from one pass over the inventory"""
+
+    def __init__(self, collapse: int | None = None) -> None:
+        self.collapse = collapse
+        self.groups: dict[tuple, Group] = {}
+        self.vlans: dict[int, dict[str, Any]] = {}
+        # hostname / IP -> (node id, group key), for resolving link targets
+        self.endpoints: dict[str, tuple[str, tuple]] = {}
+        self.parent_links: list[tuple[str, str, tuple]] = []
+        self.routes: list[tuple[str, tuple, str, str]] = []
+
+    def add_host(self, host: dict[str, Any]) -> None:
+        ip = host.get("ip", "")
+        hostname = host.get("hostname", "")
+        metadata = host.get("metadata", {})
+        # MAC-keyed and IP-only inventory records never share an id
+        host_id = node_id("h", host.get("mac") or ip or hostname)
+        key = host_group(host)
+
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = Group(key, self.collapse)
+
+        names = service_names(host.get("services", []))
+        shown = ", ".join(names[:MAX_LABEL_SERVICES])
+        if len(names) > MAX_LABEL_SERVICES:
+            shown += f" +{len(names) - MAX_LABEL_SERVICES}"
+
+        gateway = metadata.get("type") in GATEWAY_TYPES or ip.endswith(".1")
+        style = "gatewayStyle" if gateway else "hostStyle"
+        group.add(f"{host_id}[{label(hostname or ip, ip, shown)}]:::{style}", names)
+
+        for endpoint in (ip, hostname):
+            if endpoint:
+                self.endpoints.setdefault(endpoint, (host_id, key))
+
+        # Proxmox guests point at their node by name
+        if metadata.get("type") in ("vm", "container") and metadata.get("node"):
+            self.parent_links.append((metadata["node"], host_id, key))
+
+        for route in host.get("proxy_routes", []):
+            domain, backend = route_parts(route)
+            if domain or backend:
+                self.routes.append((host_id, key, domain, backend))
+
+    def add_vlan(self, vlan: dict[str, Any]) -> None:
+        if vlan.get("vlan_id"):
+            self.vlans[vlan["vlan_id"]] = vlan
+
+    def resolve(self, host_id: str, key: tuple) -> str:
+        """Node to draw an edge to: the host, or its group's summary node"""
+        group = self.groups[key]
+        return f"{group.id}_summary" if group.collapsed else host_id
+
+    def edges(self) -> Iterator[str]:
+        seen: set[tuple[str, str, str]] = set()
+
+        for node_name, child_id, child_key in self.parent_links:
+            parent = self.endpoints.get(node_name)
+            if parent is None:
+                continue
+            edge = (self.resolve(*parent), self.resolve(child_id, child_key), "")
+            if edge[0] != edge[1] and edge not in seen:
+                seen.add(edge)
+                yield f"{edge[0]} --> {edge[1]}"
+
+        for position, (host_id, key, domain, backend) in enumerate(self.routes):
+            source = self.resolve(host_id, key)
+            target = self.endpoints.get(backend_host(backend))
+            if target is not None:
+                target_id = self.resolve(*target)
+            else:
+                target_id = f"route_{position}"
+                yield f"{target_id}([{label(backend or domain)}])"
+            edge = (source, target_id, domain)
+            if source != target_id and edge not in seen:
+                seen.add(edge)
+                text = f"|{label(domain)}| " if domain else " "
+                yield f"{source} -.->{text}{target_id}"
+
+    def write(self, out: IO[str]) -> None:
+        """Stream the diagram group by group"""
+        out.write("graph TB\n")
+        out.write("    %% Network Topology Diagram\n")
+        out.write("    %% Generated by homenet-discovery (tools/topology.py)\n")
+
+        for key in sorted(self.groups):
+            group = self.groups[key]
+            title = group.title(self.vlans)
+            out.write("\n")
+            if group.collapsed:
+                top = ", ".join(name for name, _ in group.services.most_common(3))
+                summary = label(*title, f"{group.count} hosts", top)
+                out.write(f"    {group.id}_summary{{{{{summary}}}}}:::summaryStyle\n")
+                continue
+            out.write(f"    subgraph {group.id}[{label(*title)}]\n")
+            for line in group.lines:
+                out.write(f"        {line}\n")
+            out.write("    end\n")
+            if key[0] == 0:
+                out.write(f"    class {group.id} vlanStyle\n")
+
+        # VLANs known from the firewall config but without discovered hosts
+        empty = [
+            vlan_id for vlan_id in sorted(self.vlans) if (0, vlan_id) not in self.groups
+        ]
+        if empty:
+            out.write("\n    %% VLANs without discovered hosts\n")
+            for vlan_id in empty:
+                title = label(f"VLAN {vlan_id}", self.vlans[vlan_id].get("name", ""))
+                vlan_node = node_id("vlan", str(vlan_id))
+                out.write(f"    {vlan_node}{{{title}}}:::vlanStyle\n")
+
+        edges = list(self.edges())
+        if edges:
+            out.write("\n    %% Proxmox guests and proxy routes\n")
+            for edge in edges:
+                out.write(f"    {edge}\n")
+
+        out.write("\n")
+        for style in STYLES:
+            out.write(f"    {style}\n")
+
+
+def build_topology(inventory: Path, collapse: int | None = None) -> Topology:
+    """Index an inventory (JSONL plus VLAN companion, or consolidated JSON)"""
+    topology = Topology(collapse)
+    sources = [inventory]
+    vlans_file = companion_path(inventory, "vlans")
+    if vlans_file.exists():
+        sources.append(vlans_file)
+
+    for source in sources:
+        for record in iter_discovery_records(source):
+            if is_vlan_record(record):
+                topology.add_vlan(record)
+            elif record.get("ip") or record.get("hostname"):
+                topology.add_host(record)
+
+    return topology
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    collapse = None
+    if "--collapse" in args:
+        position = args.index("--collapse")
+        value = args[position + 1] if position + 1 < len(args) else ""
+        if not value.isdigit():
+            args = []
+        else:
+            collapse = int(value)
+            del args[position : position + 2]
+
+    if len(args) not in (1, 2):
+        print(
+            "Usage: topology.py <inventory.jsonl|inventory.json> [output.mermaid]"
+            " [--collapse N]",
+            file=sys.stderr,
+        )
+        print(
+            "       --collapse N  draw subnets/VLANs with more than N hosts"
+            " as one summary node",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    inventory = Path(args[0])
+    if not inventory.exists():
+        print(f"ERROR: Inventory not found: {inventory}", file=sys.stderr)
+        sys.exit(1)
+
+    topology = build_topology(inventory, collapse)
+
+    if len(args) == 2:
+        with open(args[1], "w") as out:
+            topology.write(out)
+        hosts = sum(group.count for group in topology.groups.values())
+        print(f"Topology: {hosts} hosts in {len(topology.groups)} groups -> {args[1]}")
+    else:
+        topology.write(sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,10 @@ import json
 import sys
 from typing import List, Dict, Any
 
+from host_record import HostRecord, to_dicts
 
-def parse_unifi_devices(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+def parse_unifi_devices(data: List[Dict[str, Any]]) -> List[HostRecord]:
     """Parse UniFi devices JSON"""
     hosts = []
 
@@ -21,21 +23,21 @@ def parse_unifi_devices(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         model = device.get("model", "")
         version = device.get("version", "")
 
-        host = {
-            "ip": ip,
-            "mac": mac,
-            "hostname": name,
-            "os": f"UniFi {version}" if version else "UniFi",
-            "services": ["unifi", device_type],
-            "discovered_by": ["manual-unifi"],
-            "metadata": {
+        host = HostRecord(
+            ip=ip,
+            mac=mac,
+            hostname=name,
+            os=f"UniFi {version}" if version else "UniFi",
+            services=("unifi", device_type),
+            discovered_by=("manual-unifi",),
+            metadata={
                 "type": "network-device",
                 "model": model,
                 "device_type": device_type,
                 "state": device.get("state", 0),
                 "uptime": device.get("uptime", 0),
             },
-        }
+        )
         hosts.append(host)
 
     return hosts
@@ -57,7 +59,7 @@ def main() -> None:
         sys.exit(1)
 
     hosts = parse_unifi_devices(data)
-    print(json.dumps(hosts, indent=2))
+    print(json.dumps(to_dicts(hosts), indent=2))
 
 
 if __name__ == "__main__":